@@ -0,0 +1,215 @@
+# python api_server.py
+# Headless report API, independent of the Streamlit UI:
+#   POST /reports               queue a report, returns a job id
+#   GET  /reports/{job_id}      poll a job for its status and report
+#   DELETE /reports/{job_id}    cancel a job
+#   GET  /images/{image_hash}   a chart a report links to (images/store/<xx>/<hash>.<ext>)
+#   GET  /datasets              registered datasets (passwords masked)
+#   POST /datasets              register a dataset from a reviewed data dictionary
+#   GET  /health                liveness, queue depth and connection pool metrics
+#
+# Every request needs the REPORT_API_KEY in an X-API-Key header. Jobs are run by the
+# persistent queue in nodes/report_jobs.py, so any instance sharing the data/ directory
+# can answer a poll and queued jobs survive a restart.
+
+import os
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+from fastapi import Depends, FastAPI, HTTPException, Response, Security
+from fastapi.security import APIKeyHeader
+from pydantic import BaseModel, Field
+from sqlalchemy.engine import make_url
+from decouple import config, Csv
+from nodes.file_manager_db import insert_db_info, get_all_file_info, if_db_exist
+from nodes.engine_manager import get_pool_metrics, dispose_async_engines
+from nodes.python_sandbox import start_sandbox_pool
+from nodes.image_store import read_image_by_hash
+from nodes.report_jobs import enqueue_report, get_job, cancel_job, pending_job_count, start_report_workers
+
+
+MAX_QUEUED_REPORTS = config("REPORT_API_MAX_QUEUED", default=100, cast=int)
+API_KEY = config("REPORT_API_KEY", default="")
+# Database hosts POST /datasets may register; none by default, so the API cannot be used to
+# reach arbitrary hosts on the server's network
+ALLOWED_DB_HOSTS = {host.lower() for host in config("REPORT_API_ALLOWED_DB_HOSTS", default="", cast=Csv())}
+NETWORK_BACKENDS = {"postgresql", "mysql", "mssql"}
+# ERD images are only read from the folder the Streamlit app uploads them to; the ERD is
+# sent to OpenAI with every query, so any other path could leak a file from the host
+ERD_UPLOAD_DIRECTORY = config("ERD_UPLOAD_DIR", default="images")
+ERD_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+
+class ReportRequest(BaseModel):
+    dataset: str = Field(description="Registered dataset name")
+    query: str = Field(description="Question to answer")
+
+
+class ReportJob(BaseModel):
+    job_id: str
+    dataset: str
+    query: str
+    status: str
+    current_node: Optional[str] = None
+    report: Optional[str] = None
+    error: Optional[str] = None
+    submitted_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @classmethod
+    def from_job(cls, job):
+        return cls(
+            job_id=job["job_id"],
+            dataset=job["db_name"],
+            query=job["query"],
+            status=job["status"],
+            current_node=job["current_node"],
+            report=job["report"],
+            error=job["error"],
+            submitted_at=job["created_at"],
+            started_at=job["started_at"],
+            finished_at=job["finished_at"],
+        )
+
+
+class TableDictionary(BaseModel):
+    name: str
+    description: str
+    columns: list[dict[str, Any]]
+    sample_data: list[dict[str, Any]]
+
+
+class DataDictionary(BaseModel):
+    db_name: str
+    description: str
+    connection_string: str
+    erd_path: str
+    tables: list[TableDictionary]
+
+
+_api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+
+def require_api_key(api_key: Optional[str] = Security(_api_key_header)):
+    if not API_KEY:
+        raise HTTPException(status_code=503, detail="REPORT_API_KEY is not configured.")
+    if not api_key or not secrets.compare_digest(api_key.encode(), API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Missing or invalid API key.")
+
+
+def _check_connection_string(connection_string):
+    try:
+        url = make_url(connection_string)
+    except Exception:
+        raise HTTPException(status_code=422, detail="The connection string is not valid.")
+    if url.get_backend_name() not in NETWORK_BACKENDS:
+        raise HTTPException(status_code=422, detail=f"Only {', '.join(sorted(NETWORK_BACKENDS))} datasets can be registered through the API.")
+    if (url.host or "").lower() not in ALLOWED_DB_HOSTS:
+        raise HTTPException(status_code=403, detail=f"Database host '{url.host}' is not in REPORT_API_ALLOWED_DB_HOSTS.")
+
+
+def _check_erd_path(erd_path):
+    # Directly inside the upload folder (symlinks resolved), so not e.g. a chart in images/store
+    path = os.path.realpath(erd_path)
+    if os.path.dirname(path) != os.path.realpath(ERD_UPLOAD_DIRECTORY):
+        raise HTTPException(status_code=422, detail=f"The ERD image must be a file uploaded to '{ERD_UPLOAD_DIRECTORY}/'.")
+    if os.path.splitext(path)[1].lower() not in ERD_EXTENSIONS or not os.path.isfile(path):
+        raise HTTPException(status_code=422, detail="The ERD image does not exist or is not a PNG or JPEG file.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config("PYTHON_SANDBOX", default=True, cast=bool):
+        start_sandbox_pool()
+    start_report_workers()
+    yield
+    await dispose_async_engines()
+
+
+app = FastAPI(title="AI Reporting API", lifespan=lifespan, dependencies=[Depends(require_api_key)])
+
+
+def _job_or_404(job):
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    return ReportJob.from_job(job)
+
+
+@app.post("/reports", response_model=ReportJob, status_code=202)
+async def submit_report(request: ReportRequest):
+    if not await asyncio.to_thread(if_db_exist, request.dataset):
+        raise HTTPException(status_code=404, detail=f"Dataset '{request.dataset}' is not registered.")
+    if await asyncio.to_thread(pending_job_count) >= MAX_QUEUED_REPORTS:
+        raise HTTPException(status_code=429, detail="Too many reports are queued. Retry later.")
+
+    # An identical report that is still queued or running is shared instead of run twice
+    job_id = await asyncio.to_thread(enqueue_report, request.dataset, request.query)
+    return _job_or_404(await asyncio.to_thread(get_job, job_id))
+
+
+@app.get("/reports/{job_id}", response_model=ReportJob)
+async def get_report_job(job_id: str):
+    return _job_or_404(await asyncio.to_thread(get_job, job_id))
+
+
+@app.delete("/reports/{job_id}", response_model=ReportJob)
+async def cancel_report_job(job_id: str):
+    if not await asyncio.to_thread(cancel_job, job_id):
+        raise HTTPException(status_code=409, detail="The job is unknown or already finished.")
+    return _job_or_404(await asyncio.to_thread(get_job, job_id))
+
+
+@app.get("/images/{image_hash}")
+async def get_image(image_hash: str):
+    image = await asyncio.to_thread(read_image_by_hash, image_hash.lower())
+    if image is None:
+        raise HTTPException(status_code=404, detail="Unknown image.")
+    data, media_type = image
+    # Stored images are named by their content, so they never change
+    return Response(content=data, media_type=media_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+def _mask_connection_string(connection_string):
+    try:
+        return make_url(connection_string).render_as_string(hide_password=True)
+    except Exception:
+        return "***"
+
+
+@app.get("/datasets")
+async def list_datasets():
+    datasets = await asyncio.to_thread(get_all_file_info, False)
+    for dataset in datasets:
+        dataset["connection_string"] = _mask_connection_string(dataset["connection_string"])
+    return datasets
+
+
+@app.post("/datasets", status_code=201)
+async def register_dataset(data_dictionary: DataDictionary):
+    _check_connection_string(data_dictionary.connection_string)
+    _check_erd_path(data_dictionary.erd_path)
+    if await asyncio.to_thread(if_db_exist, data_dictionary.db_name):
+        raise HTTPException(status_code=409, detail=f"Dataset '{data_dictionary.db_name}' already exists.")
+    await asyncio.to_thread(insert_db_info, data_dictionary.model_dump())
+    if not await asyncio.to_thread(if_db_exist, data_dictionary.db_name):
+        raise HTTPException(status_code=500, detail="The dataset could not be saved.")
+    return {"db_name": data_dictionary.db_name}
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "pending_reports": await asyncio.to_thread(pending_job_count),
+        "connection_pools": get_pool_metrics(),
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # One worker process per instance; instances sharing the data/ directory can run behind a
+    # load balancer. Listens on localhost unless REPORT_API_HOST says otherwise.
+    uvicorn.run(app, host=config("REPORT_API_HOST", default="127.0.0.1"), port=config("REPORT_API_PORT", default=8000, cast=int))
@@ -0,0 +1,194 @@
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+
+# Snake_case Chinook schema, as used by queries.md. Columns are
+# (name, SQL type, description, primary key, foreign key).
+CHINOOK_TABLES = {
+    "artist": ("Music artists", [
+        ("artist_id", "INTEGER", "Unique identifier of the artist", "Yes", None),
+        ("name", "TEXT", "Name of the artist", None, None),
+    ]),
+    "album": ("Albums released by artists", [
+        ("album_id", "INTEGER", "Unique identifier of the album", "Yes", None),
+        ("title", "TEXT", "Title of the album", None, None),
+        ("artist_id", "INTEGER", "Artist who released the album", None, "artist.artist_id"),
+    ]),
+    "genre": ("Music genres", [
+        ("genre_id", "INTEGER", "Unique identifier of the genre", "Yes", None),
+        ("name", "TEXT", "Name of the genre", None, None),
+    ]),
+    "media_type": ("Media formats of tracks", [
+        ("media_type_id", "INTEGER", "Unique identifier of the media type", "Yes", None),
+        ("name", "TEXT", "Name of the media type", None, None),
+    ]),
+    "track": ("Tracks available for sale", [
+        ("track_id", "INTEGER", "Unique identifier of the track", "Yes", None),
+        ("name", "TEXT", "Name of the track", None, None),
+        ("album_id", "INTEGER", "Album the track belongs to", None, "album.album_id"),
+        ("media_type_id", "INTEGER", "Media type of the track", None, "media_type.media_type_id"),
+        ("genre_id", "INTEGER", "Genre of the track", None, "genre.genre_id"),
+        ("composer", "TEXT", "Composer of the track", None, None),
+        ("milliseconds", "INTEGER", "Length of the track in milliseconds", None, None),
+        ("bytes", "INTEGER", "File size of the track in bytes", None, None),
+        ("unit_price", "NUMERIC", "Price of one copy of the track", None, None),
+    ]),
+    "playlist": ("Playlists", [
+        ("playlist_id", "INTEGER", "Unique identifier of the playlist", "Yes", None),
+        ("name", "TEXT", "Name of the playlist", None, None),
+    ]),
+    "playlist_track": ("Tracks on each playlist", [
+        ("playlist_id", "INTEGER", "Playlist", "Yes", "playlist.playlist_id"),
+        ("track_id", "INTEGER", "Track on the playlist", "Yes", "track.track_id"),
+    ]),
+    "employee": ("Employees of the music store", [
+        ("employee_id", "INTEGER", "Unique identifier of the employee", "Yes", None),
+        ("last_name", "TEXT", "Last name of the employee", None, None),
+        ("first_name", "TEXT", "First name of the employee", None, None),
+        ("title", "TEXT", "Job title", None, None),
+        ("reports_to", "INTEGER", "Manager of the employee", None, "employee.employee_id"),
+        ("hire_date", "TEXT", "Date the employee was hired", None, None),
+        ("city", "TEXT", "City the employee lives in", None, None),
+        ("country", "TEXT", "Country the employee lives in", None, None),
+        ("email", "TEXT", "Email address of the employee", None, None),
+    ]),
+    "customer": ("Customers of the music store", [
+        ("customer_id", "INTEGER", "Unique identifier of the customer", "Yes", None),
+        ("first_name", "TEXT", "First name of the customer", None, None),
+        ("last_name", "TEXT", "Last name of the customer", None, None),
+        ("company", "TEXT", "Company of the customer, if any", None, None),
+        ("city", "TEXT", "City the customer lives in", None, None),
+        ("country", "TEXT", "Country the customer lives in", None, None),
+        ("email", "TEXT", "Email address of the customer", None, None),
+        ("support_rep_id", "INTEGER", "Employee who supports the customer", None, "employee.employee_id"),
+    ]),
+    "invoice": ("Invoices issued to customers", [
+        ("invoice_id", "INTEGER", "Unique identifier of the invoice", "Yes", None),
+        ("customer_id", "INTEGER", "Customer who was invoiced", None, "customer.customer_id"),
+        ("invoice_date", "TEXT", "Date of the invoice", None, None),
+        ("billing_city", "TEXT", "Billing city", None, None),
+        ("billing_country", "TEXT", "Billing country", None, None),
+        ("total", "NUMERIC", "Total amount of the invoice", None, None),
+    ]),
+    "invoice_line": ("Tracks sold on each invoice", [
+        ("invoice_line_id", "INTEGER", "Unique identifier of the invoice line", "Yes", None),
+        ("invoice_id", "INTEGER", "Invoice the line belongs to", None, "invoice.invoice_id"),
+        ("track_id", "INTEGER", "Track sold", None, "track.track_id"),
+        ("unit_price", "NUMERIC", "Price of one copy", None, None),
+        ("quantity", "INTEGER", "Number of copies sold", None, None),
+    ]),
+}
+
+GENRES = ["Rock", "Jazz", "Metal", "Alternative & Punk", "Rock And Roll", "Blues", "Latin", "Reggae", "Pop", "Soundtrack", "Classical"]
+MEDIA_TYPES = ["MPEG audio file", "Protected AAC audio file", "Protected MPEG-4 video file", "Purchased AAC audio file", "AAC audio file"]
+CITIES = [("Berlin", "Germany"), ("Paris", "France"), ("London", "United Kingdom"), ("Prague", "Czech Republic"), ("Toronto", "Canada"),
+          ("São Paulo", "Brazil"), ("Dublin", "Ireland"), ("Oslo", "Norway"), ("Chicago", "USA"), ("Sydney", "Australia")]
+FIRST_NAMES = ["Luís", "Leonie", "François", "Bjørn", "Helena", "Daan", "Kara", "Eduardo", "Alexandre", "Roberto", "Fernanda", "Mark", "Jennifer", "Frank", "Jack", "Michelle"]
+LAST_NAMES = ["Gonçalves", "Köhler", "Tremblay", "Hansen", "Holý", "Peeters", "Nielsen", "Martins", "Rocha", "Almeida", "Ramos", "Philips", "Peterson", "Harris", "Smith", "Brooks"]
+WORDS = ["Night", "Fire", "Blue", "Road", "Dream", "Stone", "River", "Heart", "Light", "Storm", "Gold", "Rain", "Wild", "City", "Echo", "Dust"]
+
+
+def _title(rng, words=2):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _rows(scale, seed):
+    """Deterministic Chinook-shaped rows; `scale` multiplies the row counts of the original."""
+    rng = random.Random(seed)
+    counts = {"artist": 275, "album": 347, "track": 3503, "playlist": 18, "customer": 59, "invoice": 412}
+    counts = {table: max(1, int(count * scale)) for table, count in counts.items()}
+
+    rows = {
+        "genre": [(index + 1, name) for index, name in enumerate(GENRES)],
+        "media_type": [(index + 1, name) for index, name in enumerate(MEDIA_TYPES)],
+        "artist": [(index + 1, f"{_title(rng)} Band {index + 1}") for index in range(counts["artist"])],
+    }
+    rows["album"] = [(index + 1, _title(rng, 3), rng.randint(1, counts["artist"])) for index in range(counts["album"])]
+    rows["track"] = [
+        (index + 1, _title(rng, 2), rng.randint(1, counts["album"]), rng.randint(1, len(MEDIA_TYPES)), rng.randint(1, len(GENRES)),
+         rng.choice([None, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"]), rng.randint(60_000, 600_000),
+         rng.randint(1_000_000, 12_000_000), rng.choice([0.99, 1.99]))
+        for index in range(counts["track"])
+    ]
+    rows["playlist"] = [(index + 1, f"{_title(rng, 1)} Mix") for index in range(counts["playlist"])]
+    rows["playlist_track"] = sorted({(rng.randint(1, counts["playlist"]), rng.randint(1, counts["track"])) for _ in range(counts["track"] * 2)})
+
+    titles = ["General Manager", "Sales Manager", "IT Manager", "Sales Support Agent", "Sales Support Agent", "Sales Support Agent", "IT Staff", "IT Staff"]
+    rows["employee"] = []
+    for index, title in enumerate(titles):
+        city, country = rng.choice(CITIES)
+        reports_to = None if index == 0 else (2 if title == "Sales Support Agent" else 1)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows["employee"].append((index + 1, last_name, first_name, title, reports_to, str(date(2002, 1, 1) + timedelta(days=rng.randint(0, 900))),
+                                 city, country, f"{first_name.lower()}@chinookcorp.com"))
+
+    rows["customer"] = []
+    for index in range(counts["customer"]):
+        city, country = CITIES[index % len(CITIES)]
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows["customer"].append((index + 1, first_name, last_name, rng.choice([None, None, f"{_title(rng, 1)} Corp"]), city, country,
+                                 f"{first_name.lower()}.{index + 1}@example.com", rng.choice([3, 4, 5])))
+
+    rows["invoice"], rows["invoice_line"] = [], []
+    for index in range(counts["invoice"]):
+        invoice_id = index + 1
+        customer = rows["customer"][rng.randrange(len(rows["customer"]))]
+        lines = [(rng.randint(1, counts["track"]), rng.choice([0.99, 1.99]), 1) for _ in range(rng.choice([1, 2, 4, 6, 9, 14]))]
+        for track_id, unit_price, quantity in lines:
+            rows["invoice_line"].append((len(rows["invoice_line"]) + 1, invoice_id, track_id, unit_price, quantity))
+        rows["invoice"].append((invoice_id, customer[0], str(date(2021, 1, 1) + timedelta(days=rng.randint(0, 3 * 365))), customer[4], customer[5],
+                                round(sum(unit_price * quantity for _, unit_price, quantity in lines), 2)))
+    return rows
+
+
+def build_chinook_sqlite(database_path, scale=1.0, seed=0):
+    """Create (or replace) a synthetic Chinook SQLite database and return its connection string."""
+    os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+    if os.path.exists(database_path):
+        os.remove(database_path)
+
+    rows = _rows(scale, seed)
+    connection = sqlite3.connect(database_path)
+    try:
+        for table, (_, columns) in CHINOOK_TABLES.items():
+            primary_key = [name for name, _, _, is_key, _ in columns if is_key]
+            definitions = [f"{name} {sql_type}" for name, sql_type, _, _, _ in columns]
+            definitions.append(f"PRIMARY KEY ({', '.join(primary_key)})")
+            connection.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+            connection.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' for _ in columns)})", rows[table])
+        connection.commit()
+    finally:
+        connection.close()
+    return f"sqlite:///{os.path.abspath(database_path)}"
+
+
+def chinook_data_dictionary(db_name, connection_string, erd_path, sample_rows=3):
+    """Data dictionary in the shape insert_db_info expects, with sample rows read from the database."""
+    database_path = connection_string[len("sqlite:///"):]
+    connection = sqlite3.connect(database_path)
+    try:
+        tables = []
+        for table, (description, columns) in CHINOOK_TABLES.items():
+            names = [name for name, _, _, _, _ in columns]
+            samples = connection.execute(f"SELECT * FROM {table} LIMIT {sample_rows}").fetchall()
+            tables.append({
+                "name": table,
+                "description": description,
+                "columns": [
+                    {"name": name, "description": text, "data_type": sql_type.lower(), "primary_key": is_key, "foreign_key": foreign_key}
+                    for name, sql_type, text, is_key, foreign_key in columns
+                ],
+                "sample_data": [dict(zip(names, row)) for row in samples],
+            })
+    finally:
+        connection.close()
+
+    return {
+        "db_name": db_name,
+        "description": "Synthetic copy of the Chinook digital music store, generated for benchmarks",
+        "connection_string": connection_string,
+        "erd_path": erd_path,
+        "tables": tables,
+    }
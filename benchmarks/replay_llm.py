@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Any, Callable, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from nodes.result_summarizer import count_tokens
+
+
+REPLAY = "replay"
+RECORD = "record"
+
+
+class Cassette:
+    """Recorded model responses in a JSON file, keyed by a hash of the request."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as cassette_file:
+                self.entries = json.load(cassette_file)
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock:
+            with open(self.path, "w") as cassette_file:
+                json.dump(self.entries, cassette_file, indent=1, sort_keys=True)
+
+
+def _content_key(content):
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content:
+        if isinstance(part, dict) and part.get("type") == "image_url":
+            # Data URLs are large; their hash identifies the image just as well
+            url = part["image_url"]["url"] if isinstance(part["image_url"], dict) else part["image_url"]
+            parts.append("image:" + hashlib.sha256(url.encode("utf-8")).hexdigest())
+        else:
+            parts.append(json.dumps(part, sort_keys=True, default=str))
+    return "\n".join(parts)
+
+
+def request_key(model_name, messages, tools=None):
+    payload = {
+        "model": model_name,
+        "messages": [[message.type, _content_key(message.content)] for message in messages],
+        "tools": sorted(tool["function"]["name"] for tool in tools or []),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _prompt_text(messages):
+    return "\n".join(_content_key(message.content) for message in messages)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Stand-in for ChatOpenAI that answers from a cassette instead of the network.
+
+    In replay mode a request missing from the cassette is answered by `responder`
+    (request details -> content string or {"tool": name, "args": {...}}). In record mode
+    requests go to `recorder`, a real chat model, and the answers are added to the
+    cassette. Every call sleeps for a simulated latency of `latency_ms` plus
+    `ms_per_token` per completion token, and reports token usage so traces can count it.
+    """
+
+    model_name: str = "gpt-4o"
+    mode: str = REPLAY
+    cassette: Any = None
+    responder: Optional[Callable] = None
+    recorder: Optional[Callable] = None
+    latency_ms: float = 0.0
+    ms_per_token: float = 0.0
+    # ChatOpenAI arguments of the calling node, used to build the real model when recording
+    init_kwargs: dict = {}
+
+    @property
+    def _llm_type(self):
+        return "replay-chat-model"
+
+    @property
+    def _identifying_params(self):
+        return {"model_name": self.model_name}
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        params = super()._get_ls_params(stop=stop, **kwargs)
+        params["ls_model_name"] = self.model_name
+        return params
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+
+    def with_structured_output(self, schema, *, include_raw=False, method=None, strict=None, **kwargs):
+        # ChatOpenAI options such as method="function_calling" do not apply here
+        return super().with_structured_output(schema, include_raw=include_raw, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tools = kwargs.get("tools")
+        key = request_key(self.model_name, messages, tools)
+        entry = self.cassette.get(key) if self.cassette is not None and self.mode == REPLAY else None
+
+        if entry is None and self.mode == RECORD:
+            entry = self._record(messages, kwargs)
+            if self.cassette is not None:
+                self.cassette.put(key, entry)
+        elif entry is None:
+            metadata = run_manager.metadata if run_manager is not None else {}
+            entry = self._respond(messages, tools, metadata)
+
+        message = self._message(entry, messages)
+        if self.mode == REPLAY and (self.latency_ms or self.ms_per_token):
+            time.sleep((self.latency_ms + self.ms_per_token * message.usage_metadata["output_tokens"]) / 1000)
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"model_name": self.model_name})
+
+    def _respond(self, messages, tools, metadata):
+        answer = self.responder({
+            "node": metadata.get("langgraph_node"),
+            "prompt": _prompt_text(messages),
+            "tools": [tool["function"]["name"] for tool in tools or []],
+        }) if self.responder is not None else ""
+        if isinstance(answer, dict):
+            return {"content": "", "tool_calls": [{"name": answer["tool"], "args": answer["args"]}]}
+        return {"content": answer, "tool_calls": []}
+
+    def _record(self, messages, kwargs):
+        model = self.recorder(self.init_kwargs)
+        if kwargs.get("tools"):
+            model = model.bind(**{key: value for key, value in kwargs.items() if key in ("tools", "tool_choice")})
+        started = time.perf_counter()
+        response = model.invoke(messages)
+        return {
+            "content": response.content,
+            "tool_calls": [{"name": call["name"], "args": call["args"]} for call in response.tool_calls],
+            "usage": response.usage_metadata,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _message(self, entry, messages):
+        tool_calls = [{"name": call["name"], "args": call["args"], "id": f"call_{uuid.uuid4().hex[:12]}"} for call in entry.get("tool_calls", [])]
+        usage = entry.get("usage")
+        if not usage:
+            output_tokens = count_tokens(entry["content"] or json.dumps([call["args"] for call in tool_calls]))
+            input_tokens = count_tokens(_prompt_text(messages))
+            usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return AIMessage(content=entry["content"], tool_calls=tool_calls, usage_metadata=usage)
+
+
+def chat_model_factory(cassette, mode=REPLAY, responder=None, latency_ms=0.0, ms_per_token=0.0):
+    """A drop-in for the ChatOpenAI constructor as the nodes call it."""
+    def recorder(init_kwargs):
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(**init_kwargs)
+
+    def create(*args, **kwargs):
+        model_name = kwargs.get("model_name") or kwargs.get("model") or "gpt-4o"
+        return ReplayChatModel(
+            model_name=model_name,
+            mode=mode,
+            cassette=cassette,
+            responder=responder,
+            recorder=recorder,
+            latency_ms=latency_ms,
+            ms_per_token=ms_per_token,
+            init_kwargs=kwargs,
+        )
+
+    return create
@@ -0,0 +1,253 @@
+# python -m benchmarks.run_benchmark [--limit N] [--repeat N] [--mode replay|record]
+#
+# Runs get_reports over the questions in queries.md against a synthetic Chinook SQLite
+# database, with ChatOpenAI replaced by a record/replay stand-in, and prints p50/p95
+# latency per node, token totals, SQL execution time and memory. Needs no network in
+# replay mode.
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+project_root = os.path.abspath(os.path.dirname(__file__) + "/..")
+benchmark_directory = os.path.join(project_root, "data", "benchmark")
+
+
+def _configure_environment(args, trace_directory):
+    # decouple reads os.environ before .env, so these win over the user's settings
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("GPT_MODEL", "gpt-4o")
+    os.environ["TRACING"] = "True"
+    os.environ["TRACE_DIR"] = trace_directory
+    # The benchmark's dataset, cached answers and charts stay out of the app's catalogue and image store
+    os.environ["METADATA_DB_PATH"] = os.path.join(benchmark_directory, "db_info.db")
+    os.environ["IMAGE_STORE_DIR"] = os.path.join(benchmark_directory, "images")
+    os.environ["SQL_RESULT_CACHE_DIR"] = os.path.join(benchmark_directory, "sql_result_cache")
+    if not args.warm_caches:
+        os.environ["ANSWER_CACHE"] = "off"
+        os.environ["SQL_RESULT_CACHE"] = "False"
+
+
+def parse_queries(path):
+    """(number, question, sql) for each numbered question in queries.md."""
+    with open(path, encoding="utf-8") as queries_file:
+        text = queries_file.read()
+    pattern = re.compile(r"^###\s*(\d+)\.\s*\*\*(.+?)\*\*\s*\n+```sql\n(.*?)```", re.MULTILINE | re.DOTALL)
+    return [(int(number), question.strip(), sql.strip()) for number, question, sql in pattern.findall(text)]
+
+
+# Values for the <placeholders> in queries.md that exist in the synthetic data
+PLACEHOLDER_VALUES = {"city_name": "Berlin"}
+
+
+def _sqlite_sql(sql):
+    import sqlglot
+
+    sql = re.sub(r"<(\w+)>", lambda match: PLACEHOLDER_VALUES.get(match.group(1), "1"), sql)
+    sql = sqlglot.transpile(sql, read="postgres", write="sqlite")[0]
+    # sqlglot keeps EXTRACT, which SQLite does not have
+    return re.sub(r"EXTRACT\((\w+) FROM ([\w.]+)\)", lambda match: f"CAST(STRFTIME('%Y', {match.group(2)}) AS INTEGER)" if match.group(1).lower() == "year" else match.group(0), sql)
+
+
+REPORT_SCRIPT = """import pandas as pd
+print("## Result")
+print(df.head(20).to_markdown(index=False))
+print(f"Rows: {len(df)}")
+"""
+
+
+def canned_responder(case):
+    """Answers each node's prompt for the current question like a well-behaved model would."""
+    from nodes import nodes_name
+    from nodes.sql_result_cache import referenced_tables
+
+    def respond(request):
+        number, question, sql = case["current"]
+        sqlite_sql = _sqlite_sql(sql)
+        tables = sorted(referenced_tables(sqlite_sql, "sqlite"))
+        node = request["node"]
+
+        if "grade" in request["tools"]:
+            return {"tool": "grade", "args": {"binary_score": "yes", "reason": "The query matches the ERD."}}
+        if "front_end_result" in request["tools"]:
+            return {"tool": "front_end_result", "args": {"is_relevant": True, "reason": "The query matches the ERD.", "rephrased_query": question, "selected_tables": tables}}
+        if request["tools"]:
+            return {"tool": request["tools"][0], "args": {"is_safe": True, "reason": "Read-only."}}
+        if node == nodes_name.RE_WRITE_QUERY:
+            return question
+        if node == nodes_name.TABLE_SELECTION:
+            return ", ".join(tables)
+        if node in (nodes_name.QUERY_GENERATION, nodes_name.RE_GENERATE_SQL_QUERY):
+            return sqlite_sql
+        if node == nodes_name.REPORT_TYPE:
+            return json.dumps({"format": "table", "headers": [], "rows": []})
+        if node in (nodes_name.PYTHON_CODE_GENERATOR, nodes_name.PYTHON_CODE_RE_GENERATION):
+            return REPORT_SCRIPT
+        if node == nodes_name.SQL_QUERY_EXECUTION_ERROR_REPORT:
+            return "The query could not be run on this database."
+        if node == nodes_name.SIMPLE_REPORT:
+            # Asked for one short paragraph next to the rendered table
+            return f"# {question}\n\n" + "The result table below answers the question. " * min(3, case["report_sentences"])
+        # Report text long enough to make completion latency visible
+        return f"# {question}\n\n" + "The result table above answers the question. " * case["report_sentences"]
+
+    return respond
+
+
+def _patch_chat_models(factory):
+    """Point every loaded module that builds ChatOpenAI models at the replay factory."""
+    from langchain_openai import ChatOpenAI
+
+    patched = []
+    for name, module in list(sys.modules.items()):
+        if getattr(module, "ChatOpenAI", None) is ChatOpenAI and (name.startswith("nodes.") or name == "reporting_graph_generator"):
+            module.ChatOpenAI = factory
+            patched.append(name)
+    return patched
+
+
+def _percentile(values, percentile):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the reporting pipeline")
+    parser.add_argument("--queries", default=os.path.join(project_root, "queries.md"))
+    parser.add_argument("--limit", type=int, default=None, help="Only run the first N questions")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per question")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay", help="record calls OpenAI and saves the answers")
+    parser.add_argument("--cassette", default=os.path.join(os.path.dirname(__file__), "cassettes", "chinook.json"))
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="Simulated time to first token per model call")
+    parser.add_argument("--ms-per-token", type=float, default=15.0, help="Simulated time per completion token")
+    parser.add_argument("--report-sentences", type=int, default=40, help="Length of the canned report text")
+    parser.add_argument("--scale", type=float, default=1.0, help="Row count multiplier of the synthetic Chinook data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm-caches", action="store_true", help="Leave the answer and SQL result caches on")
+    parser.add_argument("--trace-memory", action="store_true", help="Measure Python heap peaks with tracemalloc (slower)")
+    parser.add_argument("--output", default=None, help="Write the results as JSON")
+    args = parser.parse_args(argv)
+
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    trace_directory = os.path.join(benchmark_directory, "traces", run_id)
+    _configure_environment(args, trace_directory)
+
+    # Imported after the environment is set
+    from benchmarks.chinook_fixture import build_chinook_sqlite, chinook_data_dictionary
+    from benchmarks.replay_llm import Cassette, chat_model_factory
+    from nodes.file_manager_db import insert_db_info, if_db_exist
+    from nodes.run_tracer import load_trace, NODE, RUN
+    from nodes.nodes_name import EXECUTE_SQL_QUERY
+    from reporting_graph_generator import get_reports
+
+    dataset_name = "chinook_benchmark"
+    database_path = os.path.join(benchmark_directory, f"chinook_{args.scale:g}_{args.seed}.db")
+    if not os.path.exists(database_path):
+        build_chinook_sqlite(database_path, scale=args.scale, seed=args.seed)
+    connection_string = f"sqlite:///{os.path.abspath(database_path)}"
+    if not if_db_exist(dataset_name):
+        erd_path = os.path.join(project_root, "images", "ERD_of_Chinook_Database_origin.png")
+        insert_db_info(chinook_data_dictionary(dataset_name, connection_string, erd_path))
+
+    cases = parse_queries(args.queries)[:args.limit]
+    case = {"current": None, "report_sentences": args.report_sentences}
+    cassette = Cassette(args.cassette)
+    factory = chat_model_factory(cassette, mode=args.mode, responder=canned_responder(case), latency_ms=args.latency_ms, ms_per_token=args.ms_per_token)
+    print(f"Replacing ChatOpenAI in: {', '.join(_patch_chat_models(factory))}")
+
+    runs = []
+    for number, question, sql in cases:
+        case["current"] = (number, question, sql)
+        for repeat in range(args.repeat):
+            trace_id = f"q{number:02d}-r{repeat}"
+            if args.trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            error = None
+            try:
+                get_reports(dataset_name, question, trace_id=trace_id)
+            except Exception as e:
+                error = str(e)
+            wall_ms = (time.perf_counter() - started) * 1000
+            heap_peak_mb = None
+            if args.trace_memory:
+                heap_peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+                tracemalloc.stop()
+
+            spans = load_trace(trace_id)
+            root = next((span for span in spans if span["kind"] == RUN), {"attributes": {}})
+            runs.append({
+                "question": number,
+                "repeat": repeat,
+                "wall_ms": round(wall_ms, 1),
+                "sql_ms": round(sum(span["duration_ms"] for span in spans if span["kind"] == NODE and span["name"] == EXECUTE_SQL_QUERY), 1),
+                "prompt_tokens": root["attributes"].get("prompt_tokens", 0),
+                "completion_tokens": root["attributes"].get("completion_tokens", 0),
+                "heap_peak_mb": heap_peak_mb,
+                "error": error,
+                "nodes": [(span["name"], span["duration_ms"]) for span in spans if span["kind"] == NODE],
+            })
+            print(f"Q{number} run {repeat + 1}: {wall_ms:.0f} ms{' ERROR ' + error if error else ''}")
+
+    if args.mode == "record":
+        cassette.save()
+
+    node_durations = {}
+    for run in runs:
+        for name, duration_ms in run["nodes"]:
+            node_durations.setdefault(name, []).append(duration_ms)
+    node_stats = {
+        name: {"calls": len(values), "p50_ms": _percentile(values, 50), "p95_ms": _percentile(values, 95), "total_ms": round(sum(values), 1)}
+        for name, values in sorted(node_durations.items(), key=lambda item: -sum(item[1]))
+    }
+    wall = [run["wall_ms"] for run in runs]
+    sql = [run["sql_ms"] for run in runs]
+    summary = {
+        "runs": len(runs),
+        "errors": sum(1 for run in runs if run["error"]),
+        "wall_p50_ms": _percentile(wall, 50),
+        "wall_p95_ms": _percentile(wall, 95),
+        "sql_p50_ms": _percentile(sql, 50),
+        "sql_p95_ms": _percentile(sql, 95),
+        "prompt_tokens": sum(run["prompt_tokens"] for run in runs),
+        "completion_tokens": sum(run["completion_tokens"] for run in runs),
+        "peak_rss_mb": _peak_rss_mb(),
+        "heap_peak_mb": max((run["heap_peak_mb"] for run in runs if run["heap_peak_mb"] is not None), default=None),
+        "cassette_hits": cassette.hits,
+        "cassette_misses": cassette.misses,
+    }
+
+    print("\nPer node (ms)")
+    print(f"{'node':<40}{'calls':>7}{'p50':>10}{'p95':>10}{'total':>12}")
+    for name, stats in node_stats.items():
+        print(f"{name:<40}{stats['calls']:>7}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['total_ms']:>12.1f}")
+    print("\nSummary")
+    for key, value in summary.items():
+        print(f"{key:<20}{value}")
+    print(f"\nTraces: {trace_directory}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"arguments": vars(args), "summary": summary, "nodes": node_stats, "runs": runs}, output_file, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,13 @@ package_names = [
     "langchain-experimental",
     "streamlit",
     "sqlalchemy",
+    "sqlglot",
     "tabulate",
     "duckdb",
     "psycopg2",
+    "asyncpg",
+    "fastapi",
+    "uvicorn",
 ]
 
 # Print the Python version
@@ -1,12 +1,13 @@
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 import pandas as pd
+from nodes.engine_manager import get_engine, dispose_engine
 
 def is_connection_ok(database_url):
     try:
-        # Create a database engine
-        engine = create_engine(database_url)
+        # Get the pooled database engine
+        engine = get_engine(database_url)
         
         # Test connection
         with engine.connect() as connection:
@@ -15,14 +16,14 @@ def is_connection_ok(database_url):
         
     except SQLAlchemyError as e:
         print(f"Connection failed: {e}")
+        # Do not keep a pool around for an unusable connection string
+        dispose_engine(database_url)
         return False
-    finally:
-        engine.dispose() 
 
 def is_table_exist(database_url, table_name):
     try:
-        # Create a database engine
-        engine = create_engine(database_url)
+        # Get the pooled database engine
+        engine = get_engine(database_url)
         
         # Create an inspector
         inspector = inspect(engine)
@@ -42,15 +43,13 @@ def is_table_exist(database_url, table_name):
     except SQLAlchemyError as e:
         print(f"Error occurred: {e}")
         return False
-    finally:
-        engine.dispose() 
 
 def get_random_rows(database_url, table_name, row_count=5):
     try:
         # Construct the query to get random rows using PostgreSQL RANDOM()
         sql_query = f"SELECT * FROM {table_name} ORDER BY RANDOM() LIMIT {row_count}"
         
-        engine = create_engine(database_url)
+        engine = get_engine(database_url)
         
         df = pd.read_sql_query(sql_query, engine)
         for column in df.select_dtypes(include=["datetime", "object"]):
@@ -59,8 +58,6 @@ def get_random_rows(database_url, table_name, row_count=5):
     except SQLAlchemyError as e:
         print(f"Error occurred: {e}")
         return None
-    finally:
-        engine.dispose() 
 
 
 # Example usage
@@ -1,15 +1,10 @@
-import base64
 import json
 from langchain_core.messages import HumanMessage
 from typing import Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
+from nodes.erd_image_cache import get_erd_data_url
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-    
 class Column(BaseModel):
     """Column Details."""
     name: str = Field(description="Name of the column")
@@ -42,22 +37,19 @@ user_msg = """
 def generate_data_dictionary(erd_path) :
     print("--- GENERATE DATA DICTIONARY ---")
 
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
     IMAGE_PATH = "images\\ERD_of_Chinook_Database_origin.png"
 
 
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     structured_llm = llm.with_structured_output(Database)
-    image_data = encode_image(IMAGE_PATH)
+    image_url = get_erd_data_url(IMAGE_PATH)
 
     message = HumanMessage(
         content=[
             {"type": "text", "text": "Based on attached ERD diagram, Generate Data Dictionary"},
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"},
+                "image_url": {"url": image_url},
             },
         ],
     )
@@ -1,12 +1,20 @@
+import asyncio
+import time
 import pandas as pd
 from langgraph.graph import END
 from langchain_experimental.tools.python.tool import PythonAstREPLTool, PythonREPLTool
 from langgraph.types import Command
+from decouple import config
 from nodes.agent_state import AgentState
 from nodes.nodes_name import REPORT_GENERATION_DECISION
+from nodes.python_sandbox import run_python_script
+from nodes.image_store import store_report_images
 
 def run_python_code(state: AgentState) -> AgentState:
     print("--- PYTHON CODE EXECUTER ---")
+    if config("PYTHON_SANDBOX", default=True, cast=bool):
+        return run_python_code_in_sandbox(state)
+
     try: 
         Python_script = state['Python_Code']
         
@@ -15,7 +23,7 @@ def run_python_code(state: AgentState) -> AgentState:
         df_locals["df"] = df
         python_repl = PythonAstREPLTool(locals=df_locals)
     
-    
+        started_at = time.time()
         results = python_repl.run(Python_script)     
         if "error:" in results.lower():
             return Command(
@@ -25,12 +33,14 @@ def run_python_code(state: AgentState) -> AgentState:
                 goto=REPORT_GENERATION_DECISION
             ) 
         else:
+            results, images = store_report_images(results, since=started_at)
             print(f"Execution Results:\n{results}")
             # with open("reports_from_python.md", "w") as file:
             #     file.write(results)
             return Command(
                 update={
                     "execution_results": results,
+                    "execution_images": images,
                     "execution_error": None
                 },
                 goto=REPORT_GENERATION_DECISION
@@ -41,4 +51,35 @@ def run_python_code(state: AgentState) -> AgentState:
                 "execution_error": str(e)
             },
             goto=REPORT_GENERATION_DECISION
-        ) 
\ No newline at end of file
+        ) 
+
+
+def run_python_code_in_sandbox(state: AgentState) -> AgentState:
+    started_at = time.time()
+    results = run_python_script(state['Python_Code'], state["data_frame"])
+
+    if results["error"]:
+        print(f"Execution Error: {results['error']}")
+        return Command(
+            update={
+                "execution_error": results["error"]
+            },
+            goto=REPORT_GENERATION_DECISION
+        )
+
+    # Charts the script saved under images/ move into the content-addressed store
+    output, images = store_report_images(results["output"], since=started_at)
+    print(f"Execution Results:\n{output}")
+    return Command(
+        update={
+            "execution_results": output,
+            "execution_images": images,
+            "execution_error": None
+        },
+        goto=REPORT_GENERATION_DECISION
+    )
+
+
+async def arun_python_code(state: AgentState) -> AgentState:
+    # The sandbox call blocks until its worker process answers, so wait for it off the event loop
+    return await asyncio.to_thread(run_python_code, state)
@@ -6,17 +6,17 @@ from langchain.prompts.chat import (
     SystemMessagePromptTemplate,
 )
 from langchain.schema import StrOutputParser
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
 from langgraph.types import Command
 from nodes.nodes_name import SANITIZE_PYTHON_SCRIPT
 from nodes.agent_state import AgentState
+from nodes.dataset_schema import render_schema
+from nodes.result_summarizer import get_data_frame_summary
 
 
-def get_schema(db_info, selected_tables):
-    tables = db_info["details"]
-    selected_info = [table for table in tables if table["table_name"] in selected_tables]
-    return selected_info
+# Used when get_report_type is skipped (FOLD_REPORT_TYPE), so the script picks the layout itself
+FOLDED_REPORT_TYPE = "the most suitable of a 'bar', 'line', 'pie', 'scatter' or 'heatmap' chart, a table, or a plain text message"
+
 
 sys_msg = """
         1. Based on user query, SQL query is:
@@ -31,17 +31,12 @@ sys_msg = """
         7. Generate a single output results as string based on above Report Type and Execution Results and Print the output results using `print(...)`
     """
 
-def generate_Python_code(state: AgentState):
-    print("--- PYTHON CODE GENERATOR ---")
-    
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _Python_code_chain(state: AgentState):
     rephrased_query = state["rephrased_query"]
-    db_schema = get_schema(state["db_info"], state["selected_tables"])
+    db_schema = render_schema(state["db_info"], state["selected_tables"], include_samples=False)
     SQL_query = state["SQL_query"]
-    report_type= state["report_type"]
-    df = state["data_frame"]
+    report_type= state.get("report_type") or FOLDED_REPORT_TYPE
+    df_summary = get_data_frame_summary(state)
 
     rephrased_query = f"""
         {rephrased_query}
@@ -59,15 +54,16 @@ def generate_Python_code(state: AgentState):
         ]
     )
 
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
 
     chain = prompt | llm | StrOutputParser()
-    
-    code = chain.invoke({"SQL_query": SQL_query, 
-                         "column_descriptions": str(db_schema),
-                         "execution_results": str(df),
-                         "report_type": report_type})
+    return chain, {"SQL_query": SQL_query, 
+                   "column_descriptions": db_schema,
+                   "execution_results": df_summary,
+                   "report_type": report_type}
 
+
+def _Python_code_command(code):
     print(f"Python Code:\n{code}")
     return Command(
         update={
@@ -75,4 +71,16 @@ def generate_Python_code(state: AgentState):
             "execution_error": None,
         },
         goto = SANITIZE_PYTHON_SCRIPT
-    )
\ No newline at end of file
+    )
+
+
+def generate_Python_code(state: AgentState):
+    print("--- PYTHON CODE GENERATOR ---")
+    chain, inputs = _Python_code_chain(state)
+    return _Python_code_command(chain.invoke(inputs))
+
+
+async def agenerate_Python_code(state: AgentState):
+    print("--- PYTHON CODE GENERATOR ---")
+    chain, inputs = _Python_code_chain(state)
+    return _Python_code_command(await chain.ainvoke(inputs))
@@ -14,8 +14,8 @@ from nodes.nodes_name import (
     PYTHON_CODE_RE_GENERATION,
     REPORTS_COMBINER
 )
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
+from nodes.python_script_checker import check_python_script, SAFE, AMBIGUOUS
 
 sys_msg = """
     You are an expert in Python script security. Your task is to analyze a given Python script and determine whether it is safe to execute.
@@ -35,10 +35,36 @@ class sanitizing_script(BaseModel):
     is_safe: bool
     reason: str
 
+def _llm_sanitize_chain(python_script):
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            SystemMessage(content=sys_msg),
+            HumanMessage(content=f"""Python script: {python_script}""")
+        ]
+    )
+
+    llm = get_chat_model()
+
+    return prompt | llm.with_structured_output(
+        schema=sanitizing_script,
+        method="function_calling",
+        include_raw=False,
+    )
+
+
+def llm_sanitize_python_script(python_script) -> sanitizing_script:
+    return _llm_sanitize_chain(python_script).invoke({'input': ''})
+
+
+async def allm_sanitize_python_script(python_script) -> sanitizing_script:
+    return await _llm_sanitize_chain(python_script).ainvoke({'input': ''})
+
+
 def sanitize_python_script(state:AgentState) -> Command[Literal[ PYTHON_CODE_EXECUTER, PYTHON_CODE_RE_GENERATION, END]]:
     """
-    This function uses OpenAI's LLM to sanitize a given Python script, allowing only 'SAFE' execution.
-    Any harmful or malicious elements will be flagged as unsafe.
+    This function statically checks a given Python script, allowing only 'SAFE' execution.
+    Any harmful or malicious elements will be flagged as unsafe. Only scripts the static
+    checker cannot decide on are sent to OpenAI's LLM for review.
 
     Parameters:
     script (str): The Python script to be sanitized.
@@ -47,30 +73,40 @@ def sanitize_python_script(state:AgentState) -> Command[Literal[ PYTHON_CODE_EXE
     bool: True if the Python script is valid (safe to execute), False otherwise.
     """
     print("--- SANITIZE PYTHON SCRIPT ---")
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
 
     python_script = state['Python_Code']
+
+    verdict, reason = check_python_script(python_script)
+    print(f"------ Static script check: {verdict} ({reason})\n")
+
+    if verdict == AMBIGUOUS:
+        response = llm_sanitize_python_script(python_script)
+    else:
+        response = sanitizing_script(is_safe=verdict == SAFE, reason=reason)
+
+    return _sanitize_command(state, response)
+
+
+async def asanitize_python_script(state:AgentState) -> Command[Literal[ PYTHON_CODE_EXECUTER, PYTHON_CODE_RE_GENERATION, END]]:
+    print("--- SANITIZE PYTHON SCRIPT ---")
+
+    python_script = state['Python_Code']
+
+    verdict, reason = check_python_script(python_script)
+    print(f"------ Static script check: {verdict} ({reason})\n")
+
+    if verdict == AMBIGUOUS:
+        response = await allm_sanitize_python_script(python_script)
+    else:
+        response = sanitizing_script(is_safe=verdict == SAFE, reason=reason)
+
+    return _sanitize_command(state, response)
+
+
+def _sanitize_command(state: AgentState, response: sanitizing_script):
     Python_script_check = state['Python_script_check']
     max_Python_script_check = state['max_Python_script_check']
-    
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            SystemMessage(content=sys_msg),
-            HumanMessage(content=f"""Python script: {python_script}""")
-        ]
-    )
-
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
 
-    sanitize_chain = prompt | llm.with_structured_output(
-        schema=sanitizing_script,
-        method="function_calling",
-        include_raw=False,
-    )
-    
-    response = sanitize_chain.invoke({'input': ''})
-    
     if response.is_safe == True:
         # state.update({
         #     "script_security_issues": None,
@@ -18,6 +18,8 @@ class AgentState(TypedDict):
     sql_generation_try: int
     max_sql_generation_try: int
     data_frame: pd.DataFrame
+    data_frame_summary: str
+    data_truncated: bool
     report_from_embeddings:str
     Python_Code: str
     Python_script_check: int
@@ -25,6 +27,9 @@ class AgentState(TypedDict):
     max_Python_script_check: int
     script_security_issues:str
     execution_results: str
+    execution_images: list[str]
     Python_code_generated_report: str
     report_type: str
-    reports: str
\ No newline at end of file
+    reports: str
+    cached_answer: dict
+    report_from_cache: bool
\ No newline at end of file
@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import time
+import hashlib
+import unicodedata
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Integer, String, Float, Text, UniqueConstraint
+from sqlalchemy.exc import SQLAlchemyError
+from decouple import config
+from nodes.file_manager_db import Base, Session, engine
+from nodes.dataset_settings import get_dataset_setting
+
+
+# What a cache hit reuses: the stored report, the stored SQL (re-executed), or nothing
+MODE_REPORT = "report"
+MODE_SQL = "sql"
+MODE_OFF = "off"
+
+IMAGE_PATTERN = re.compile(r'!\[.*?\]\((.*?)\)')
+
+
+class AnswerCacheEntry(Base):
+    __tablename__ = "answer_cache"
+    __table_args__ = (UniqueConstraint("db_name", "normalized_query"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    db_name = Column(String, nullable=False, index=True)
+    normalized_query = Column(String, nullable=False)
+    query_embedding = Column(Text, nullable=True)
+    rephrased_query = Column(String, nullable=False)
+    selected_tables = Column(String, nullable=False)
+    sql_query = Column(Text, nullable=False)
+    result_fingerprint = Column(String, nullable=True)
+    report = Column(Text, nullable=False)
+    db_info_fingerprint = Column(String, nullable=False)
+    created_at = Column(Float, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AnswerCacheEntry(db_name='{self.db_name}', normalized_query='{self.normalized_query}')>"
+
+
+# file_manager_db has already run create_all, so add this table on its own
+AnswerCacheEntry.__table__.create(engine, checkfirst=True)
+
+
+def get_cache_mode(db_name):
+    mode = str(get_dataset_setting(db_name, "answer_cache", config("ANSWER_CACHE", default=MODE_OFF))).lower()
+    return mode if mode in (MODE_REPORT, MODE_SQL) else MODE_OFF
+
+
+def normalize_query(query):
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"[^\w\s]", " ", query)
+    return " ".join(query.split())
+
+
+def db_info_fingerprint(db_info):
+    # Any change to the dataset's registered description invalidates its answers
+    return hashlib.sha256(json.dumps(db_info, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def result_fingerprint(df):
+    if df is None:
+        return None
+    digest = hashlib.sha256(json.dumps([str(column) for column in df.columns]).encode("utf-8"))
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    except TypeError:
+        # Unhashable cells (lists, dicts) fall back to their text form
+        digest.update(df.to_csv(index=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _use_embeddings():
+    return config("ANSWER_CACHE_EMBEDDINGS", default=False, cast=bool)
+
+
+def _embed(text):
+    from langchain_openai import OpenAIEmbeddings
+
+    embeddings = OpenAIEmbeddings(
+        model=config("ANSWER_CACHE_EMBEDDING_MODEL", default="text-embedding-3-small"),
+        openai_api_key=config("OPENAI_API_KEY"),
+    )
+    return embeddings.embed_query(text)
+
+
+def _images_exist(report):
+    # A stored report is only reusable while the charts it links to are still on disk
+    return all(os.path.exists(path.strip()) for path in IMAGE_PATTERN.findall(report))
+
+
+def _entry_to_dict(entry):
+    return {
+        "rephrased_query": entry.rephrased_query,
+        "selected_tables": entry.selected_tables,
+        "sql_query": entry.sql_query,
+        "result_fingerprint": entry.result_fingerprint,
+        "report": entry.report,
+    }
+
+
+def _find_similar(entries, query):
+    try:
+        query_vector = np.asarray(_embed(query), dtype=float)
+    except Exception as e:
+        print(f"Answer cache embedding lookup skipped: {e}")
+        return None
+
+    threshold = config("ANSWER_CACHE_SIMILARITY", default=0.95, cast=float)
+    best_entry, best_score = None, threshold
+    for entry in entries:
+        if not entry.query_embedding:
+            continue
+        vector = np.asarray(json.loads(entry.query_embedding), dtype=float)
+        score = float(np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector) or 1.0))
+        if score >= best_score:
+            best_entry, best_score = entry, score
+    return best_entry
+
+
+def lookup_answer(db_info, query):
+    """
+    Find a cached answer for `query` on the dataset described by `db_info`.
+
+    Parameters:
+    db_info (dict): Dataset details as returned by get_db_info_by_dataset.
+    query (str): The user's question.
+
+    Returns:
+    dict or None: rephrased_query, selected_tables, sql_query, result_fingerprint and report
+    of the cached answer, or None on a miss.
+    """
+    db_name = db_info["db_name"].lower()
+    ttl_seconds = get_dataset_setting(db_name, "answer_cache_ttl_seconds", config("ANSWER_CACHE_TTL_SECONDS", default=86400, cast=int))
+    fingerprint = db_info_fingerprint(db_info)
+    normalized_query = normalize_query(query)
+
+    session = Session()
+    try:
+        # Drop answers that expired or were built against an older dataset description
+        session.query(AnswerCacheEntry).filter(
+            AnswerCacheEntry.db_name == db_name,
+            (AnswerCacheEntry.created_at < time.time() - ttl_seconds) | (AnswerCacheEntry.db_info_fingerprint != fingerprint),
+        ).delete(synchronize_session=False)
+
+        entry = session.query(AnswerCacheEntry).filter_by(db_name=db_name, normalized_query=normalized_query).first()
+        if entry is None and _use_embeddings():
+            entries = session.query(AnswerCacheEntry).filter_by(db_name=db_name).all()
+            entry = _find_similar(entries, query)
+
+        if entry is not None:
+            entry.hit_count += 1
+            answer = _entry_to_dict(entry)
+        else:
+            answer = None
+        session.commit()
+        return answer
+    except SQLAlchemyError as e:
+        session.rollback()
+        print(f"Answer cache lookup failed: {e}")
+        return None
+    finally:
+        session.close()
+
+
+def report_is_reusable(answer):
+    return bool(answer and answer["report"]) and _images_exist(answer["report"])
+
+
+def store_answer(db_info, query, rephrased_query, selected_tables, sql_query, report, df=None):
+    db_name = db_info["db_name"].lower()
+    normalized_query = normalize_query(query)
+
+    query_embedding = None
+    if _use_embeddings():
+        try:
+            query_embedding = json.dumps(_embed(query))
+        except Exception as e:
+            print(f"Answer cache embedding skipped: {e}")
+
+    session = Session()
+    try:
+        entry = session.query(AnswerCacheEntry).filter_by(db_name=db_name, normalized_query=normalized_query).first()
+        if entry is None:
+            entry = AnswerCacheEntry(db_name=db_name, normalized_query=normalized_query, hit_count=0)
+            session.add(entry)
+        entry.query_embedding = query_embedding or entry.query_embedding
+        entry.rephrased_query = rephrased_query
+        entry.selected_tables = selected_tables
+        entry.sql_query = sql_query
+        entry.result_fingerprint = result_fingerprint(df)
+        entry.report = report
+        entry.db_info_fingerprint = db_info_fingerprint(db_info)
+        entry.created_at = time.time()
+        session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        print(f"Answer cache store failed: {e}")
+    finally:
+        session.close()
+
+
+def stored_reports():
+    """Every cached report, for the image store's garbage collection."""
+    session = Session()
+    try:
+        for (report,) in session.query(AnswerCacheEntry.report).yield_per(200):
+            yield report
+    finally:
+        session.close()
+
+
+def clear_answer_cache(db_name=None):
+    session = Session()
+    try:
+        entries = session.query(AnswerCacheEntry)
+        if db_name is not None:
+            entries = entries.filter(AnswerCacheEntry.db_name == db_name.lower())
+        entries.delete(synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
@@ -0,0 +1,81 @@
+import asyncio
+from langgraph.types import Command
+from nodes.agent_state import AgentState
+from nodes.graph_options import front_end_entry
+from nodes.nodes_name import SANITIZE_SQL_QUERY, ANSWER_CACHE_STORE
+from nodes.answer_cache import (
+    MODE_OFF,
+    MODE_REPORT,
+    get_cache_mode,
+    lookup_answer,
+    report_is_reusable,
+    store_answer,
+)
+
+
+def lookup_cached_answer(state: AgentState) -> AgentState:
+    print("--- ANSWER CACHE LOOKUP ---")
+    db_name = state["db_name"]
+    mode = get_cache_mode(db_name)
+
+    answer = None if mode == MODE_OFF else lookup_answer(state["db_info"], state["query"])
+    if answer is None:
+        return Command(goto=front_end_entry())
+
+    if mode == MODE_REPORT and report_is_reusable(answer):
+        print("------ Reusing cached report ------")
+        return Command(
+            update={
+                "is_query_relevant": True,
+                "rephrased_query": answer["rephrased_query"],
+                "selected_tables": answer["selected_tables"],
+                "SQL_query": answer["sql_query"],
+                "reports": answer["report"],
+                "report_from_cache": True,
+            },
+            # Ends through the store step like a fresh run; the entry itself is left as it is
+            goto=ANSWER_CACHE_STORE
+        )
+
+    # Re-run the stored SQL so the report reflects the current data
+    print("------ Re-executing cached SQL ------")
+    return Command(
+        update={
+            "is_query_relevant": True,
+            "rephrased_query": answer["rephrased_query"],
+            "selected_tables": answer["selected_tables"],
+            "SQL_query": answer["sql_query"],
+            "cached_answer": answer,
+        },
+        goto=SANITIZE_SQL_QUERY
+    )
+
+
+def store_cached_answer(state: AgentState) -> AgentState:
+    print("--- ANSWER CACHE STORE ---")
+    if get_cache_mode(state["db_name"]) == MODE_OFF:
+        return {}
+    if state.get("SQL_error") or not state.get("SQL_query") or not state.get("reports"):
+        return {}
+    if state.get("report_from_cache"):
+        # Served without re-running the SQL; rewriting the entry would extend its TTL forever
+        return {}
+
+    store_answer(
+        state["db_info"],
+        state["query"],
+        state["rephrased_query"],
+        state["selected_tables"],
+        state["SQL_query"],
+        state["reports"],
+        state.get("data_frame"),
+    )
+    return {}
+
+
+async def alookup_cached_answer(state: AgentState) -> AgentState:
+    return await asyncio.to_thread(lookup_cached_answer, state)
+
+
+async def astore_cached_answer(state: AgentState) -> AgentState:
+    return await asyncio.to_thread(store_cached_answer, state)
@@ -0,0 +1,407 @@
+import io
+import re
+import ast
+import json
+import decimal
+import threading
+import pandas as pd
+from decouple import config
+from nodes.image_store import store_image_bytes
+
+
+# Layouts of SQL results that are rendered without a generated script
+EMPTY = "empty"
+VALUE = "value"
+RECORD = "record"
+TABLE = "table"
+BAR_CHART = "bar"
+LINE_CHART = "line"
+CHART_LAYOUTS = {BAR_CHART, LINE_CHART}
+
+# Chart types of the get_report_type JSON
+PIE_CHART = "pie"
+SCATTER_CHART = "scatter"
+HEATMAP = "heatmap"
+CHART_TYPES = {BAR_CHART, LINE_CHART, PIE_CHART, SCATTER_CHART, HEATMAP}
+IMAGE_FORMATS = {"png", "svg"}
+
+# At most this many value columns are drawn in one chart
+MAX_CHART_SERIES = 3
+MAX_BAR_CATEGORIES = 30
+MAX_PIE_SLICES = 8
+MAX_SCATTER_POINTS = 10000
+MAX_HEATMAP_SIDE = 40
+MAX_CELL_CHARACTERS = 80
+PERIOD_COLUMN = re.compile(r"(year|quarter|month|week|day|date|period)", re.IGNORECASE)
+ID_COLUMN = re.compile(r"(^|_)id$", re.IGNORECASE)
+
+
+class ChartSpecError(ValueError):
+    """The report type cannot be drawn from the result without a generated script."""
+
+
+def _is_numeric(series):
+    if series.dtype == object:
+        # PostgreSQL NUMERIC columns arrive as Decimal objects
+        values = series.dropna()
+        return len(values) > 0 and all(isinstance(value, decimal.Decimal) for value in values)
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _is_period(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    # Years and months often come back as plain integers
+    return bool(PERIOD_COLUMN.search(str(series.name)))
+
+
+def _as_float(series):
+    return series.astype(float) if series.dtype == object else series
+
+
+def chart_columns(df):
+    """(label column, value columns) when the first column labels numeric values, else (None, [])."""
+    if len(df.columns) < 2 or df.columns.duplicated().any():
+        return None, []
+    label, values = df.columns[0], list(df.columns[1:])
+    if _is_numeric(df[label]) and not _is_period(df[label]):
+        return None, []
+    if len(values) > MAX_CHART_SERIES or not all(_is_numeric(df[column]) for column in values):
+        return None, []
+    if df[label].isna().any() or df[label].astype(str).duplicated().any():
+        return None, []
+    return label, values
+
+
+def classify_result(df, max_rows, max_columns):
+    """
+    Layout for a SQL result, decided from its shape and column types alone.
+
+    Returns EMPTY, VALUE (one cell), RECORD (one row), BAR_CHART or LINE_CHART (a label
+    column followed by up to MAX_CHART_SERIES numeric columns, LINE_CHART when the labels
+    are dates or periods), TABLE, or None when the result is too large for a fixed layout.
+    """
+    if df is None or len(df.columns) == 0:
+        return None
+    rows, columns = df.shape
+    if rows > max_rows or columns > max_columns:
+        return None
+    if rows == 0:
+        return EMPTY
+    if rows == 1:
+        return VALUE if columns == 1 else RECORD
+    label, _ = chart_columns(df)
+    if label is None:
+        return TABLE
+    return LINE_CHART if _is_period(df[label]) else BAR_CHART
+
+
+def _format_cell(value):
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return ""
+    if isinstance(value, decimal.Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        return f"{value:,.2f}" if not value.is_integer() else f"{int(value):,}"
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat() if value == value.normalize() else value.isoformat(sep=" ")
+    text = " ".join(str(value).split())
+    if len(text) > MAX_CELL_CHARACTERS:
+        text = text[:MAX_CELL_CHARACTERS - 3] + "..."
+    # Pipes would end the markdown cell
+    return text.replace("|", "\\|")
+
+
+def _markdown_table(headers, rows):
+    lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join("---" for _ in headers) + " |"]
+    lines.extend("| " + " | ".join(row) + " |" for row in rows)
+    return "\n".join(lines)
+
+
+def render_table(df, layout):
+    """Markdown for a result classified by classify_result."""
+    headers = [_format_cell(column) for column in df.columns]
+    if layout == EMPTY:
+        return "The query returned no rows."
+    if layout == VALUE:
+        return f"**{headers[0]}**: {_format_cell(df.iat[0, 0])}"
+    if layout == RECORD:
+        return _markdown_table(["Field", "Value"], [[header, _format_cell(value)] for header, value in zip(headers, df.iloc[0])])
+    return _markdown_table(headers, [[_format_cell(value) for value in row] for row in df.itertuples(index=False)])
+
+
+# ---------------------------------------------------------------------------
+# Chart drawing
+# ---------------------------------------------------------------------------
+
+# One figure per thread, cleared between charts instead of built for each one
+_figures = threading.local()
+
+
+def _figure(width, height):
+    figure = getattr(_figures, "figure", None)
+    if figure is None:
+        # Figure with an Agg canvas, not pyplot, so concurrent reports share no global state
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        figure = Figure(dpi=100)
+        FigureCanvasAgg(figure)
+        _figures.figure = figure
+    figure.clear()
+    figure.set_size_inches(width, height)
+    return figure
+
+
+def _value_columns(df, exclude):
+    numeric = [column for column in df.columns if column != exclude and _is_numeric(df[column]) and not ID_COLUMN.search(str(column))]
+    # A year next to the measures is a label, not a value to plot
+    return [column for column in numeric if not _is_period(df[column])] or numeric
+
+
+def _resolve_columns(df, chart_type, x=None, y=None):
+    """
+    (x column, value columns) for a chart: the ones named in the report type when they
+    exist in the result, otherwise inferred from the column types.
+    """
+    if x not in df.columns:
+        x = None
+    requested = y if isinstance(y, list) else [y] if y else []
+    y = [column for column in requested if column in df.columns and column != x and _is_numeric(df[column])]
+
+    if chart_type == SCATTER_CHART:
+        numeric = [column for column in df.columns if _is_numeric(df[column]) and not ID_COLUMN.search(str(column))]
+        if x is None or not _is_numeric(df[x]):
+            x = next((column for column in numeric if column not in y), None)
+        y = y or [column for column in numeric if column != x][:1]
+    elif x is None:
+        periods = [column for column in df.columns if _is_period(df[column])]
+        labels = [column for column in df.columns if not _is_numeric(df[column])]
+        if chart_type == LINE_CHART and periods:
+            x = periods[0]
+        else:
+            x = next(iter(labels + periods), None)
+
+    if x is None:
+        raise ChartSpecError(f"no column to use as the {chart_type} chart's labels")
+    y = (y or _value_columns(df, x))[:MAX_CHART_SERIES]
+    if not y:
+        raise ChartSpecError(f"no numeric column to draw as a {chart_type} chart")
+    return x, y
+
+
+def _aggregated(df, x, y):
+    data = pd.DataFrame({column: _as_float(df[column]) for column in y})
+    data.insert(0, x, df[x].values)
+    data = data.dropna(subset=[x])
+    # Repeated labels are summed so every bar, slice or point stands for one label
+    if data[x].duplicated().any():
+        data = data.groupby(x, sort=False)[y].sum().reset_index()
+    return data
+
+
+def _tick_labels(axes, labels):
+    labels = [_format_cell(label) for label in labels]
+    axes.set_xticks(range(len(labels)))
+    rotate = len(labels) > 6 or max((len(label) for label in labels), default=0) > 10
+    axes.set_xticklabels(labels, rotation=45 if rotate else 0, ha="right" if rotate else "center")
+
+
+def _value_axis(axes, x, y):
+    axes.set_xlabel(str(x))
+    if len(y) == 1:
+        axes.set_ylabel(str(y[0]))
+    else:
+        axes.legend()
+
+
+def _draw_bar(axes, df, x, y):
+    data = _aggregated(df, x, y)
+    if len(data) > MAX_BAR_CATEGORIES:
+        data = data.nlargest(MAX_BAR_CATEGORIES, y[0])
+    positions = range(len(data))
+    width = 0.8 / len(y)
+    for index, column in enumerate(y):
+        offset = (index - (len(y) - 1) / 2) * width
+        axes.bar([position + offset for position in positions], data[column], width=width, label=str(column))
+    _tick_labels(axes, data[x])
+    _value_axis(axes, x, y)
+    axes.grid(axis="y", alpha=0.3)
+
+
+def _draw_line(axes, df, x, y):
+    data = _aggregated(df, x, y)
+    if pd.api.types.is_datetime64_any_dtype(data[x]) or _is_numeric(data[x]):
+        data = data.sort_values(x)
+    positions = range(len(data))
+    for column in y:
+        axes.plot(positions, data[column], marker="o" if len(data) <= 50 else None, label=str(column))
+    _tick_labels(axes, data[x])
+    if len(data) > 24:
+        # Keep about 12 labels readable on long series
+        step = -(-len(data) // 12)
+        for index, label in enumerate(axes.get_xticklabels()):
+            label.set_visible(index % step == 0)
+    _value_axis(axes, x, y)
+    axes.grid(alpha=0.3)
+
+
+def _draw_pie(axes, df, x, y):
+    data = _aggregated(df, x, y[:1])
+    values = data.set_index(x)[y[0]]
+    values = values[values > 0].sort_values(ascending=False)
+    if values.empty:
+        raise ChartSpecError("a pie chart needs positive values")
+    if len(values) > MAX_PIE_SLICES:
+        values = pd.concat([values.iloc[:MAX_PIE_SLICES - 1], pd.Series({"Other": values.iloc[MAX_PIE_SLICES - 1:].sum()})])
+    axes.pie(values.values, labels=[_format_cell(label) for label in values.index], autopct="%1.1f%%", startangle=90, counterclock=False)
+    axes.axis("equal")
+
+
+def _draw_scatter(axes, df, x, y):
+    data = pd.DataFrame({x: _as_float(df[x]), y[0]: _as_float(df[y[0]])}).dropna()
+    if len(data) > MAX_SCATTER_POINTS:
+        data = data.sample(MAX_SCATTER_POINTS, random_state=0)
+    axes.scatter(data[x], data[y[0]], s=12 if len(data) > 500 else 30, alpha=0.6)
+    axes.set_xlabel(str(x))
+    axes.set_ylabel(str(y[0]))
+    axes.grid(alpha=0.3)
+
+
+def _heatmap_matrix(df, x, y):
+    labels = [column for column in df.columns if not _is_numeric(df[column]) or _is_period(df[column])]
+    values = [column for column in y if column not in labels]
+    if len(labels) >= 2 and values:
+        # Long format: two label columns and a value
+        columns = next(column for column in labels if column != x)
+        matrix = df.assign(**{values[0]: _as_float(df[values[0]])}).pivot_table(index=x, columns=columns, values=values[0], aggfunc="sum")
+    elif len(values) >= 2:
+        # Wide format: one row label and a value column per heatmap column
+        matrix = _aggregated(df, x, values).set_index(x)
+    else:
+        raise ChartSpecError("a heatmap needs two label columns and a value, or a label and several values")
+    return matrix.iloc[:MAX_HEATMAP_SIDE, :MAX_HEATMAP_SIDE]
+
+
+def _draw_heatmap(axes, df, x, y):
+    matrix = _heatmap_matrix(df, x, _value_columns(df, x) if len(y) < 2 else y)
+    image = axes.imshow(matrix.values.astype(float), aspect="auto", cmap="viridis")
+    axes.figure.colorbar(image, ax=axes)
+    axes.set_yticks(range(len(matrix.index)))
+    axes.set_yticklabels([_format_cell(label) for label in matrix.index])
+    _tick_labels(axes, matrix.columns)
+    axes.set_ylabel(str(x))
+    if matrix.size <= 150:
+        for (row, column), value in pd.DataFrame(matrix.values).stack().items():
+            axes.text(column, row, _format_cell(float(value)), ha="center", va="center", color="white", fontsize=8)
+
+
+DRAW_CHART = {
+    BAR_CHART: _draw_bar,
+    LINE_CHART: _draw_line,
+    PIE_CHART: _draw_pie,
+    SCATTER_CHART: _draw_scatter,
+    HEATMAP: _draw_heatmap,
+}
+
+
+def chart_image_format():
+    image_format = str(config("CHART_FORMAT", default="png")).lower()
+    return image_format if image_format in IMAGE_FORMATS else "png"
+
+
+def draw_chart(df, chart_type, title, x=None, y=None, image_format=None):
+    """
+    Draw a chart of a SQL result into the image store and return the image's relative path.
+
+    `x` and `y` name the label and value columns; missing or unknown names are inferred
+    from the column types. Repeated labels are summed, and long results are cut to the
+    largest categories (bar, pie) or sampled (scatter). Raises ChartSpecError when the
+    result has no columns the chart type can use.
+    """
+    from matplotlib import rc_context
+
+    chart_type = str(chart_type).lower()
+    if chart_type not in DRAW_CHART:
+        raise ChartSpecError(f"unsupported chart type '{chart_type}'")
+    if df is None or df.empty:
+        raise ChartSpecError("the result has no rows to draw")
+    x, y = _resolve_columns(df, chart_type, x, y)
+
+    figure = _figure(6 if chart_type == PIE_CHART else 8, 6 if chart_type in (PIE_CHART, HEATMAP) else 4.5)
+    axes = figure.add_subplot()
+    DRAW_CHART[chart_type](axes, df, x, y)
+    axes.set_title(str(title)[:80])
+    figure.tight_layout()
+
+    image_format = image_format or chart_image_format()
+    buffer = io.BytesIO()
+    # Without a date (and, for SVG, with fixed element ids) the same chart gives the same
+    # bytes, so the store keeps one copy of it
+    with rc_context({"svg.hashsalt": "chart"}):
+        figure.savefig(buffer, format=image_format, metadata={"Date": None} if image_format == "svg" else None)
+    figure.clear()
+    return store_image_bytes(buffer.getvalue(), image_format)
+
+
+def render_chart(df, layout, title):
+    """Draw a BAR_CHART or LINE_CHART layout of classify_result; returns the image path."""
+    label, values = chart_columns(df)
+    return draw_chart(df, layout, title, x=label, y=values)
+
+
+# ---------------------------------------------------------------------------
+# Report type JSON
+# ---------------------------------------------------------------------------
+
+def parse_report_spec(report_type):
+    """The get_report_type answer as a dict; raises ChartSpecError when it is not one."""
+    if isinstance(report_type, dict):
+        return report_type
+    text = str(report_type or "").strip()
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ChartSpecError("the report type is not a JSON object")
+    try:
+        spec = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        # The prompt's examples use Python-style quotes, which the model sometimes copies
+        try:
+            spec = ast.literal_eval(match.group(0))
+        except (ValueError, SyntaxError) as e:
+            raise ChartSpecError(f"the report type is not valid JSON: {e}")
+    if not isinstance(spec, dict):
+        raise ChartSpecError("the report type is not a JSON object")
+    return spec
+
+
+def render_report_spec(spec, df, title, max_table_rows=50):
+    """
+    Render a get_report_type spec from the result itself.
+
+    Returns (markdown, image paths). Tables are built from the DataFrame rather than the
+    rows the model copied into the spec. Raises ChartSpecError for specs that need a
+    generated script.
+    """
+    report_format = str(spec.get("format", "")).lower()
+
+    if report_format == "message":
+        content = spec.get("content")
+        if not isinstance(content, str) or not content.strip():
+            raise ChartSpecError("the message has no content")
+        return content.strip(), []
+
+    if report_format == "table":
+        if df is None or df.empty:
+            return render_table(df, EMPTY), []
+        markdown = render_table(df.head(max_table_rows), TABLE)
+        if len(df) > max_table_rows:
+            markdown += f"\n\nShowing the first {max_table_rows} of {len(df)} rows."
+        return markdown, []
+
+    if report_format == "chart":
+        chart_title = spec.get("chart_title") or title
+        path = draw_chart(df, spec.get("chart_type"), chart_title, x=spec.get("x"), y=spec.get("y"))
+        return f"![{chart_title}]({path})", [path]
+
+    raise ChartSpecError(f"unsupported report format '{report_format}'")
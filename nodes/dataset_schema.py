@@ -0,0 +1,209 @@
+import re
+import json
+import time
+import threading
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from decouple import config
+from nodes.file_manager_db import get_db_info_by_dataset, get_table_samples, catalog_generation
+
+
+class ColumnSchema(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    description: str = ""
+    data_type: Optional[str] = None
+    primary_key: Optional[str] = None
+    foreign_key: Optional[str] = None
+
+
+class TableSchema(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    description: str = ""
+    columns: tuple[ColumnSchema, ...] = ()
+    sample_rows: tuple[dict[str, Any], ...] = ()
+
+    def render(self, include_samples=True, sample_rows=3, max_cell_chars=40):
+        lines = [f"TABLE {self.name}: {self.description}".rstrip(": ")]
+        for column in self.columns:
+            lines.append("  " + _render_column(column))
+
+        rows = self.sample_rows[:sample_rows] if include_samples else ()
+        if rows:
+            headers = list(rows[0].keys())
+            lines.append("  sample rows: " + " | ".join(headers))
+            for row in rows:
+                lines.append("    " + " | ".join(_shorten(row.get(header), max_cell_chars) for header in headers))
+        return "\n".join(lines)
+
+
+class DatasetSchema(BaseModel):
+    """
+    Parsed description of a registered dataset: its tables, columns and keys.
+
+    Built once per dataset from the catalogue and shared (read-only) by every node that
+    puts the schema into a prompt. Sample rows are not part of it; render_prompt fetches
+    them for the tables it renders.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    db_name: str
+    description: str = ""
+    tables: tuple[TableSchema, ...] = ()
+    table_index: dict[str, TableSchema] = Field(default_factory=dict, exclude=True, repr=False)
+
+    @classmethod
+    def from_db_info(cls, db_info):
+        tables = tuple(_table_from_details(detail) for detail in db_info["details"])
+        return cls(
+            db_name=db_info["db_name"],
+            description=db_info.get("db_description") or "",
+            tables=tables,
+            table_index=_table_index(tables),
+        )
+
+    def table(self, name):
+        return self.table_index.get(_index_key(name.strip().strip('"`[]')))
+
+    def select(self, selected_tables):
+        """
+        The tables named in `selected_tables`, a list or the text kept in the graph state.
+
+        Names are found anywhere in the text (prose, numbered or bulleted lists, "genre and
+        track"), without schema prefixes and ignoring case and underscores, so "InvoiceLine"
+        and "public.invoice_line" both select invoice_line. All tables are returned when
+        nothing matches.
+        """
+        if not isinstance(selected_tables, str):
+            selected_tables = "\n".join(selected_tables or [])
+        words = [word.strip(".").split(".")[-1] for word in re.findall(r"[\w.]+", selected_tables)]
+        words = [word for word in words if word]
+
+        tables = []
+        position = 0
+        while position < len(words):
+            # Two words first, for names written with a space such as "Invoice Line"
+            pair = self.table_index.get(_index_key("".join(words[position:position + 2]))) if position + 1 < len(words) else None
+            table = pair or self.table_index.get(_index_key(words[position]))
+            position += 2 if pair is not None else 1
+            if table is not None and table not in tables:
+                tables.append(table)
+        return tables or list(self.tables)
+
+    def render_prompt(self, selected_tables, include_samples=True):
+        """Compact schema text of the selected tables for an LLM prompt."""
+        sample_rows = config("SCHEMA_PROMPT_SAMPLE_ROWS", default=3, cast=int)
+        tables = self.select(selected_tables)
+        if include_samples and sample_rows > 0:
+            tables = self.with_samples(tables)
+        return "\n".join(
+            table.render(include_samples=include_samples, sample_rows=sample_rows)
+            for table in tables
+        )
+
+    def with_samples(self, tables):
+        """Copies of `tables` with their sample rows, loaded from the catalogue for just those tables."""
+        samples = get_table_samples(self.db_name, [table.name for table in tables])
+        return [
+            table.model_copy(update={"sample_rows": _parse_sample_rows(samples.get(table.name))})
+            for table in tables
+        ]
+
+
+def _index_key(name):
+    return re.sub(r"[\W_]+", "", name.lower())
+
+
+def _table_index(tables):
+    index = {}
+    for table in tables:
+        # Reachable with and without a schema prefix; a full name wins over a bare one
+        index.setdefault(_index_key(table.name.split(".")[-1]), table)
+    for table in tables:
+        index[_index_key(table.name)] = table
+    return index
+
+
+def _render_column(column):
+    text = column.name
+    if column.data_type:
+        text += f" {column.data_type}"
+    if _is_set(column.primary_key):
+        text += " PK"
+    if _is_set(column.foreign_key):
+        text += " FK" if column.foreign_key.lower() in ("yes", "true") else f" FK->{column.foreign_key}"
+    return f"{text}: {column.description}" if column.description else text
+
+
+def _is_set(value):
+    return bool(value) and str(value).strip().lower() not in ("no", "none", "false", "null", "")
+
+
+def _shorten(value, max_chars):
+    text = "NULL" if value is None else str(value)
+    return text if len(text) <= max_chars else text[:max_chars - 3] + "..."
+
+
+def _parse_json(text, default):
+    if not text:
+        return default
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return default
+
+
+def _table_from_details(detail):
+    columns = []
+    for column in _parse_json(detail.get("column_descriptions"), []):
+        if isinstance(column, dict) and column.get("name"):
+            columns.append(ColumnSchema(**{key: None if value is None else str(value) for key, value in column.items() if key in ColumnSchema.model_fields}))
+    return TableSchema(
+        name=detail["table_name"],
+        description=detail.get("table_description") or "",
+        columns=tuple(columns),
+        sample_rows=_parse_sample_rows(detail.get("df_head")),
+    )
+
+
+def _parse_sample_rows(df_head):
+    return tuple(row for row in _parse_json(df_head, []) if isinstance(row, dict))
+
+
+_schema_cache = {}
+_schema_lock = threading.Lock()
+
+
+def load_dataset_schema(db_name):
+    """
+    The parsed schema of a dataset, or None if it is not registered.
+
+    Schemas are immutable, so one instance per dataset is shared until the catalogue
+    changes or CATALOG_CACHE_TTL_SECONDS pass.
+    """
+    key = db_name.lower()
+    ttl_seconds = config("CATALOG_CACHE_TTL_SECONDS", default=60, cast=int)
+    generation = catalog_generation()
+    with _schema_lock:
+        entry = _schema_cache.get(key)
+        if entry is not None and entry[0] == generation and time.monotonic() - entry[1] < ttl_seconds:
+            return entry[2]
+
+    # Without sample rows; render_prompt loads those only for the tables it renders
+    db_info = get_db_info_by_dataset(db_name, include_samples=False)
+    if db_info is None:
+        return None
+    schema = DatasetSchema.from_db_info(db_info)
+    with _schema_lock:
+        _schema_cache[key] = (generation, time.monotonic(), schema)
+    return schema
+
+
+def render_schema(db_info, selected_tables, include_samples=True):
+    """Prompt text for the selected tables of the dataset described by `db_info`."""
+    schema = load_dataset_schema(db_info["db_name"])
+    return schema.render_prompt(selected_tables, include_samples) if schema is not None else ""
@@ -0,0 +1,28 @@
+import json
+from functools import lru_cache
+from decouple import config
+
+
+# Per-dataset overrides are configured as a JSON object keyed by dataset name, e.g.
+# DATASET_SETTINGS={"Chinook": {"pool_size": 2, "max_overflow": 1}}
+
+
+@lru_cache(maxsize=8)
+def _parse_settings(raw_settings):
+    try:
+        settings = json.loads(raw_settings or "{}")
+    except json.JSONDecodeError as e:
+        print(f"Invalid DATASET_SETTINGS ignored: {e}")
+        return {}
+    return {str(name).lower(): values for name, values in settings.items() if isinstance(values, dict)}
+
+
+def get_dataset_settings(db_name):
+    settings = _parse_settings(config("DATASET_SETTINGS", default="{}"))
+    if not db_name:
+        return {}
+    return settings.get(db_name.lower(), {})
+
+
+def get_dataset_setting(db_name, key, default=None):
+    return get_dataset_settings(db_name).get(key, default)
@@ -0,0 +1,188 @@
+import time
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.engine import make_url
+from decouple import config
+from nodes.dataset_settings import get_dataset_setting
+
+
+# One pooled engine per target connection string, shared by every module that
+# talks to a registered database.
+_engines = {}
+_async_engines = {}
+_metrics = {}
+_engines_lock = threading.Lock()
+
+# Async drivers for the backends that have one installed
+ASYNC_DRIVERS = {"postgresql": "asyncpg"}
+
+
+def _pool_options(connection_string, db_name):
+    options = {
+        "pool_pre_ping": True,
+        "pool_recycle": get_dataset_setting(db_name, "pool_recycle", config("DB_POOL_RECYCLE_SECONDS", default=1800, cast=int)),
+    }
+    if make_url(connection_string).get_backend_name() == "sqlite":
+        # SQLite picks its own pool class, which does not take size limits
+        return options
+
+    options.update({
+        "pool_size": get_dataset_setting(db_name, "pool_size", config("DB_POOL_SIZE", default=5, cast=int)),
+        "max_overflow": get_dataset_setting(db_name, "max_overflow", config("DB_MAX_OVERFLOW", default=5, cast=int)),
+        "pool_timeout": get_dataset_setting(db_name, "pool_timeout", config("DB_POOL_TIMEOUT_SECONDS", default=30, cast=int)),
+        # LIFO reuse lets surplus connections sit idle until pool_recycle retires them
+        "pool_use_lifo": True,
+    })
+    return options
+
+
+def _register_metrics(engine, connection_string):
+    metrics = {
+        "connections_opened": 0,
+        "checkouts": 0,
+        "wait_count": 0,
+        "total_wait_seconds": 0.0,
+        "max_wait_seconds": 0.0,
+    }
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics["connections_opened"] += 1
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics["checkouts"] += 1
+
+    _metrics[connection_string] = metrics
+
+
+def get_engine(connection_string, db_name=None):
+    engine = _engines.get(connection_string)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(connection_string)
+            if engine is None:
+                engine = create_engine(connection_string, **_pool_options(connection_string, db_name))
+                _register_metrics(engine, connection_string)
+                _engines[connection_string] = engine
+    return engine
+
+
+@contextmanager
+def connect(connection_string, db_name=None):
+    engine = get_engine(connection_string, db_name)
+    start = time.perf_counter()
+    connection = engine.connect()
+    wait = time.perf_counter() - start
+
+    metrics = _metrics[connection_string]
+    metrics["wait_count"] += 1
+    metrics["total_wait_seconds"] += wait
+    metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], wait)
+
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def read_only_connection(connection_string, db_name=None, statement_timeout_ms=None):
+    # Runs the caller's statements in a transaction that the database itself keeps
+    # read-only, and always rolls it back.
+    with connect(connection_string, db_name) as connection:
+        backend = connection.dialect.name
+        transaction = connection.begin()
+        try:
+            if backend == "postgresql":
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+                if statement_timeout_ms:
+                    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+            elif backend == "sqlite":
+                connection.exec_driver_sql("PRAGMA query_only = ON")
+            yield connection
+        finally:
+            transaction.rollback()
+            if backend == "sqlite":
+                connection.exec_driver_sql("PRAGMA query_only = OFF")
+
+
+def supports_async(connection_string):
+    return make_url(connection_string).get_backend_name() in ASYNC_DRIVERS
+
+
+def get_async_engine(connection_string, db_name=None):
+    # asyncpg connections belong to the event loop that opened them, so the async engines
+    # are meant to be used from the one loop serving aget_reports
+    engine = _async_engines.get(connection_string)
+    if engine is None:
+        with _engines_lock:
+            engine = _async_engines.get(connection_string)
+            if engine is None:
+                url = make_url(connection_string)
+                async_url = url.set(drivername=f"{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}")
+                engine = create_async_engine(async_url, **_pool_options(connection_string, db_name))
+                _async_engines[connection_string] = engine
+    return engine
+
+
+@asynccontextmanager
+async def async_read_only_connection(connection_string, db_name=None, statement_timeout_ms=None):
+    # Async counterpart of read_only_connection, for PostgreSQL through asyncpg
+    engine = get_async_engine(connection_string, db_name)
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            if statement_timeout_ms:
+                await connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")
+            yield connection
+        finally:
+            await transaction.rollback()
+
+
+async def dispose_async_engines():
+    with _engines_lock:
+        engines = list(_async_engines.values())
+        _async_engines.clear()
+    for engine in engines:
+        await engine.dispose()
+
+
+def dispose_engine(connection_string):
+    with _engines_lock:
+        engine = _engines.pop(connection_string, None)
+        _metrics.pop(connection_string, None)
+    if engine is not None:
+        engine.dispose()
+
+
+def dispose_all_engines():
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+        _metrics.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+def _pool_stat(pool, name):
+    stat = getattr(pool, name, None)
+    return stat() if callable(stat) else None
+
+
+def get_pool_metrics():
+    pool_metrics = {}
+    for connection_string, engine in list(_engines.items()):
+        pool = engine.pool
+        name = make_url(connection_string).render_as_string(hide_password=True)
+        pool_metrics[name] = {
+            "pool_size": _pool_stat(pool, "size"),
+            "checked_out": _pool_stat(pool, "checkedout"),
+            "checked_in": _pool_stat(pool, "checkedin"),
+            "overflow": _pool_stat(pool, "overflow"),
+            **_metrics.get(connection_string, {}),
+        }
+    return pool_metrics
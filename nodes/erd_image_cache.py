@@ -0,0 +1,94 @@
+import io
+import os
+import base64
+import threading
+from collections import OrderedDict
+from decouple import config
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow ships with matplotlib/streamlit, but downscaling stays optional
+    Image = None
+
+
+MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+# Encoded ERD payloads keyed by (path, mtime, size, max_side), evicted LRU within a byte budget
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _downscale(raw, max_side):
+    if Image is None or not max_side:
+        return None
+    with Image.open(io.BytesIO(raw)) as image:
+        if max(image.size) <= max_side:
+            return None
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        # ERDs are line art, so optimised PNG keeps them legible and small
+        image.save(buffer, format="PNG", optimize=True)
+    resized = buffer.getvalue()
+    return resized if len(resized) < len(raw) else None
+
+
+def _encode(image_path, max_side):
+    with open(image_path, "rb") as image_file:
+        raw = image_file.read()
+
+    resized = _downscale(raw, max_side)
+    if resized is not None:
+        return "image/png", base64.b64encode(resized).decode("utf-8")
+
+    extension = os.path.splitext(image_path)[1].lower()
+    return MIME_TYPES.get(extension, "image/jpeg"), base64.b64encode(raw).decode("utf-8")
+
+
+def get_encoded_erd(image_path, max_side=None):
+    """Return (mime_type, base64 payload) for an ERD image, re-encoding only when the file changes."""
+    global _cache_bytes
+
+    if max_side is None:
+        max_side = config("ERD_MAX_SIDE", default=2048, cast=int)
+
+    stat = os.stat(image_path)
+    key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, max_side)
+
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    encoded = _encode(image_path, max_side)
+    max_bytes = config("ERD_CACHE_MAX_BYTES", default=32 * 1024 * 1024, cast=int)
+
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = encoded
+            _cache_bytes += len(encoded[1])
+        while _cache_bytes > max_bytes and len(_cache) > 1:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted[1])
+
+    return encoded
+
+
+def get_erd_data_url(image_path, max_side=None):
+    mime_type, image_data = get_encoded_erd(image_path, max_side)
+    return f"data:{mime_type};base64,{image_data}"
+
+
+def clear_erd_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
@@ -1,23 +1,27 @@
 import os
 import json
+import copy
+import time
+import threading
+from decouple import config
 from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred, undefer
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, joinedload
 
 
-# Define the project root and the path to the database file
+# Define the project root and the path to the database file (METADATA_DB_PATH moves it, e.g. for the benchmark)
 project_root = os.path.abspath(os.path.dirname(__file__) + "/..")
-db_path = os.path.join(project_root, "data", "db_info.db")
+db_path = config("METADATA_DB_PATH", default=os.path.join(project_root, "data", "db_info.db"))
 
 # Ensure the `data` directory exists
 os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
 # Define the DATABASE_URL and create the engine
 DATABASE_URL = f"sqlite:///{db_path}"
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, echo=config("METADATA_DB_ECHO", default=False, cast=bool))
 
 
 # Define a base class for our classes to inherit from
@@ -45,7 +49,8 @@ class DBInfoDetails(Base):
     table_name = Column(String, nullable=False)
     table_description = Column(String, nullable=False)
     column_descriptions = Column(String, nullable=True)
-    df_head = Column(String, nullable=True)
+    # Sample rows are large JSON blobs; they are only loaded when a node asks for them
+    df_head = deferred(Column(String, nullable=True))
     # Foreign key reference to DBInfo
     db_info_id = Column(Integer, ForeignKey("db_info.id", ondelete="CASCADE"), nullable=False)
     
@@ -58,9 +63,48 @@ class DBInfoDetails(Base):
 # Create the file_info table
 Base.metadata.create_all(engine)
 
+# create_all skips indexes of tables that already exist, and SQLite cannot reflect
+# expression indexes, so add them with IF NOT EXISTS. Datasets are looked up case-insensitively.
+with engine.begin() as connection:
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_db_info_db_name_lower ON db_info (lower(db_name))")
+    connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_db_info_details_db_info_id ON db_info_details (db_info_id)")
+
 # Create a sessionmaker bound to the engine
 Session = sessionmaker(bind=engine)
 
+
+# In-process catalog cache. Writes through this module clear it; the TTL picks up
+# datasets registered by other processes (e.g. the API server).
+_catalog_cache = {}
+_catalog_lock = threading.Lock()
+_catalog_generation = 0
+
+
+def _cached(key, loader):
+    ttl_seconds = config("CATALOG_CACHE_TTL_SECONDS", default=60, cast=int)
+    with _catalog_lock:
+        entry = _catalog_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl_seconds:
+            # Callers may modify what they get back, so they never share the cached object
+            return copy.deepcopy(entry[1])
+    value = loader()
+    if value is not None:
+        with _catalog_lock:
+            _catalog_cache[key] = (time.monotonic(), value)
+    return copy.deepcopy(value)
+
+
+def invalidate_catalog_cache():
+    global _catalog_generation
+    with _catalog_lock:
+        _catalog_cache.clear()
+        _catalog_generation += 1
+
+
+def catalog_generation():
+    """Changes whenever this process writes to the catalogue, for caches built on top of it."""
+    return _catalog_generation
+
 def insert_db_info(data_dictionary):
     # data = json.loads(data_dictionary)
     session = Session()
@@ -93,6 +137,7 @@ def insert_db_info(data_dictionary):
 
         # Commit the transaction
         session.commit()
+        invalidate_catalog_cache()
         print("Transaction committed successfully!")
     except SQLAlchemyError as e:
         # Rollback the transaction in case of an error
@@ -106,70 +151,94 @@ def insert_db_info(data_dictionary):
 
 
 
+def list_dataset_names():
+    """Names of the registered datasets, without loading their table details."""
+    def load():
+        session = Session()
+        try:
+            return [name for (name,) in session.query(DBInfo.db_name).order_by(DBInfo.db_name)]
+        finally:
+            session.close()
+
+    return _cached(("names",), load)
+
+
 def if_db_exist(db_name):
-    session = Session()
     try:
-        existing_file = session.query(DBInfo).filter(func.lower(DBInfo.db_name) == db_name.lower()).first()
-        if existing_file:
-            return True
-        else:
-            return False
+        return db_name.lower() in (name.lower() for name in list_dataset_names())
     except Exception as e:
         return False
-    finally:
-        session.close()
-    
 
-def get_db_info_by_dataset(db_name):
-    session = Session()
-    try:
-        db = session.query(DBInfo).options(joinedload(DBInfo.details)).filter(func.lower(DBInfo.db_name) == db_name.lower()).first()
-        db_info_data = {
-            "db_name": db.db_name,
-            "connection_string": db.connection_string,
-            "db_description": db.db_description,
-            "erd_path": db.erd_path,
-            "details": [
-                {"table_name": detail.table_name, 
-                    "table_description": detail.table_description, 
-                    "column_descriptions": detail.column_descriptions, 
-                    "df_head": detail.df_head, 
-                    "db_info_id": detail.db_info_id}
-                for detail in db.details
-            ]
+
+def _details_to_dict(db, include_samples):
+    details = []
+    for detail in db.details:
+        table = {
+            "table_name": detail.table_name, 
+            "table_description": detail.table_description, 
+            "column_descriptions": detail.column_descriptions, 
+            "db_info_id": detail.db_info_id,
         }
-        return db_info_data
-    finally:
-        session.close()
+        if include_samples:
+            table["df_head"] = detail.df_head
+        details.append(table)
+    return details
+
+
+def _db_info_to_dict(db, include_samples):
+    return {
+        "db_name": db.db_name,
+        "connection_string": db.connection_string,
+        "db_description": db.db_description,
+        "erd_path": db.erd_path,
+        "details": _details_to_dict(db, include_samples),
+    }
+
+
+def _detail_options(include_samples):
+    details = joinedload(DBInfo.details)
+    return details.options(undefer(DBInfoDetails.df_head)) if include_samples else details
+
+
+def get_db_info_by_dataset(db_name, include_samples=True):
+    def load():
+        session = Session()
+        try:
+            db = session.query(DBInfo).options(_detail_options(include_samples)).filter(func.lower(DBInfo.db_name) == db_name.lower()).first()
+            return _db_info_to_dict(db, include_samples) if db is not None else None
+        finally:
+            session.close()
+
+    return _cached(("db_info", db_name.lower(), include_samples), load)
+
+
+def get_table_samples(db_name, table_names):
+    """Sample rows (the stored df_head JSON) of the given tables of a dataset, keyed by table name."""
+    table_names = tuple(sorted(set(table_names)))
+
+    def load():
+        session = Session()
+        try:
+            rows = (
+                session.query(DBInfoDetails.table_name, DBInfoDetails.df_head)
+                .join(DBInfo)
+                .filter(func.lower(DBInfo.db_name) == db_name.lower(), DBInfoDetails.table_name.in_(table_names))
+            )
+            return {table_name: df_head for table_name, df_head in rows}
+        finally:
+            session.close()
 
+    return _cached(("samples", db_name.lower(), table_names), load) if table_names else {}
 
-def get_all_file_info():
-    session = Session()
-    try:
-        # Use joinedload to eagerly load the related DBInfoDetails records
-        db_info = session.query(DBInfo).options(joinedload(DBInfo.details)).all()
-
-        # Construct the output list with DBInfo and associated DBInfoDetails data
-        result = []
-        for db in db_info:
-            db_info_data = {
-                "db_name": db.db_name,
-                "connection_string": db.connection_string,
-                "db_description": db.db_description,
-                "erd_path": db.erd_path,
-                "details": [
-                    {"table_name": detail.table_name, 
-                     "table_description": detail.table_description, 
-                     "column_descriptions": detail.column_descriptions, 
-                     "df_head": detail.df_head, 
-                     "db_info_id": detail.db_info_id}
-                    for detail in db.details
-                ]
-            }
-            result.append(db_info_data)
-
-        return result
-    finally:
-        session.close()
 
+def get_all_file_info(include_samples=True):
+    def load():
+        session = Session()
+        try:
+            # Use joinedload to eagerly load the related DBInfoDetails records
+            db_info = session.query(DBInfo).options(_detail_options(include_samples)).all()
+            return [_db_info_to_dict(db, include_samples) for db in db_info]
+        finally:
+            session.close()
 
+    return _cached(("all", include_samples), load)
@@ -0,0 +1,17 @@
+from typing_extensions import Literal
+from langgraph.graph import END
+from langgraph.types import Command
+from nodes.agent_state import AgentState
+from nodes.nodes_name import QUERY_GENERATION
+
+
+def front_end_gate(state: AgentState) -> Command[Literal[ QUERY_GENERATION, END ]]:
+    """
+    Join of the speculative front end: the relevancy check, query rewrite and table
+    selection ran side by side. A rejected query ends here with the relevancy reason as
+    its report, and the rewrite and table selection are discarded.
+    """
+    print("--- FRONT END GATE ---")
+    if state.get("is_query_relevant"):
+        return Command(goto=QUERY_GENERATION)
+    return Command(goto=END)
@@ -9,9 +9,8 @@ from langchain.prompts.chat import (
 from typing import Optional
 from pydantic import BaseModel, Field
 from langchain.schema import StrOutputParser
-from langchain_openai import ChatOpenAI
+from nodes.llm_clients import get_chat_model
 from nodes.db_state import DBState
-from decouple import config
 
 
 class ColumnDescription(BaseModel):
@@ -36,9 +35,6 @@ user_msg = """
 def generate_column_description(state: DBState) -> DBState:
     print("--- GENERATE COLUMN DESCRIPTION ---")
 
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
     df = state["data_frame"]
 
     df_head = str(df.head(5).to_markdown()) 
@@ -49,7 +45,7 @@ def generate_column_description(state: DBState) -> DBState:
                 HumanMessagePromptTemplate.from_template(user_msg),
             ]
         )
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     structured_llm = llm.with_structured_output(ColumnList)
     chain = prompt | structured_llm
 
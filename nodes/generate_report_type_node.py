@@ -2,10 +2,10 @@ import json
 from langchain.prompts.chat import ChatPromptTemplate
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.types import Command
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
 from nodes.agent_state import AgentState
-from nodes.nodes_name import PYTHON_CODE_GENERATOR
+from nodes.result_summarizer import get_data_frame_summary
+from nodes.graph_options import report_type_successor
 
 
 sys_msg = """
@@ -21,6 +21,8 @@ sys_msg = """
                 'format': 'chart',
                 'chart_type': '<A suitable chart format.',
                 'chart_title': '<A suitable title for the chart>',
+                'x': '<Result column with the labels, categories or x values>',
+                'y': <list of result columns with the plotted values>
             }
             ```
         - Example: 
@@ -29,6 +31,8 @@ sys_msg = """
                 'format': 'chart',
                 'chart_type': 'bar',
                 'chart_title': 'Monthly Sales Data',
+                'x': 'month',
+                'y': ['total_sales']
             }
             ```
     3. **Tables**: If a chart is not suitable for the data, present it in table format:
@@ -62,29 +66,38 @@ sys_msg = """
     Your goal is to select the most appropriate visual (chart, table, or message) based on the query results and format the response as structured JSON.
 """
 
-def get_report_type(state: AgentState) -> AgentState:
-    print("--- DEFINE REPORT TYPE ---")
-    
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-
-    llm = ChatOpenAI(openai_api_key=OPENAI_API_KEY, model="gpt-4o-2024-08-06", temperature=0, max_tokens=16000, model_kwargs={"response_format": { "type": "json_object" }})
+def _report_type_chain(state: AgentState):
+    llm = get_chat_model(model="gpt-4o-2024-08-06", response_format={"type": "json_object"}, max_tokens=16000)
 
     sql_query = state["SQL_query"]
-    data = state["data_frame"]
+    data = get_data_frame_summary(state)
     # print(f"Data: {data}\n")
 
     prompt = [
         SystemMessage(content=sys_msg),
-        HumanMessage(content=f"""query: {sql_query}, result: {str(data)}""")
+        HumanMessage(content=f"""query: {sql_query}, result: {data}""")
     ]
+    return llm, prompt
 
-    response = llm.invoke(prompt)
 
+def _report_type_command(response):
     # print(f"Report Type: {response.content}")
 
     return Command(
         update={
             "report_type": response.content,
         },
-        goto=PYTHON_CODE_GENERATOR
-    ) 
\ No newline at end of file
+        goto=report_type_successor()
+    )
+
+
+def get_report_type(state: AgentState) -> AgentState:
+    print("--- DEFINE REPORT TYPE ---")
+    llm, prompt = _report_type_chain(state)
+    return _report_type_command(llm.invoke(prompt))
+
+
+async def aget_report_type(state: AgentState) -> AgentState:
+    print("--- DEFINE REPORT TYPE ---")
+    llm, prompt = _report_type_chain(state)
+    return _report_type_command(await llm.ainvoke(prompt))
@@ -1,16 +1,23 @@
+import asyncio
 from langgraph.types import Command
 from nodes.file_manager_db import get_db_info_by_dataset
 from nodes.agent_state import AgentState 
-from nodes.nodes_name import CHECK_QUERY_RELEVANCY
+from nodes.nodes_name import ANSWER_CACHE_LOOKUP
 
 def get_dataset_detail(state: AgentState) -> AgentState:
     print("--- GET DATASET DETAIL ---")
     db_name = state["db_name"]
-    db_info = get_db_info_by_dataset(db_name)
+    # Sample rows are attached later, only for the tables the SQL and report nodes use
+    db_info = get_db_info_by_dataset(db_name, include_samples=False)
 
     return Command(
         update={
             "db_info": db_info
         },
-        goto=CHECK_QUERY_RELEVANCY
-    ) 
\ No newline at end of file
+        goto=ANSWER_CACHE_LOOKUP
+    )
+
+
+async def aget_dataset_detail(state: AgentState) -> AgentState:
+    # The dataset catalogue is a local SQLite file; read it on a worker thread
+    return await asyncio.to_thread(get_dataset_detail, state)
@@ -0,0 +1,41 @@
+from decouple import config
+from nodes.nodes_name import CHECK_QUERY_RELEVANCY, QUERY_FRONT_END, RE_WRITE_QUERY, TABLE_SELECTION, REPORT_TYPE, PYTHON_CODE_GENERATOR, RENDER_REPORT
+
+
+def use_fused_front_end():
+    return config("FUSED_FRONT_END", default=False, cast=bool)
+
+
+def use_speculative_front_end():
+    # Rewrite and table selection run alongside the relevancy check instead of after it
+    return not use_fused_front_end() and config("SPECULATIVE_FRONT_END", default=False, cast=bool)
+
+
+def use_chart_engine():
+    # Draw the report type locally and only generate a Python script when that fails
+    return config("CHART_ENGINE", default=True, cast=bool)
+
+
+def use_folded_report_type():
+    # The script prompt picks the layout itself, so get_report_type is skipped. Not used with
+    # the chart engine, which needs the report type to draw anything.
+    return not use_chart_engine() and config("FOLD_REPORT_TYPE", default=True, cast=bool)
+
+
+def front_end_entry():
+    # Node(s) that receive the query once the dataset details are loaded
+    if use_fused_front_end():
+        return QUERY_FRONT_END
+    if use_speculative_front_end():
+        return [CHECK_QUERY_RELEVANCY, RE_WRITE_QUERY, TABLE_SELECTION]
+    return CHECK_QUERY_RELEVANCY
+
+
+def report_stage_entry():
+    # Node(s) that receive a successful SQL result
+    return PYTHON_CODE_GENERATOR if use_folded_report_type() else REPORT_TYPE
+
+
+def report_type_successor():
+    # Where get_report_type sends its answer
+    return RENDER_REPORT if use_chart_engine() else PYTHON_CODE_GENERATOR
@@ -0,0 +1,334 @@
+import os
+import re
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from decouple import config
+from sqlalchemy import Column, Float, Integer, String, func
+from sqlalchemy.dialects.sqlite import insert
+from nodes.file_manager_db import Base, Session, engine
+from nodes.python_script_checker import IMAGES_DIRECTORY
+
+
+# Report charts, stored once per content as <IMAGE_STORE_DIR>/<first two hex digits>/<sha256>.<ext>.
+# Reports link to these paths like any other image, so stored files never change and can
+# be cached in memory by hash. Files no stored report links to are removed once the store
+# grows past IMAGE_STORE_MAX_BYTES (python -m nodes.image_store gc runs it by hand).
+
+IMAGE_PATTERN = re.compile(r'!\[(.*?)\]\((.*?)\)')
+STORED_NAME = re.compile(r"([0-9a-f]{64})\.(png|svg|jpg|jpeg|gif|webp)$")
+EXTENSIONS = {"png", "svg", "jpg", "jpeg", "gif", "webp"}
+MIME_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+
+class ImageAsset(Base):
+    __tablename__ = "image_assets"
+
+    hash = Column(String, primary_key=True)
+    extension = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(Float, nullable=False)
+    last_used_at = Column(Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ImageAsset(hash={self.hash[:12]}, extension={self.extension}, size={self.size})>"
+
+
+ImageAsset.__table__.create(engine, checkfirst=True)
+
+# Image bytes keyed by hash, evicted LRU within IMAGE_STORE_CACHE_BYTES
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def store_directory():
+    return config("IMAGE_STORE_DIR", default="images/store").rstrip("/")
+
+
+def image_path(image_hash, extension):
+    return f"{store_directory()}/{image_hash[:2]}/{image_hash}.{extension}"
+
+
+def parse_image_path(path):
+    """(hash, extension) of a stored image path, or None for any other path."""
+    match = STORED_NAME.search(str(path).strip())
+    return (match.group(1), match.group(2)) if match else None
+
+
+def _remember(image_hash, data):
+    global _cache_bytes
+    max_bytes = config("IMAGE_STORE_CACHE_BYTES", default=32 * 1024 * 1024, cast=int)
+    if len(data) > max_bytes:
+        return
+    with _cache_lock:
+        if image_hash in _cache:
+            _cache.move_to_end(image_hash)
+            return
+        _cache[image_hash] = data
+        _cache_bytes += len(data)
+        while _cache_bytes > max_bytes and _cache:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+
+def _forget(image_hash):
+    global _cache_bytes
+    with _cache_lock:
+        data = _cache.pop(image_hash, None)
+        if data is not None:
+            _cache_bytes -= len(data)
+
+
+def _record(image_hash, extension, size):
+    now = time.time()
+    session = Session()
+    try:
+        statement = insert(ImageAsset).values(hash=image_hash, extension=extension, size=size, created_at=now, last_used_at=now)
+        session.execute(statement.on_conflict_do_update(index_elements=["hash"], set_={"last_used_at": now}))
+        session.commit()
+    finally:
+        session.close()
+
+
+def store_image_bytes(data, extension):
+    """Store image bytes and return their path; identical images share one file."""
+    extension = extension.lower().lstrip(".")
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Unsupported image type '{extension}'")
+    image_hash = hashlib.sha256(data).hexdigest()
+    path = image_path(image_hash, extension)
+
+    if not os.path.exists(path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see a partial file
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as image_file:
+            image_file.write(data)
+        os.replace(temporary_path, path)
+
+    _record(image_hash, extension, len(data))
+    _remember(image_hash, data)
+    collect_garbage_if_needed()
+    return path
+
+
+def store_image_file(path, remove_original=True):
+    """Move an image file (e.g. one written by a report script) into the store; returns its stored path."""
+    path = path.strip()
+    if parse_image_path(path):
+        return path
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    stored_path = store_image_bytes(data, os.path.splitext(path)[1] or "png")
+    if remove_original:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return stored_path
+
+
+def _is_report_output(path, since):
+    # Only charts a report script wrote under images/ are moved; anything else a report links
+    # to (an ERD, a file elsewhere on disk) stays where it is
+    real_path = os.path.realpath(path)
+    if not os.path.isfile(real_path):
+        return False
+    if os.path.splitext(real_path)[1].lower().lstrip(".") not in EXTENSIONS:
+        return False
+    images_directory = os.path.realpath(IMAGES_DIRECTORY) + os.sep
+    if not real_path.startswith(images_directory) or real_path.startswith(os.path.realpath(store_directory()) + os.sep):
+        return False
+    # Uploaded ERDs share images/, so older files are left alone (with slack for coarse mtimes)
+    return since is None or os.path.getmtime(real_path) >= since - 2
+
+
+def store_report_images(markdown, since=None):
+    """
+    Move the images a report script wrote under images/ (modified after `since`, when given)
+    into the store.
+
+    Returns (markdown linking to the stored paths, stored paths). Links to stored images are
+    kept as stored paths; links to any other file are left as they are.
+    """
+    stored = {}
+    for _, path in IMAGE_PATTERN.findall(markdown):
+        path = path.strip()
+        if path in stored:
+            continue
+        if parse_image_path(path) is not None and os.path.isfile(path):
+            stored[path] = path
+        elif _is_report_output(path, since):
+            stored[path] = store_image_file(path)
+
+    def relink(match):
+        caption, path = match.group(1), match.group(2).strip()
+        return f"![{caption}]({stored.get(path, path)})"
+
+    return IMAGE_PATTERN.sub(relink, markdown), list(dict.fromkeys(stored.values()))
+
+
+def read_image(path):
+    """Bytes of an image a report links to; stored images are served from memory after the first read."""
+    parsed = parse_image_path(path)
+    if parsed is not None:
+        with _cache_lock:
+            data = _cache.get(parsed[0])
+            if data is not None:
+                _cache.move_to_end(parsed[0])
+                return data
+    with open(path.strip(), "rb") as image_file:
+        data = image_file.read()
+    if parsed is not None:
+        _remember(parsed[0], data)
+    return data
+
+
+def read_image_by_hash(image_hash):
+    """(bytes, mime type) of a stored image, or None when the store does not have it."""
+    session = Session()
+    try:
+        asset = session.get(ImageAsset, image_hash)
+        extension = asset.extension if asset is not None else None
+    finally:
+        session.close()
+    if extension is None:
+        return None
+    try:
+        return read_image(image_path(image_hash, extension)), MIME_TYPES[extension]
+    except FileNotFoundError:
+        return None
+
+
+def referenced_hashes(reports):
+    hashes = set()
+    for report in reports:
+        for _, path in IMAGE_PATTERN.findall(report or ""):
+            parsed = parse_image_path(path)
+            if parsed is not None:
+                hashes.add(parsed[0])
+    return hashes
+
+
+def _stored_reports():
+    # Reports kept beyond a single run: cached answers and finished report jobs
+    from nodes.answer_cache import stored_reports as cached_answer_reports
+    from nodes.report_jobs import stored_reports as job_reports
+
+    yield from cached_answer_reports()
+    yield from job_reports()
+
+
+def _remove(image_hash, extension):
+    _forget(image_hash)
+    try:
+        os.remove(image_path(image_hash, extension))
+    except FileNotFoundError:
+        pass
+
+
+def _remove_orphan_files(known_hashes, cutoff):
+    # Files left without a row, e.g. by a process that stopped mid-write
+    removed = 0
+    directory = store_directory()
+    if not os.path.isdir(directory):
+        return removed
+    for shard in os.scandir(directory):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            parsed = parse_image_path(entry.name)
+            if parsed is not None and parsed[0] in known_hashes:
+                continue
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+
+def collect_garbage(max_bytes=None):
+    """
+    Remove stored images that no cached answer or report job links to, least recently
+    stored first, until the store fits in `max_bytes` (IMAGE_STORE_MAX_BYTES).
+
+    Images stored within IMAGE_STORE_GRACE_SECONDS are kept, since reports still being
+    written or shown in open sessions may link to them.
+
+    Returns a dict with the number of removed images and the bytes before and after.
+    """
+    if max_bytes is None:
+        max_bytes = config("IMAGE_STORE_MAX_BYTES", default=1024 * 1024 * 1024, cast=int)
+    cutoff = time.time() - config("IMAGE_STORE_GRACE_SECONDS", default=24 * 3600, cast=int)
+
+    with _gc_lock:
+        session = Session()
+        try:
+            assets = session.query(ImageAsset.hash, ImageAsset.extension, ImageAsset.size, ImageAsset.last_used_at).order_by(ImageAsset.last_used_at).all()
+            total_bytes = sum(asset.size for asset in assets)
+            result = {"removed": 0, "bytes_before": total_bytes, "bytes_after": total_bytes}
+
+            result["removed_files"] = _remove_orphan_files({asset.hash for asset in assets}, cutoff)
+            # Rows whose file is gone only need their row removed
+            removed = {asset.hash for asset in assets if not os.path.exists(image_path(asset.hash, asset.extension))}
+            total_bytes -= sum(asset.size for asset in assets if asset.hash in removed)
+            if total_bytes <= max_bytes and not removed:
+                return result
+
+            referenced = referenced_hashes(_stored_reports()) if total_bytes > max_bytes else set()
+            for asset in assets:
+                if total_bytes <= max_bytes:
+                    break
+                if asset.hash in referenced or asset.hash in removed or asset.last_used_at >= cutoff:
+                    continue
+                _remove(asset.hash, asset.extension)
+                removed.add(asset.hash)
+                total_bytes -= asset.size
+
+            if removed:
+                session.query(ImageAsset).filter(ImageAsset.hash.in_(removed)).delete(synchronize_session=False)
+                session.commit()
+            result.update(removed=len(removed), bytes_after=total_bytes)
+            return result
+        finally:
+            session.close()
+
+
+def collect_garbage_if_needed():
+    """Run collect_garbage when the store is over its quota, at most every IMAGE_STORE_GC_INTERVAL_SECONDS."""
+    global _last_gc
+    interval = config("IMAGE_STORE_GC_INTERVAL_SECONDS", default=300, cast=int)
+    if time.time() - _last_gc < interval:
+        return
+    _last_gc = time.time()
+
+    session = Session()
+    try:
+        total_bytes = session.query(func.coalesce(func.sum(ImageAsset.size), 0)).scalar()
+    finally:
+        session.close()
+    if total_bytes > config("IMAGE_STORE_MAX_BYTES", default=1024 * 1024 * 1024, cast=int):
+        # Off the caller's thread; the report being written does not wait for it
+        threading.Thread(target=collect_garbage, name="image-store-gc", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # python -m nodes.image_store gc
+    import sys
+
+    if sys.argv[1:2] == ["gc"]:
+        print(collect_garbage())
+    else:
+        print("Usage: python -m nodes.image_store gc")
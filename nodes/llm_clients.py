@@ -0,0 +1,97 @@
+import json
+import asyncio
+import threading
+import weakref
+import httpx
+from langchain_openai import ChatOpenAI
+from decouple import config
+
+
+# ChatOpenAI models are stateless between calls, so one instance per (model, temperature,
+# response format, ...) serves every node and request. They share one httpx client, whose
+# keep-alive pool lets consecutive calls reuse the same TLS connection to the API.
+_models = {}
+# httpx.AsyncClient connections belong to the event loop that opened them
+_async_models = weakref.WeakKeyDictionary()
+_http_client = None
+_async_http_clients = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _timeout():
+    return httpx.Timeout(
+        config("LLM_TIMEOUT_SECONDS", default=120.0, cast=float),
+        connect=config("LLM_CONNECT_TIMEOUT_SECONDS", default=10.0, cast=float),
+    )
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=config("LLM_MAX_CONNECTIONS", default=20, cast=int),
+        max_keepalive_connections=config("LLM_MAX_KEEPALIVE_CONNECTIONS", default=10, cast=int),
+        keepalive_expiry=config("LLM_KEEPALIVE_SECONDS", default=60.0, cast=float),
+    )
+
+
+def _get_http_client():
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(timeout=_timeout(), limits=_limits())
+    return _http_client
+
+
+def _get_async_http_client(loop):
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(timeout=_timeout(), limits=_limits())
+        _async_http_clients[loop] = client
+    return client
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_chat_model(model=None, temperature=0, response_format=None, max_tokens=None):
+    """
+    Shared ChatOpenAI model for the given settings.
+
+    Parameters:
+    model (str): Model name; GPT_MODEL when not given.
+    temperature (float): Sampling temperature.
+    response_format (dict): OpenAI response_format, e.g. {"type": "json_object"}.
+    max_tokens (int): Completion token limit.
+
+    Returns:
+    ChatOpenAI: A model reusing the process-wide HTTP connection pool. Called from a
+    coroutine, the model uses an async client bound to the running event loop.
+    """
+    model = model or config("GPT_MODEL")
+    api_key = config("OPENAI_API_KEY")
+    # The API key is part of the key, so a key changed in the Configuration tab takes effect
+    key = (model, temperature, json.dumps(response_format, sort_keys=True), max_tokens, api_key)
+    loop = _running_loop()
+
+    with _lock:
+        models = _models if loop is None else _async_models.setdefault(loop, {})
+        chat_model = models.get(key)
+        if chat_model is None:
+            options = {"model_kwargs": {"response_format": response_format}} if response_format else {}
+            if max_tokens:
+                options["max_tokens"] = max_tokens
+            chat_model = ChatOpenAI(
+                model_name=model,
+                temperature=temperature,
+                openai_api_key=api_key,
+                max_retries=config("LLM_MAX_RETRIES", default=2, cast=int),
+                # Token usage of streamed responses, for the run traces
+                stream_usage=True,
+                http_client=_get_http_client(),
+                http_async_client=_get_async_http_client(loop) if loop is not None else None,
+                **options,
+            )
+            models[key] = chat_model
+    return chat_model
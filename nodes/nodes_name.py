@@ -20,3 +20,9 @@ CHECK_SQL_DECISION = "make_sql_decision"
 SANITIZE_PYTHON_SCRIPT = "sanitize_python_script"
 REPORT_GENERATION_DECISION = "make_decision"
 CHECK_QUERY_RELEVANCY = "check_query_relevancy"
+QUERY_FRONT_END = "query_front_end"
+FRONT_END_GATE = "front_end_gate"
+SIMPLE_REPORT = "simple_report"
+RENDER_REPORT = "render_report"
+ANSWER_CACHE_LOOKUP = "answer_cache_lookup"
+ANSWER_CACHE_STORE = "answer_cache_store"
@@ -0,0 +1,306 @@
+import io
+import os
+import re
+import ast
+import time
+import queue
+import pickle
+import atexit
+import signal
+import threading
+import multiprocessing
+from contextlib import redirect_stdout
+from multiprocessing import shared_memory
+from decouple import config
+from nodes.python_script_checker import strip_code_fences
+
+try:
+    import resource
+except ImportError:  # No rlimits on Windows; the wall clock limit still applies
+    resource = None
+
+
+IMAGE_PATTERN = re.compile(r'!\[.*?\]\((.*?)\)')
+
+
+class CpuTimeLimitExceeded(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+def _preload_libraries():
+    # Imported once per worker so report scripts do not pay for them on every run
+    import numpy
+    import pandas
+    import pyarrow
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot
+    import seaborn
+    import plotly.express
+
+
+def _on_cpu_limit(signum, frame):
+    raise CpuTimeLimitExceeded("CPU time limit exceeded")
+
+
+def _set_cpu_limit(cpu_seconds):
+    if resource is None or not cpu_seconds:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft_limit = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard_limit != resource.RLIM_INFINITY:
+        soft_limit = min(soft_limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft_limit, hard_limit))
+
+
+def _load_data_frame(job):
+    if "data_frame" in job:
+        return job["data_frame"]
+    if not job.get("shm_name"):
+        return None
+
+    import pyarrow as pa
+
+    # The parent creates and unlinks the segment; workers only attach to it
+    shm = shared_memory.SharedMemory(name=job["shm_name"])
+    try:
+        payload = bytes(shm.buf[:job["size"]])
+    finally:
+        shm.close()
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+def _execute_script(script, df):
+    import matplotlib.pyplot as plt
+
+    namespace = {"df": df}
+    output = io.StringIO()
+    try:
+        tree = ast.parse(strip_code_fences(script))
+        body, last = tree.body[:-1], tree.body[-1:]
+        with redirect_stdout(output):
+            exec(compile(ast.Module(body=body, type_ignores=[]), "<report>", "exec"), namespace)
+            # Like PythonAstREPLTool, the value of a trailing expression is part of the output
+            if last and isinstance(last[0], ast.Expr):
+                value = eval(compile(ast.Expression(body=last[0].value), "<report>", "eval"), namespace)
+                if value is not None:
+                    print(value)
+            elif last:
+                exec(compile(ast.Module(body=last, type_ignores=[]), "<report>", "exec"), namespace)
+        return {"output": output.getvalue(), "error": None}
+    except Exception as e:
+        return {"output": output.getvalue(), "error": f"{type(e).__name__}: {e}"}
+    finally:
+        plt.close("all")
+
+
+def _address_space_bytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def _set_memory_limit(max_memory_bytes):
+    # On top of what the preloaded libraries already map, so allocations beyond the cap fail
+    # at once with a MemoryError instead of waiting for the parent's RSS poll
+    if resource is None or not max_memory_bytes or not hasattr(resource, "RLIMIT_AS"):
+        return
+    soft_limit = _address_space_bytes() + max_memory_bytes
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    if hard_limit != resource.RLIM_INFINITY:
+        soft_limit = min(soft_limit, hard_limit)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (soft_limit, hard_limit))
+    except (ValueError, OSError) as e:
+        print(f"Sandbox memory limit not applied: {e}")
+
+
+def _worker_main(connection, cpu_seconds, max_memory_bytes=0):
+    _preload_libraries()
+    _set_memory_limit(max_memory_bytes)
+    if resource is not None and hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+
+        _set_cpu_limit(cpu_seconds)
+        try:
+            df = _load_data_frame(job)
+            result = _execute_script(job["script"], df)
+        except Exception as e:
+            result = {"output": "", "error": f"{type(e).__name__}: {e}"}
+        connection.send(result)
+
+
+# ---------------------------------------------------------------------------
+# Parent process side
+# ---------------------------------------------------------------------------
+
+def _rss_bytes(pid):
+    # Linux only; elsewhere the memory limit is not enforced
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _SandboxWorker:
+    def __init__(self, context, cpu_seconds, max_memory_bytes):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection, cpu_seconds, max_memory_bytes), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.runs = 0
+
+    def stop(self, force=False):
+        if not force and self.process.is_alive():
+            try:
+                self.connection.send(None)
+                self.process.join(timeout=5)
+            except (OSError, BrokenPipeError):
+                pass
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.connection.close()
+
+
+class _SandboxPool:
+    def __init__(self):
+        self.size = config("PYTHON_SANDBOX_WORKERS", default=2, cast=int)
+        self.max_runs = config("PYTHON_SANDBOX_MAX_RUNS", default=50, cast=int)
+        self.cpu_seconds = config("PYTHON_SANDBOX_CPU_SECONDS", default=60, cast=int)
+        self.wall_seconds = config("PYTHON_SANDBOX_WALL_SECONDS", default=120, cast=int)
+        self.max_memory_bytes = config("PYTHON_SANDBOX_MAX_MEMORY_MB", default=2048, cast=int) * 1024 * 1024
+        self.context = multiprocessing.get_context("spawn")
+        self.idle = queue.Queue()
+        for _ in range(self.size):
+            self.idle.put(self._new_worker())
+
+    def _new_worker(self):
+        return _SandboxWorker(self.context, self.cpu_seconds, self.max_memory_bytes)
+
+    def _release(self, worker, healthy):
+        if healthy and worker.runs < self.max_runs and worker.process.is_alive():
+            self.idle.put(worker)
+            return
+        worker.stop(force=not healthy)
+        self.idle.put(self._new_worker())
+
+    def _wait_for_result(self, worker):
+        deadline = time.monotonic() + self.wall_seconds
+        while True:
+            if worker.connection.poll(0.2):
+                result = worker.connection.recv()
+                # A worker that hit its address space limit is replaced, its heap may be fragmented
+                return result, not (result.get("error") or "").startswith("MemoryError")
+            if not worker.process.is_alive():
+                return {"output": "", "error": f"SandboxError: worker exited with code {worker.process.exitcode}"}, False
+            if time.monotonic() > deadline:
+                return {"output": "", "error": f"TimeoutError: script exceeded the {self.wall_seconds}s wall clock limit"}, False
+            rss = _rss_bytes(worker.process.pid)
+            if rss is not None and rss > self.max_memory_bytes:
+                return {"output": "", "error": f"MemoryError: script exceeded the {self.max_memory_bytes // (1024 * 1024)} MB memory limit"}, False
+
+    def run(self, script, df):
+        try:
+            job, shm = _share_data_frame(df)
+        except OSError as e:
+            return {"output": "", "error": f"SandboxError: could not share the data frame: {e}"}
+        job["script"] = script
+        worker = self.idle.get()
+        healthy = False
+        try:
+            worker.runs += 1
+            try:
+                payload = pickle.dumps(job, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                # Nothing reached the worker, so it can be reused
+                healthy = True
+                return {"output": "", "error": f"SandboxError: the data frame cannot be sent to the sandbox ({type(e).__name__}: {e})"}
+            worker.connection.send_bytes(payload)
+            result, healthy = self._wait_for_result(worker)
+            return result
+        except (OSError, EOFError, BrokenPipeError, pickle.UnpicklingError) as e:
+            return {"output": "", "error": f"SandboxError: {e}"}
+        finally:
+            self._release(worker, healthy)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def shutdown(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+def _share_data_frame(df):
+    """Serialise the DataFrame as Arrow IPC into shared memory; fall back to pickling."""
+    if df is None:
+        return {}, None
+
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowException, ValueError, TypeError):
+        return {"data_frame": df}, None
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    buffer = sink.getvalue()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(buffer.size, 1))
+    shm.buf[:buffer.size] = memoryview(buffer).cast("B")
+    return {"shm_name": shm.name, "size": buffer.size}, shm
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def start_sandbox_pool():
+    """Start (once per process) the pre-warmed worker pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _SandboxPool()
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+def run_python_script(script, df):
+    """
+    Run a generated report script against `df` in an isolated worker process.
+
+    Returns:
+    dict: output (captured stdout), error (None on success) and images (paths of the
+    markdown images referenced in the output that exist on disk).
+    """
+    result = start_sandbox_pool().run(script, df)
+    result["images"] = [
+        path.strip()
+        for path in IMAGE_PATTERN.findall(result["output"])
+        if os.path.exists(path.strip())
+    ]
+    return result
@@ -0,0 +1,343 @@
+import re
+import ast
+import posixpath
+
+
+SAFE = "safe"
+UNSAFE = "unsafe"
+AMBIGUOUS = "ambiguous"
+
+IMAGES_DIRECTORY = "images"
+
+# Top-level packages a report script may import; `os` is only allowed for the names below
+ALLOWED_MODULES = {"pandas", "numpy", "matplotlib", "seaborn", "plotly", "uuid"}
+ALLOWED_OS_NAMES = {"path", "makedirs", "sep"}
+
+DENIED_MODULES = {
+    "subprocess", "socket", "sys", "shutil", "requests", "urllib", "urllib3", "http", "httpx",
+    "ftplib", "smtplib", "telnetlib", "pickle", "marshal", "shelve", "ctypes", "importlib",
+    "multiprocessing", "threading", "asyncio", "signal", "pty", "builtins", "code", "codeop",
+    "webbrowser", "sqlite3", "psycopg2", "sqlalchemy", "duckdb", "glob", "pathlib", "tempfile",
+}
+DENIED_OS_NAMES = {
+    "system", "popen", "remove", "unlink", "rmdir", "removedirs", "rename", "renames", "replace",
+    "kill", "killpg", "fork", "forkpty", "environ", "getenv", "putenv", "unsetenv", "chmod",
+    "chown", "chdir", "symlink", "link", "truncate", "startfile", "execl", "execle", "execlp",
+    "execlpe", "execv", "execve", "execvp", "execvpe", "spawnl", "spawnle", "spawnlp", "spawnlpe",
+    "spawnv", "spawnve", "spawnvp", "spawnvpe", "posix_spawn", "posix_spawnp",
+}
+
+DENIED_BUILTINS = {
+    "exec", "eval", "compile", "__import__", "input", "breakpoint", "globals", "locals", "vars",
+    "exit", "quit", "help", "memoryview",
+}
+AMBIGUOUS_BUILTINS = {"getattr", "setattr", "delattr"}
+
+# Attributes that escape the sandboxed namespace or reach outside the report data
+DENIED_ATTRIBUTES = {
+    "__globals__", "__builtins__", "__subclasses__", "__class__", "__bases__", "__base__",
+    "__mro__", "__code__", "__dict__", "__getattribute__", "__reduce__", "__reduce_ex__",
+    "__loader__", "__spec__", "__closure__", "__func__", "__self__", "f_globals", "f_locals",
+    "gi_frame", "tb_frame", "to_pickle", "read_pickle", "to_sql", "read_sql", "read_sql_query",
+    "read_sql_table", "read_html", "read_clipboard", "to_clipboard",
+}
+ALLOWED_DUNDER_NAMES = {"__name__"}
+
+# Methods that write files; their target path must stay inside the images folder. Without a
+# path argument the pandas ones return a string, which is fine.
+FILE_WRITING_METHODS = {
+    "savefig", "imsave", "write_image", "write_html", "write_json",
+    "to_csv", "to_excel", "to_json", "to_html", "to_markdown", "to_parquet", "to_feather",
+    "to_xml", "to_hdf", "to_stata", "to_orc", "to_latex", "to_string",
+    "save", "savez", "savez_compressed", "savetxt", "tofile",
+}
+# Methods that read files (pandas read_* is matched by prefix); reads are limited to images/ too
+FILE_READING_METHODS = {"load", "loadtxt", "genfromtxt", "fromfile", "memmap", "imread"}
+# Calls that open a file handle for reading or writing: open() of any module, and the pandas
+# and matplotlib writer/reader objects
+FILE_OPENING_CALLS = {"open", "ExcelWriter", "ExcelFile", "HDFStore", "PdfPages"}
+# uuid functions; their values can be put into a file name under images/
+UUID_FUNCTIONS = {"uuid1", "uuid4"}
+# read_*/to_*/save*/load*-style methods that do not touch files
+NON_FILE_METHODS = {
+    "to_dict", "to_numpy", "to_list", "to_frame", "to_datetime", "to_numeric", "to_timedelta",
+    "to_period", "to_timestamp", "to_records", "to_series", "to_flat_index", "to_pydatetime",
+    "to_rgba", "to_rgb", "to_hex", "to_offset", "to_julian_date", "to_datetime64",
+    # methods of file objects, whose open() call is checked
+    "write", "writelines",
+}
+# Calls that look like they reach files or the network; unknown ones need a model review
+IO_LOOKING_METHOD = re.compile(r"^(read_|to_|save|load|write|dump|download|upload|fetch|urlopen|open_)")
+PATH_KEYWORDS = (
+    "file", "fname", "fp", "path", "path_or_buf", "path_or_buffer", "filepath_or_buffer", "io",
+    "excel_writer", "buf", "filename",
+)
+
+
+def strip_code_fences(script):
+    # Same clean-up PythonAstREPLTool applies before running a script
+    script = re.sub(r"^(\s|`)*(?i:python)?\s*", "", script)
+    return re.sub(r"(\s|`)*$", "", script)
+
+
+class _ScriptChecker(ast.NodeVisitor):
+    def __init__(self):
+        self.unsafe = []
+        self.ambiguous = []
+        self.os_aliases = set()
+        self.uuid_aliases = set()
+        # Functions imported by name, e.g. `from pandas import read_csv`
+        self.imported_functions = set()
+        self.uuid_functions = set()
+        self.assignments = {}
+        # Names bound once by a plain assignment; only those are resolved to their value
+        self.single_assignments = set()
+        # Name nodes used as a call target or as the object of an attribute, e.g. `open` in open(...)
+        self.direct_uses = set()
+
+    def prepare(self, tree):
+        bindings = {}
+        assigned = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+                bindings[node.id] = bindings.get(node.id, 0) + 1
+            elif isinstance(node, ast.arg):
+                bindings[node.arg] = bindings.get(node.arg, 0) + 1
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                bindings[node.name] = bindings.get(node.name, 0) + 1
+            elif isinstance(node, (ast.Global, ast.Nonlocal)):
+                for name in node.names:
+                    bindings[name] = bindings.get(name, 0) + 2
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                assigned.add(node.targets[0].id)
+        self.single_assignments = {name for name in assigned if bindings.get(name) == 1}
+
+    def _module_verdict(self, module_name, line):
+        top_level = module_name.split(".")[0]
+        if top_level in ALLOWED_MODULES or module_name == "os.path" or module_name.startswith("os.path."):
+            return
+        if top_level == "os":
+            return
+        if top_level in DENIED_MODULES:
+            self.unsafe.append(f"line {line}: import of '{module_name}' is not allowed")
+        else:
+            self.ambiguous.append(f"line {line}: import of '{module_name}' is outside the allowlist")
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self._module_verdict(alias.name, node.lineno)
+            if alias.name == "os":
+                self.os_aliases.add(alias.asname or "os")
+            elif alias.name == "uuid":
+                self.uuid_aliases.add(alias.asname or "uuid")
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node):
+        module_name = node.module or ""
+        if node.level:
+            self.unsafe.append(f"line {node.lineno}: relative imports are not allowed")
+        elif module_name == "os":
+            for alias in node.names:
+                self._os_name_verdict(alias.name, node.lineno)
+        else:
+            self._module_verdict(module_name, node.lineno)
+            self.imported_functions.update(alias.asname or alias.name for alias in node.names)
+            if module_name == "uuid":
+                self.uuid_functions.update(alias.asname or alias.name for alias in node.names if alias.name in UUID_FUNCTIONS)
+        self.generic_visit(node)
+
+    def _os_name_verdict(self, name, line):
+        if name in ALLOWED_OS_NAMES:
+            return
+        if name in DENIED_OS_NAMES or name == "*":
+            self.unsafe.append(f"line {line}: 'os.{name}' is not allowed")
+        else:
+            self.ambiguous.append(f"line {line}: 'os.{name}' is outside the allowlist")
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id in self.single_assignments:
+                self.assignments[target.id] = node.value
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id.startswith("__") and node.id.endswith("__") and node.id not in ALLOWED_DUNDER_NAMES:
+            self.unsafe.append(f"line {node.lineno}: access to '{node.id}' is not allowed")
+        if id(node) not in self.direct_uses and (node.id == "open" or node.id in self.os_aliases):
+            # f = open; f("app.py", "w") would skip the path check
+            self.unsafe.append(f"line {node.lineno}: '{node.id}' may only be used directly, not passed around or aliased")
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        self.direct_uses.add(id(node.value))
+        if node.attr in DENIED_ATTRIBUTES:
+            self.unsafe.append(f"line {node.lineno}: attribute '{node.attr}' is not allowed")
+        if node.attr == "io":
+            # pandas.io and friends hold file helpers the checker does not know
+            self.ambiguous.append(f"line {node.lineno}: file helpers under '.io' need a review")
+        if isinstance(node.value, ast.Name) and node.value.id in self.os_aliases:
+            self._os_name_verdict(node.attr, node.lineno)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        self.direct_uses.add(id(node.func))
+        if isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name in DENIED_BUILTINS:
+                self.unsafe.append(f"line {node.lineno}: call to '{name}()' is not allowed")
+            elif name in AMBIGUOUS_BUILTINS:
+                self.ambiguous.append(f"line {node.lineno}: dynamic attribute access via '{name}()'")
+            elif name == "open":
+                self._check_path(node, "open()")
+            elif name in self.imported_functions:
+                self._check_method_call(node, name)
+        elif isinstance(node.func, ast.Attribute):
+            self._check_method_call(node, node.func.attr)
+        self.generic_visit(node)
+
+    def _check_method_call(self, node, name):
+        description = f"{name}()"
+        if name in NON_FILE_METHODS:
+            return
+        if name in FILE_OPENING_CALLS:
+            self._check_path(node, description, required=True)
+        elif name in FILE_WRITING_METHODS:
+            self._check_path(node, description, required=False)
+        elif name in FILE_READING_METHODS or name.startswith("read_"):
+            self._check_path(node, description, required=True)
+        elif IO_LOOKING_METHOD.match(name):
+            self.ambiguous.append(f"line {node.lineno}: cannot tell whether {description} reads or writes files")
+        if any(keyword.arg == "allow_pickle" and not (isinstance(keyword.value, ast.Constant) and keyword.value.value is False) for keyword in node.keywords):
+            self.unsafe.append(f"line {node.lineno}: {description} with allow_pickle can run arbitrary code")
+
+    def _check_path(self, call, description, required=False):
+        path_node = call.args[0] if call.args else None
+        if path_node is None:
+            for keyword in call.keywords:
+                if keyword.arg in PATH_KEYWORDS:
+                    path_node = keyword.value
+        if path_node is None:
+            # e.g. df.to_markdown() returning a string
+            if required:
+                self.ambiguous.append(f"line {call.lineno}: cannot find the file path passed to {description}")
+            return
+
+        in_images = self._path_in_images(path_node)
+        if in_images is None:
+            self.ambiguous.append(f"line {call.lineno}: cannot verify the file path passed to {description}")
+        elif not in_images:
+            self.unsafe.append(f"line {call.lineno}: {description} may only use files inside the '{IMAGES_DIRECTORY}' folder")
+
+    def _resolve(self, node, depth=0):
+        # Follow `name = value` assignments of names bound only once, a few levels deep
+        while isinstance(node, ast.Name) and node.id in self.assignments and depth < 3:
+            node = self.assignments[node.id]
+            depth += 1
+        return node
+
+    def _path_parts(self, node):
+        """The pieces of a path expression: strings for constant text, AST nodes for the rest."""
+        node = self._resolve(node)
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return [node.value]
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                parts.extend(self._path_parts(value.value if isinstance(value, ast.FormattedValue) else value))
+            return parts
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+            return self._path_parts(node.left) + self._path_parts(node.right)
+        if isinstance(node, ast.Call) and _is_os_path_join(node.func) and node.args and not node.keywords:
+            parts = []
+            for index, arg in enumerate(node.args):
+                arg_parts = self._path_parts(arg)
+                if index and isinstance(arg_parts[0], str) and arg_parts[0].startswith(("/", "\\", "~")):
+                    # os.path.join("images", "/etc/passwd") is "/etc/passwd"
+                    return arg_parts
+                parts.extend((["/"] if index else []) + arg_parts)
+            return parts
+        return [node]
+
+    def _is_unique_name(self, node):
+        """Whether `node` is a uuid value (or str/hex/slice of one), safe to put into a file name."""
+        node = self._resolve(node)
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, int)
+        if isinstance(node, (ast.Attribute, ast.Subscript)):
+            if isinstance(node, ast.Attribute) and node.attr != "hex":
+                return False
+            return self._is_unique_name(node.value)
+        if not isinstance(node, ast.Call):
+            return False
+        func = node.func
+        if isinstance(func, ast.Name) and func.id == "str" and len(node.args) == 1:
+            return self._is_unique_name(node.args[0])
+        if isinstance(func, ast.Name):
+            return func.id in self.uuid_functions
+        return (
+            isinstance(func, ast.Attribute)
+            and func.attr in UUID_FUNCTIONS
+            and isinstance(func.value, ast.Name)
+            and func.value.id in self.uuid_aliases
+        )
+
+    def _path_in_images(self, node):
+        """True/False when the path is known to be inside/outside images/, None when unknown."""
+        parts = self._path_parts(node)
+        head = parts[0] if isinstance(parts[0], str) else ""
+        if "://" in head or head.startswith(("/", "\\", "~")):
+            return False
+        path = ""
+        for part in parts:
+            if isinstance(part, str):
+                path += part
+            elif self._is_unique_name(part):
+                path += "x"
+            else:
+                # Anything else after the prefix could be '../..' or an absolute path
+                return None
+        return _is_images_path(path)
+
+
+def _is_os_path_join(func):
+    return (
+        isinstance(func, ast.Attribute)
+        and func.attr == "join"
+        and isinstance(func.value, ast.Attribute)
+        and func.value.attr == "path"
+    )
+
+
+def _is_images_path(path):
+    path = path.replace("\\", "/")
+    if path.startswith(("/", "~")) or "://" in path or ".." in path.split("/"):
+        return False
+    normalized = posixpath.normpath(path)
+    return normalized.split("/")[0] == IMAGES_DIRECTORY and normalized != IMAGES_DIRECTORY
+
+
+def check_python_script(script):
+    """
+    Statically inspect a generated Python report script.
+
+    Parameters:
+    script (str): The Python script to check.
+
+    Returns:
+    tuple: (verdict, reason) where verdict is SAFE, UNSAFE or AMBIGUOUS. Only AMBIGUOUS
+    scripts need a model review.
+    """
+    try:
+        tree = ast.parse(strip_code_fences(script))
+    except SyntaxError as e:
+        return UNSAFE, f"The script is not valid Python (line {e.lineno}): {e.msg}"
+
+    checker = _ScriptChecker()
+    checker.prepare(tree)
+    checker.visit(tree)
+
+    if checker.unsafe:
+        return UNSAFE, "; ".join(dict.fromkeys(checker.unsafe))
+    if checker.ambiguous:
+        return AMBIGUOUS, "; ".join(dict.fromkeys(checker.ambiguous))
+    return SAFE, "The script only uses allowlisted modules and writes inside the images folder."
@@ -0,0 +1,80 @@
+from typing_extensions import Literal
+from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+from nodes.llm_clients import get_chat_model
+from nodes.erd_image_cache import get_erd_data_url
+from nodes.agent_state import AgentState
+from nodes.nodes_name import QUERY_GENERATION
+
+
+user_msg = """
+    The user has provided the following query: {query}
+
+    Using the attached ERD diagram:
+    1. Decide whether the query aligns with the structure and relationships defined in the ERD diagram.
+    2. If it does not, explain why in plain and simple English so the user understands the issue and knows how to fix it.
+    3. If it does, rewrite the query to make it align with the structure and relationships defined in the ERD diagram.
+       The rewritten query must be concise, use plain English and match the data's context.
+    4. If it does, list the table names from the ERD that may be necessary to answer the query.
+"""
+
+
+class front_end_result(BaseModel):
+    """Relevance check, rewritten query and candidate tables for a user query."""
+    is_relevant: bool = Field(description="True if the query aligns with the ERD diagram")
+    reason: str = Field(description="Reason for the relevance decision")
+    rephrased_query: str = Field(description="Query rewritten to align with the ERD, empty if not relevant")
+    selected_tables: list[str] = Field(description="Table names from the ERD needed to answer the query, empty if not relevant")
+
+
+def _front_end_chain(state: AgentState):
+    query = state["query"]
+    erd_file = state["db_info"]["erd_path"]
+    image_url = get_erd_data_url(erd_file)
+
+    llm = get_chat_model()
+    llm_with_tool = llm.with_structured_output(front_end_result)
+
+    message = HumanMessage(
+        content=[
+            {"type": "text", "text": user_msg.format(query=query)},
+            {
+                "type": "image_url",
+                "image_url": {"url": image_url},
+            },
+        ],
+    )
+    return llm_with_tool, [message]
+
+
+def _front_end_command(result):
+    if not result.is_relevant:
+        return Command(
+            update={
+                "is_query_relevant": False,
+                "reports": result.reason
+            },
+        )
+
+    print(f"Rephrased Query: {result.rephrased_query}")
+    return Command(
+        update={
+            "is_query_relevant": True,
+            "rephrased_query": result.rephrased_query,
+            "selected_tables": ", ".join(result.selected_tables),
+        },
+        goto=QUERY_GENERATION
+    )
+
+
+def query_front_end(state: AgentState) -> Command[Literal[ QUERY_GENERATION ]]:
+    print("--- QUERY FRONT END (RELEVANCY, RE-WRITE, TABLE SELECTION) ---")
+    chain, messages = _front_end_chain(state)
+    return _front_end_command(chain.invoke(messages))
+
+
+async def aquery_front_end(state: AgentState) -> Command[Literal[ QUERY_GENERATION ]]:
+    print("--- QUERY FRONT END (RELEVANCY, RE-WRITE, TABLE SELECTION) ---")
+    chain, messages = _front_end_chain(state)
+    return _front_end_command(await chain.ainvoke(messages))
@@ -1,31 +1,20 @@
-import base64
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import END
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
+from nodes.erd_image_cache import get_erd_data_url
 from nodes.agent_state import AgentState
 from nodes.nodes_name import TABLE_SELECTION
+from nodes.graph_options import use_speculative_front_end
 
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-    
-
-
-def re_write_query(state: AgentState) -> AgentState:
-    print("--- RE-WRITING QUERY ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _re_write_query_chain(state: AgentState):
     query = state["query"]
     erd_file = state['db_info']["erd_path"]
-    image_data = encode_image(erd_file)
+    image_url = get_erd_data_url(erd_file)
 
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     REPHRASED_QUERY_PROMPT = f"""
         The user has provided the following query: {query}. 
         The query is relevant to the ERD diagram. 
@@ -38,18 +27,32 @@ def re_write_query(state: AgentState) -> AgentState:
             {"type": "text", "text": REPHRASED_QUERY_PROMPT},
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"},
+                "image_url": {"url": image_url},
             },
         ],
     )
 
-    llm = llm | StrOutputParser()
-    rephrased_question = llm.invoke([message])
+    return llm | StrOutputParser(), [message]
 
+
+def _re_write_command(rephrased_question):
     print(f"Rephrased Query: {rephrased_question}")
     return Command(
         update={
             "rephrased_query": rephrased_question,
         },
-        goto=TABLE_SELECTION
-    ) 
\ No newline at end of file
+        # Table selection runs alongside when the front end is speculative
+        goto=() if use_speculative_front_end() else TABLE_SELECTION
+    )
+
+
+def re_write_query(state: AgentState) -> AgentState:
+    print("--- RE-WRITING QUERY ---")
+    chain, messages = _re_write_query_chain(state)
+    return _re_write_command(chain.invoke(messages))
+
+
+async def are_write_query(state: AgentState) -> AgentState:
+    print("--- RE-WRITING QUERY ---")
+    chain, messages = _re_write_query_chain(state)
+    return _re_write_command(await chain.ainvoke(messages))
@@ -1,12 +1,12 @@
-import base64
 from typing_extensions import TypedDict, Literal
 from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
+from nodes.erd_image_cache import get_erd_data_url
 from nodes.agent_state import AgentState
 from nodes.nodes_name import RE_WRITE_QUERY, QUERY_RELEVANCY_REPORT
+from nodes.graph_options import use_speculative_front_end
 
 user_msg = """
         Evaluate the query: {query} based on the following:
@@ -26,45 +26,45 @@ user_msg = """
 
 
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
+class grade(BaseModel):
+    """Binary score for relevance check."""
+    binary_score: str = Field(description="Relevance score 'yes' or 'no'")
+    reason: str = Field(description="Reason for the score")
 
 
-def check_query_relevancy(state: AgentState) -> Command[Literal[ RE_WRITE_QUERY ]]:
-    print("--- QUERY RELEVANCY CHECK ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _relevancy_chain(state: AgentState):
     query = state["query"]
     db_info = state["db_info"]
     erd_file = db_info["erd_path"]
 
-    
-    class grade(BaseModel):
-        """Binary score for relevance check."""
-        binary_score: str = Field(description="Relevance score 'yes' or 'no'")
-        reason: str = Field(description="Reason for the score")
-
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     llm_with_tool = llm.with_structured_output(grade)
-    image_data = encode_image(erd_file)
+    image_url = get_erd_data_url(erd_file)
 
     message = HumanMessage(
         content=[
             {"type": "text", "text": f"Does the query: {query} align with the structure and relationships defined in the ERD diagram?"},
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"},
+                "image_url": {"url": image_url},
             },
         ],
     )
+    return llm_with_tool, [message]
 
-    scored_result = llm_with_tool.invoke([message])
-    grade = scored_result.binary_score
 
-    if grade == "yes":
+def _relevancy_command(scored_result):
+    if use_speculative_front_end():
+        # The rewrite is already running; front_end_gate acts on the verdict
+        is_relevant = scored_result.binary_score == "yes"
+        return Command(
+            update={
+                "is_query_relevant": is_relevant,
+                "reports": None if is_relevant else scored_result.reason
+            },
+        )
+
+    if scored_result.binary_score == "yes":
         return Command(
             goto = RE_WRITE_QUERY
         ) 
@@ -75,3 +75,14 @@ def check_query_relevancy(state: AgentState) -> Command[Literal[ RE_WRITE_QUERY
             },
         ) 
 
+
+def check_query_relevancy(state: AgentState) -> Command[Literal[ RE_WRITE_QUERY ]]:
+    print("--- QUERY RELEVANCY CHECK ---")
+    chain, messages = _relevancy_chain(state)
+    return _relevancy_command(chain.invoke(messages))
+
+
+async def acheck_query_relevancy(state: AgentState) -> Command[Literal[ RE_WRITE_QUERY ]]:
+    print("--- QUERY RELEVANCY CHECK ---")
+    chain, messages = _relevancy_chain(state)
+    return _relevancy_command(await chain.ainvoke(messages))
@@ -6,17 +6,11 @@ from langchain.prompts.chat import (
     SystemMessagePromptTemplate,
 )
 from langchain.schema import StrOutputParser
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
 from langgraph.types import Command
 from nodes.nodes_name import SANITIZE_PYTHON_SCRIPT
 from nodes.agent_state import AgentState
-
-
-def get_schema(db_info, selected_tables):
-    tables = db_info["details"]
-    selected_info = [table for table in tables if table["table_name"] in selected_tables]
-    return selected_info
+from nodes.dataset_schema import render_schema
 
 
 sys_msg = """
@@ -40,21 +34,15 @@ user_msg = """
 
     """
 
-def re_generate_Python_code(state: AgentState) -> AgentState:
-    print("--- PYTHON CODE RE-GENERATOR ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _re_generate_chain(state: AgentState):
     Python_script = state["Python_Code"]
     
     df = state["data_frame"]
     script_security_issues = state.get("script_security_issues", "")
     execution_error = state.get("execution_error", "")
-    Python_script_check = state['Python_script_check']
 
     df_head = str(df.head(5).to_markdown()) 
-    db_schema = get_schema(state["db_info"], state["selected_tables"])
+    db_schema = render_schema(state["db_info"], state["selected_tables"], include_samples=False)
 
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -63,20 +51,34 @@ def re_generate_Python_code(state: AgentState) -> AgentState:
         ]
     )
 
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     chain = prompt | llm | StrOutputParser()
-    code = chain.invoke({"df_head": df_head, 
-                         "df_columns": str(db_schema), 
-                         "Python_script": Python_script, 
-                         "security_issue": script_security_issues, 
-                         "execution_error": execution_error})
+    return chain, {"df_head": df_head, 
+                   "df_columns": db_schema, 
+                   "Python_script": Python_script, 
+                   "security_issue": script_security_issues, 
+                   "execution_error": execution_error}
 
+
+def _re_generate_command(state: AgentState, code):
     print(f"Re-generated Python code:\n{code}")
     return Command(
         update={
             "Python_Code" : code,
             "execution_error": None,
-            "Python_script_check": Python_script_check + 1
+            "Python_script_check": state['Python_script_check'] + 1
         },
         goto = SANITIZE_PYTHON_SCRIPT
-    )
\ No newline at end of file
+    )
+
+
+def re_generate_Python_code(state: AgentState) -> AgentState:
+    print("--- PYTHON CODE RE-GENERATOR ---")
+    chain, inputs = _re_generate_chain(state)
+    return _re_generate_command(state, chain.invoke(inputs))
+
+
+async def are_generate_Python_code(state: AgentState) -> AgentState:
+    print("--- PYTHON CODE RE-GENERATOR ---")
+    chain, inputs = _re_generate_chain(state)
+    return _re_generate_command(state, await chain.ainvoke(inputs))
@@ -0,0 +1,39 @@
+import asyncio
+from langgraph.types import Command
+from decouple import config
+from nodes.agent_state import AgentState
+from nodes.chart_renderer import parse_report_spec, render_report_spec
+from nodes.nodes_name import PYTHON_CODE_GENERATOR, REPORT_GENERATOR
+
+
+def render_report(state: AgentState) -> AgentState:
+    print("--- RENDER REPORT ---")
+    try:
+        spec = parse_report_spec(state.get("report_type"))
+        results, images = render_report_spec(
+            spec,
+            state["data_frame"],
+            state["rephrased_query"],
+            max_table_rows=config("REPORT_TABLE_MAX_ROWS", default=50, cast=int),
+        )
+    except Exception as e:
+        # ChartSpecError, or a result the engine fails on; a generated script may still draw it
+        print(f"------ Cannot render the report type ({e}), go to {PYTHON_CODE_GENERATOR} ------")
+        return Command(
+            goto=PYTHON_CODE_GENERATOR
+        )
+
+    print(f"Execution Results:\n{results}")
+    return Command(
+        update={
+            "execution_results": results,
+            "execution_images": images,
+            "execution_error": None
+        },
+        goto=REPORT_GENERATOR
+    )
+
+
+async def arender_report(state: AgentState) -> AgentState:
+    # Drawing is CPU bound, so it runs off the event loop
+    return await asyncio.to_thread(render_report, state)
@@ -5,16 +5,12 @@ from langchain.prompts.chat import (
     SystemMessagePromptTemplate,
 )
 from langchain.schema import StrOutputParser
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
 from nodes.agent_state import AgentState
+from nodes.dataset_schema import render_schema
+from nodes.result_summarizer import get_data_frame_summary
 
 
-def get_schema(db_info, selected_tables):
-    tables = db_info["details"]
-    selected_info = [table for table in tables if table["table_name"] in selected_tables]
-    return selected_info
-
 sys_msg = """
 You are a report generator expert. Combine numerical analysis with narrative descriptions, visualizations and charts. Generate report in markdown format only.
 """
@@ -29,18 +25,17 @@ user_msg = """
     Report should reflect only the answer of the user's query based on {execution_results} in Markdown format.
     DO NOT INCLUDE ```markdown TAGS IN YOUR RESPONSE.
     Do not include any other text or your assumptions in the report.
+    {truncation_notice}
     """
 
-def generate_report(state: AgentState) -> AgentState:
-    print("--- REPORT GENERATOR ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _report_chain(state: AgentState):
     rephrased_query = state["rephrased_query"]
-    df = state["data_frame"]
-    db_schema = get_schema(state["db_info"], state["selected_tables"])
+    df_summary = get_data_frame_summary(state)
+    db_schema = render_schema(state["db_info"], state["selected_tables"], include_samples=False)
     execution_results = state["execution_results"]
+    truncation_notice = ""
+    if state.get("data_truncated"):
+        truncation_notice = "The query result was cut off at the configured row limit. State clearly at the start of the report that it is based on a partial result."
 
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -48,16 +43,33 @@ def generate_report(state: AgentState) -> AgentState:
             HumanMessagePromptTemplate.from_template(user_msg),
         ]
     )
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     chain = prompt | llm | StrOutputParser()
-    reports = chain.invoke({"query": rephrased_query, 
-                            "column_descriptions": str(db_schema),
-                            "execution_results": execution_results, 
-                            "df": str(df)})
+    return chain, {"query": rephrased_query, 
+                   "column_descriptions": db_schema,
+                   "execution_results": execution_results, 
+                   "df": df_summary,
+                   "truncation_notice": truncation_notice}
+
+
+def generate_report(state: AgentState) -> AgentState:
+    print("--- REPORT GENERATOR ---")
+    chain, inputs = _report_chain(state)
+    reports = chain.invoke(inputs)
 
     # with open("reports.md", "w") as file:
     #     file.write(reports)
 
     return {
         "reports": reports
-    }
\ No newline at end of file
+    }
+
+
+async def agenerate_report(state: AgentState) -> AgentState:
+    print("--- REPORT GENERATOR ---")
+    chain, inputs = _report_chain(state)
+    reports = await chain.ainvoke(inputs)
+
+    return {
+        "reports": reports
+    }
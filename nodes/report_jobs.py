@@ -0,0 +1,397 @@
+import os
+import time
+import uuid
+import threading
+from sqlalchemy import create_engine, event, text, Column, String, Float, Text, Boolean, Index
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker
+from decouple import config
+from nodes.answer_cache import normalize_query
+
+
+# Report jobs are kept in their own SQLite file next to db_info.db, so every process
+# (Streamlit, API, workers) sees the same queue and a browser refresh loses nothing.
+project_root = os.path.abspath(os.path.dirname(__file__) + "/..")
+jobs_db_path = config("REPORT_JOBS_DB_PATH", default=os.path.join(project_root, "data", "report_jobs.db"))
+
+engine = create_engine(f"sqlite:///{jobs_db_path}", connect_args={"timeout": 30, "check_same_thread": False})
+
+
+@event.listens_for(engine, "connect")
+def _enable_wal(dbapi_connection, connection_record):
+    # Lets the UI poll while workers write progress
+    dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
+Base = declarative_base()
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+IN_FLIGHT = (QUEUED, RUNNING)
+
+
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        Index("ix_report_jobs_status_created", "status", "created_at"),
+        Index("ix_report_jobs_dedup", "db_name", "normalized_query", "status"),
+    )
+
+    id = Column(String, primary_key=True)
+    db_name = Column(String, nullable=False)
+    query = Column(Text, nullable=False)
+    normalized_query = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default=QUEUED)
+    current_node = Column(String, nullable=True)
+    sql_query = Column(Text, nullable=True)
+    result_preview = Column(Text, nullable=True)
+    partial_report = Column(Text, nullable=True)
+    report = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker_id = Column(String, nullable=True)
+    created_at = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=True)
+    heartbeat_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+
+    def __repr__(self):
+        return f"<ReportJob(id='{self.id}', db_name='{self.db_name}', status='{self.status}')>"
+
+
+# At most one live job per (db_name, normalized_query), so concurrent enqueue_report calls in
+# any process share one run
+IN_FLIGHT_CONDITION = "status IN ('queued', 'running') AND cancel_requested = 0"
+
+Session = sessionmaker(bind=engine)
+
+_initialized = False
+_init_lock = threading.Lock()
+
+
+def init_report_jobs_db():
+    """
+    Create the jobs table and its in-flight index, once per process. Every function of this
+    module calls it, so importing the module touches no database.
+
+    create_all cannot add the index to an existing table, and a table from before it may hold
+    duplicate live jobs: the newer ones are cancelled first.
+    """
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        os.makedirs(os.path.dirname(jobs_db_path), exist_ok=True)
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            duplicate = f"""
+                {IN_FLIGHT_CONDITION} AND EXISTS (
+                    SELECT 1 FROM report_jobs AS older
+                    WHERE older.db_name = report_jobs.db_name
+                      AND older.normalized_query = report_jobs.normalized_query
+                      AND older.status IN ('queued', 'running') AND older.cancel_requested = 0
+                      AND (older.created_at < report_jobs.created_at
+                           OR (older.created_at = report_jobs.created_at AND older.id < report_jobs.id))
+                )"""
+            connection.exec_driver_sql(f"UPDATE report_jobs SET status = 'cancelled', cancel_requested = 1, finished_at = created_at WHERE status = 'queued' AND {duplicate}")
+            connection.exec_driver_sql(f"UPDATE report_jobs SET cancel_requested = 1 WHERE {duplicate}")
+            connection.exec_driver_sql(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_report_jobs_in_flight "
+                f"ON report_jobs (db_name, normalized_query) WHERE {IN_FLIGHT_CONDITION}"
+            )
+        _initialized = True
+
+
+def _session():
+    init_report_jobs_db()
+    return Session()
+
+
+_job_available = threading.Event()
+
+
+def _job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "db_name": job.db_name,
+        "query": job.query,
+        "status": job.status,
+        "current_node": job.current_node,
+        "sql_query": job.sql_query,
+        "result_preview": job.result_preview,
+        "partial_report": job.partial_report,
+        "report": job.report,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _update_job(job_id, *conditions, **fields):
+    """Update a job, only if it still matches `conditions`; returns whether it was updated."""
+    session = _session()
+    try:
+        updated = session.query(ReportJob).filter(ReportJob.id == job_id, *conditions).update(fields, synchronize_session=False)
+        session.commit()
+        return bool(updated)
+    finally:
+        session.close()
+
+
+def _purge_old_jobs(session):
+    retention_seconds = config("REPORT_JOB_RETENTION_SECONDS", default=7 * 24 * 3600, cast=int)
+    session.query(ReportJob).filter(
+        ReportJob.finished_at.isnot(None),
+        ReportJob.finished_at < time.time() - retention_seconds,
+    ).delete(synchronize_session=False)
+
+
+def enqueue_report(db_name, query):
+    """
+    Queue a report and return its job id.
+
+    An identical (db_name, query) request that is still queued or running is reused
+    instead of starting a second, duplicate run. The insert and the check are one statement
+    against the in-flight unique index, so this holds across threads and processes.
+    """
+    normalized_query = normalize_query(query)
+    session = _session()
+    try:
+        _purge_old_jobs(session)
+        while True:
+            job_id = uuid.uuid4().hex
+            statement = insert(ReportJob).values(
+                id=job_id,
+                db_name=db_name.lower(),
+                query=query,
+                normalized_query=normalized_query,
+                status=QUEUED,
+                cancel_requested=False,
+                created_at=time.time(),
+            ).on_conflict_do_nothing(index_elements=["db_name", "normalized_query"], index_where=text(IN_FLIGHT_CONDITION))
+            inserted = session.execute(statement).rowcount
+            session.commit()
+            if inserted:
+                break
+            existing = session.query(ReportJob.id).filter(
+                ReportJob.db_name == db_name.lower(),
+                ReportJob.normalized_query == normalized_query,
+                ReportJob.status.in_(IN_FLIGHT),
+                ReportJob.cancel_requested.is_(False),
+            ).scalar()
+            if existing is not None:
+                return existing
+            # The conflicting job finished in between; try the insert again
+    finally:
+        session.close()
+
+    _job_available.set()
+    return job_id
+
+
+def pending_job_count():
+    """Jobs that are queued or running, across every process."""
+    session = _session()
+    try:
+        return session.query(ReportJob).filter(ReportJob.status.in_(IN_FLIGHT)).count()
+    finally:
+        session.close()
+
+
+def get_job(job_id):
+    session = _session()
+    try:
+        job = session.get(ReportJob, job_id)
+        return _job_to_dict(job) if job is not None else None
+    finally:
+        session.close()
+
+
+def stored_reports():
+    """Reports and partial reports of every kept job, for the image store's garbage collection."""
+    session = _session()
+    try:
+        for report, partial_report in session.query(ReportJob.report, ReportJob.partial_report).yield_per(200):
+            yield report
+            yield partial_report
+    finally:
+        session.close()
+
+
+def cancel_job(job_id):
+    """Cancel a queued job at once; a running job stops after its current step."""
+    session = _session()
+    try:
+        now = time.time()
+        cancelled = session.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status == QUEUED).update(
+            {"status": CANCELLED, "cancel_requested": True, "finished_at": now}, synchronize_session=False
+        )
+        if not cancelled:
+            cancelled = session.query(ReportJob).filter(ReportJob.id == job_id, ReportJob.status == RUNNING).update(
+                {"cancel_requested": True}, synchronize_session=False
+            )
+        session.commit()
+        return bool(cancelled)
+    finally:
+        session.close()
+
+
+def _is_cancel_requested(job_id):
+    session = _session()
+    try:
+        return bool(session.query(ReportJob.cancel_requested).filter(ReportJob.id == job_id).scalar())
+    finally:
+        session.close()
+
+
+def _requeue_stale_jobs():
+    # Jobs whose worker died (e.g. the server restarted) go back to the queue
+    stale_seconds = config("REPORT_JOB_STALE_SECONDS", default=600, cast=int)
+    session = _session()
+    try:
+        session.query(ReportJob).filter(
+            ReportJob.status == RUNNING,
+            ReportJob.heartbeat_at < time.time() - stale_seconds,
+        ).update({"status": QUEUED, "worker_id": None, "current_node": None, "partial_report": None}, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def _claim_next_job(worker_id):
+    session = _session()
+    try:
+        while True:
+            job = session.query(ReportJob).filter(ReportJob.status == QUEUED).order_by(ReportJob.created_at).first()
+            if job is None:
+                return None
+            now = time.time()
+            # Only one worker wins the conditional update, across threads and processes
+            claimed = session.query(ReportJob).filter(ReportJob.id == job.id, ReportJob.status == QUEUED).update(
+                {"status": RUNNING, "worker_id": worker_id, "started_at": now, "heartbeat_at": now},
+                synchronize_session=False,
+            )
+            session.commit()
+            if claimed:
+                return {"job_id": job.id, "db_name": job.db_name, "query": job.query, "worker_id": worker_id}
+    finally:
+        session.close()
+
+
+def _keep_heartbeat(job_id, worker_id, stopped):
+    # Runs next to the graph, so a node that takes longer than REPORT_JOB_STALE_SECONDS does
+    # not make the job look abandoned to another process's _requeue_stale_jobs
+    interval = config("REPORT_JOB_HEARTBEAT_SECONDS", default=30.0, cast=float)
+    while not stopped.wait(interval):
+        try:
+            _update_job(job_id, ReportJob.status == RUNNING, ReportJob.worker_id == worker_id, heartbeat_at=time.time())
+        except Exception as e:
+            print(f"Report job {job_id} heartbeat failed: {e}")
+
+
+def _run_job(job):
+    # Imported here so the queue can be used without building the graph
+    from reporting_graph_generator import stream_reports
+
+    job_id = job["job_id"]
+    flush_seconds = config("REPORT_JOB_PROGRESS_SECONDS", default=1.0, cast=float)
+    partial_report = ""
+    last_flush = 0.0
+    heartbeat_stopped = threading.Event()
+    threading.Thread(
+        target=_keep_heartbeat, args=(job_id, job.get("worker_id"), heartbeat_stopped), name=f"report-heartbeat-{job_id[:8]}", daemon=True
+    ).start()
+    # The job id doubles as the trace id, so the UI can show the run's timings
+    events = stream_reports(job["db_name"], job["query"], trace_id=job_id)
+    try:
+        for graph_event in events:
+            fields = {}
+            if graph_event["type"] == "node_start":
+                fields["current_node"] = graph_event["node"]
+            elif graph_event["type"] == "sql":
+                fields["sql_query"] = graph_event["sql"]
+            elif graph_event["type"] == "result_preview":
+                fields["result_preview"] = graph_event["data_frame"].to_json(orient="split", date_format="iso", default_handler=str)
+            elif graph_event["type"] == "report_token":
+                partial_report += graph_event["text"]
+            elif graph_event["type"] == "report":
+                # A cancel that arrived during the last step wins over the finished report
+                finished = _update_job(
+                    job_id, ReportJob.cancel_requested.is_(False),
+                    status=SUCCEEDED, report=graph_event["report"], partial_report=None, finished_at=time.time(), heartbeat_at=time.time(),
+                )
+                if not finished:
+                    _update_job(job_id, status=CANCELLED, partial_report=None, finished_at=time.time())
+                return
+
+            now = time.monotonic()
+            if fields or now - last_flush >= flush_seconds:
+                if now - last_flush >= flush_seconds:
+                    if _is_cancel_requested(job_id):
+                        _update_job(job_id, status=CANCELLED, finished_at=time.time())
+                        return
+                    fields["partial_report"] = partial_report or None
+                    last_flush = now
+                fields["heartbeat_at"] = time.time()
+                _update_job(job_id, **fields)
+    except Exception as e:
+        print(f"Report job {job_id} failed: {e}")
+        _update_job(job_id, status=FAILED, error=str(e), finished_at=time.time())
+    finally:
+        heartbeat_stopped.set()
+        # Stops the graph if the job was cancelled mid-run
+        events.close()
+
+
+def _worker_loop(worker_id):
+    failures = 0
+    while True:
+        try:
+            job = _claim_next_job(worker_id)
+            if job is None:
+                _job_available.wait(timeout=config("REPORT_JOB_POLL_SECONDS", default=1.0, cast=float))
+                _job_available.clear()
+            else:
+                print(f"Report worker {worker_id} running job {job['job_id']}")
+                _run_job(job)
+            failures = 0
+        except Exception as e:
+            # e.g. "database is locked"; the worker must outlive it, or queued jobs are never run.
+            # A job left running is re-queued once its heartbeat goes stale.
+            failures += 1
+            delay = min(2 ** failures, 60)
+            print(f"Report worker {worker_id} error, retrying in {delay}s: {e}")
+            time.sleep(delay)
+
+
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def start_report_workers():
+    """Start (once per process) the background threads that run queued report jobs."""
+    with _workers_lock:
+        if _workers:
+            return _workers
+        _requeue_stale_jobs()
+        for index in range(config("REPORT_WORKERS", default=2, cast=int)):
+            worker_id = f"{os.getpid()}-{index}"
+            worker = threading.Thread(target=_worker_loop, args=(worker_id,), name=f"report-worker-{index}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+    return _workers
+
+
+def result_preview_frame(job):
+    """Rebuild the stored result preview of a job as a DataFrame, or None."""
+    if not job.get("result_preview"):
+        return None
+    import pandas as pd
+    from io import StringIO
+
+    return pd.read_json(StringIO(job["result_preview"]), orient="split")
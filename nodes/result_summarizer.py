@@ -0,0 +1,143 @@
+from functools import lru_cache
+import pandas as pd
+from decouple import config
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken comes with langchain_openai; fall back to a rough estimate
+    tiktoken = None
+
+
+MAX_CELL_CHARACTERS = 60
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(model_name):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails on offline hosts
+        print(f"Token encoding unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text):
+    encoding = _get_encoding(config("GPT_MODEL", default="gpt-4o"))
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def _shorten_cells(df):
+    shortened = df.copy()
+    for column in shortened.select_dtypes(include=["object", "string"]).columns:
+        values = shortened[column].astype(str)
+        too_long = values.str.len() > MAX_CELL_CHARACTERS
+        shortened[column] = values.where(~too_long, values.str.slice(0, MAX_CELL_CHARACTERS - 3) + "...")
+    return shortened
+
+
+def _hashable(series):
+    # Columns holding dicts/lists cannot be counted directly
+    if series.dtype == object:
+        return series.map(lambda value: value if isinstance(value, (str, int, float, bool, type(None))) else str(value))
+    return series
+
+
+def _schema_section(df):
+    schema = pd.DataFrame({
+        "column": df.columns.astype(str),
+        "dtype": [str(dtype) for dtype in df.dtypes],
+        "non_null": df.notna().sum().values,
+        "distinct": [_hashable(df[column]).nunique(dropna=True) for column in df.columns],
+    })
+    return "Columns:\n" + schema.to_markdown(index=False)
+
+
+def _numeric_section(df):
+    numeric = df.select_dtypes(include="number")
+    if numeric.empty:
+        return ""
+    stats = numeric.describe().T[["min", "mean", "50%", "max", "std"]].round(4)
+    return "Numeric column statistics:\n" + stats.to_markdown()
+
+
+def _top_values(df, top_k=5):
+    categorical = df.select_dtypes(exclude=["number", "datetime", "datetimetz"])
+    return {
+        column: _hashable(categorical[column]).value_counts(dropna=False).head(top_k)
+        for column in categorical.columns
+    }
+
+
+def _categories_section(top_values, top_k):
+    lines = []
+    for column, counts in top_values.items():
+        if counts.empty:
+            continue
+        values = ", ".join(f"{str(value)[:MAX_CELL_CHARACTERS]} ({count})" for value, count in counts.head(top_k).items())
+        lines.append(f"- {column}: {values}")
+    if not lines:
+        return ""
+    return f"Most frequent values (top {top_k}):\n" + "\n".join(lines)
+
+
+def _sample_section(df, sample_rows):
+    if sample_rows <= 0:
+        return ""
+    if len(df) <= 2 * sample_rows:
+        return "Sample rows:\n" + _shorten_cells(df).to_markdown(index=False)
+    return (
+        f"First {sample_rows} rows:\n" + _shorten_cells(df.head(sample_rows)).to_markdown(index=False)
+        + f"\n\nLast {sample_rows} rows:\n" + _shorten_cells(df.tail(sample_rows)).to_markdown(index=False)
+    )
+
+
+def summarize_data_frame(df, max_tokens=None, truncated=False):
+    """
+    Render a SQL result for a prompt within a token budget.
+
+    Results that fit the budget are rendered in full. Larger results are described by
+    their schema, numeric statistics, most frequent values and a head/tail sample, which
+    is shrunk until the whole summary fits.
+    """
+    if df is None:
+        return "No data."
+
+    if max_tokens is None:
+        max_tokens = config("RESULT_SUMMARY_MAX_TOKENS", default=2000, cast=int)
+
+    truncation_note = "\nNote: the query result was cut off at the configured row limit, so it does not contain every matching row." if truncated else ""
+
+    # Every cell costs at least one token, so only small results are worth rendering in full
+    if len(df) * max(len(df.columns), 1) <= max_tokens:
+        completeness = "all fetched rows" if truncated else "complete result"
+        full_result = f"Result has {len(df)} rows and {len(df.columns)} columns ({completeness}):\n{_shorten_cells(df).to_markdown(index=False)}{truncation_note}"
+        if count_tokens(full_result) <= max_tokens:
+            return full_result
+
+    header = f"Result has {len(df)} rows and {len(df.columns)} columns (summary, not the complete result).{truncation_note}"
+    schema = _schema_section(df)
+    numeric = _numeric_section(df)
+    top_values = _top_values(df)
+
+    summary = header
+    for sample_rows, top_k in ((5, 5), (3, 5), (2, 3), (1, 3), (0, 3), (0, 0)):
+        sections = [header, schema, numeric, _categories_section(top_values, top_k) if top_k else "", _sample_section(df, sample_rows)]
+        summary = "\n\n".join(section for section in sections if section)
+        if count_tokens(summary) <= max_tokens:
+            break
+    return summary
+
+
+def get_data_frame_summary(state):
+    # Computed once by execute_sql_query and reused by every prompt that needs the result
+    summary = state.get("data_frame_summary")
+    if summary is None:
+        summary = summarize_data_frame(state.get("data_frame"), truncated=state.get("data_truncated", False))
+    return summary
@@ -0,0 +1,355 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import pandas as pd
+from langchain_core.callbacks import BaseCallbackHandler
+from decouple import config
+from nodes.result_summarizer import count_tokens
+
+
+# Spans follow the OpenTelemetry layout (trace_id, span_id, parent_span_id, name, start and
+# end time, status, attributes) and are written one JSON object per line, one file per run.
+project_root = os.path.abspath(os.path.dirname(__file__) + "/..")
+
+RUN = "run"
+NODE = "node"
+LLM = "llm"
+
+# USD per million prompt / completion tokens; extend or override with MODEL_PRICES
+DEFAULT_MODEL_PRICES = {
+    "gpt-4o-mini": [0.15, 0.60],
+    "gpt-4o": [2.50, 10.00],
+    "gpt-4.1-mini": [0.40, 1.60],
+    "gpt-4.1": [2.00, 8.00],
+    "o3-mini": [1.10, 4.40],
+}
+
+
+def tracing_enabled():
+    return config("TRACING", default=True, cast=bool)
+
+
+def _trace_directory():
+    directory = config("TRACE_DIR", default=os.path.join(project_root, "data", "traces"))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _model_prices():
+    prices = dict(DEFAULT_MODEL_PRICES)
+    try:
+        prices.update(json.loads(config("MODEL_PRICES", default="{}")))
+    except json.JSONDecodeError as e:
+        print(f"Invalid MODEL_PRICES ignored: {e}")
+    return prices
+
+
+def estimate_cost(model_name, prompt_tokens, completion_tokens):
+    if not model_name:
+        return None
+    prices = _model_prices()
+    # Dated model names (gpt-4o-2024-08-06) are priced like their base model
+    matches = [name for name in prices if model_name.startswith(name)]
+    if not matches:
+        return None
+    prompt_price, completion_price = prices[max(matches, key=len)]
+    return round((prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000, 6)
+
+
+def _payload_size(value, depth=0):
+    """Rough size in bytes of a node's input or output, without serializing DataFrames."""
+    if depth > 4 or value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False).sum())
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_payload_size(item, depth + 1) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_payload_size(item, depth + 1) for item in value)
+    if hasattr(value, "update") and hasattr(value, "goto"):
+        # langgraph Command
+        return _payload_size(value.update, depth + 1)
+    return sys.getsizeof(value)
+
+
+def _message_text(messages):
+    """(text of the prompt, number of images in it); image data URLs are left out of the text."""
+    texts = []
+    images = 0
+    for batch in messages:
+        for message in batch:
+            if isinstance(message.content, str):
+                texts.append(message.content)
+                continue
+            for part in message.content:
+                if isinstance(part, str):
+                    texts.append(part)
+                elif part.get("type") in ("image_url", "image"):
+                    images += 1
+                else:
+                    texts.append(str(part.get("text", "")))
+    return "\n".join(texts), images
+
+
+def _estimate_prompt_tokens(text, images):
+    # Images are priced by size and detail; a fixed cost per image keeps the ERD's base64 out of it
+    return count_tokens(text) + images * config("TRACE_IMAGE_PROMPT_TOKENS", default=765, cast=int)
+
+
+class RunTracer(BaseCallbackHandler):
+    """
+    Records one span per graph run, per node execution and per model call.
+
+    Node spans carry the attempt number (nodes re-entered by the retry loops), the input
+    and output payload sizes and the token counts and cost of the model calls made inside
+    them. The spans are written to TRACE_DIR/<trace_id>.jsonl when the run ends.
+    """
+
+    # Keep callbacks in order on the event loop of async runs
+    run_inline = True
+
+    def __init__(self, trace_id=None, attributes=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.attributes = attributes or {}
+        self.spans = []
+        self._open = {}
+        self._attempts = {}
+        self._root_run_id = None
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, name, kind, parent_run_id, attributes):
+        parent = self._open.get(parent_run_id)
+        span = {
+            "trace_id": self.trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_span_id": parent["span_id"] if parent else None,
+            "name": name,
+            "kind": kind,
+            "start_time": time.time(),
+            "end_time": None,
+            "duration_ms": None,
+            "status": "ok",
+            "attributes": attributes,
+        }
+        self._open[run_id] = span
+        return span
+
+    def _end(self, run_id, error=None):
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return None
+        span["end_time"] = time.time()
+        span["duration_ms"] = round((span["end_time"] - span["start_time"]) * 1000, 2)
+        if error is not None:
+            span["status"] = "error"
+            span["attributes"]["error"] = str(error)[:500]
+        self.spans.append(span)
+        return span
+
+    def _node_span(self, run_id):
+        # Model calls are nested in prompt | llm chains; walk up to the enclosing node
+        span = self._open.get(run_id)
+        while span is not None and span["kind"] != NODE:
+            span = span.get("_parent")
+        return span
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            if parent_run_id is None:
+                self._root_run_id = run_id
+                self._start(run_id, name or "graph", RUN, None, dict(self.attributes))
+            elif name and name == node and not node.startswith("__") and any(tag.startswith("graph:step:") for tag in tags or []):
+                self._attempts[node] = self._attempts.get(node, 0) + 1
+                span = self._start(run_id, node, NODE, self._root_run_id, {
+                    "attempt": self._attempts[node],
+                    "step": (metadata or {}).get("langgraph_step"),
+                    "input_bytes": _payload_size(inputs),
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "cost_usd": 0.0,
+                })
+                span["_parent"] = None
+            elif parent_run_id in self._open:
+                # Inner runnable of a node: tracked only to find the node of nested model calls
+                self._open[run_id] = {"kind": "chain", "span_id": self._open[parent_run_id]["span_id"], "_parent": self._open[parent_run_id]}
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish_chain(run_id, outputs=outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish_chain(run_id, error=error)
+
+    def _finish_chain(self, run_id, outputs=None, error=None):
+        with self._lock:
+            span = self._open.get(run_id)
+            if span is None:
+                return
+            if span["kind"] == "chain":
+                del self._open[run_id]
+                return
+            if span["kind"] == NODE and outputs is not None:
+                span["attributes"]["output_bytes"] = _payload_size(outputs)
+            self._end(run_id, error)
+            if run_id == self._root_run_id:
+                self._finish_run(error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        invocation_params = kwargs.get("invocation_params") or {}
+        model_name = invocation_params.get("model_name") or invocation_params.get("model") or (metadata or {}).get("ls_model_name")
+        prompt, images = _message_text(messages)
+        with self._lock:
+            node = self._node_span(parent_run_id)
+            span = self._start(run_id, f"llm {model_name or 'model'}", LLM, None, {
+                "model": model_name,
+                "prompt_chars": len(prompt),
+                "prompt_images": images,
+                "_prompt": prompt,
+            })
+            span["parent_span_id"] = node["span_id"] if node else None
+            span["_parent"] = node
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            span = self._open.get(run_id)
+            if span is None:
+                return
+            attributes = span["attributes"]
+            prompt = attributes.pop("_prompt", "")
+            text = "".join(generation.text for batch in response.generations for generation in batch)
+            usage = _usage(response)
+            if usage is None:
+                # Streamed calls report no usage unless the provider is asked for it
+                usage = (_estimate_prompt_tokens(prompt, attributes["prompt_images"]), count_tokens(text))
+                attributes["tokens_estimated"] = True
+            attributes["prompt_tokens"], attributes["completion_tokens"] = usage
+            attributes["completion_chars"] = len(text)
+            attributes["cost_usd"] = estimate_cost(attributes["model"], *usage)
+
+            node = span.get("_parent")
+            if node is not None:
+                node_attributes = node["attributes"]
+                node_attributes["prompt_tokens"] += usage[0]
+                node_attributes["completion_tokens"] += usage[1]
+                node_attributes["cost_usd"] = round(node_attributes["cost_usd"] + (attributes["cost_usd"] or 0.0), 6)
+                node_attributes["model"] = attributes["model"]
+                node_attributes["llm_calls"] = node_attributes.get("llm_calls", 0) + 1
+            self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            span = self._open.get(run_id)
+            if span is not None:
+                span["attributes"].pop("_prompt", None)
+                if span.get("_parent") is not None:
+                    node_attributes = span["_parent"]["attributes"]
+                    node_attributes["llm_errors"] = node_attributes.get("llm_errors", 0) + 1
+            self._end(run_id, error)
+
+    def _finish_run(self, error):
+        root = next(span for span in self.spans if span["kind"] == RUN)
+        nodes = [span for span in self.spans if span["kind"] == NODE]
+        root["attributes"].update({
+            "nodes": len(nodes),
+            "prompt_tokens": sum(span["attributes"]["prompt_tokens"] for span in nodes),
+            "completion_tokens": sum(span["attributes"]["completion_tokens"] for span in nodes),
+            "cost_usd": round(sum(span["attributes"]["cost_usd"] for span in nodes), 6),
+        })
+        try:
+            self._write()
+        except OSError as e:
+            print(f"Trace {self.trace_id} not written: {e}")
+
+    def _write(self):
+        directory = _trace_directory()
+        with open(os.path.join(directory, f"{self.trace_id}.jsonl"), "w") as trace_file:
+            for span in sorted(self.spans, key=lambda span: span["start_time"]):
+                trace_file.write(json.dumps({key: value for key, value in span.items() if not key.startswith("_")}, default=str) + "\n")
+        _purge_old_traces(directory)
+
+
+def _usage(response):
+    prompt_tokens = completion_tokens = 0
+    found = False
+    for batch in response.generations:
+        for generation in batch:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                found = True
+    if not found and (response.llm_output or {}).get("token_usage"):
+        token_usage = response.llm_output["token_usage"]
+        return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+    return (prompt_tokens, completion_tokens) if found else None
+
+
+def _purge_old_traces(directory):
+    cutoff = time.time() - config("TRACE_RETENTION_DAYS", default=7, cast=int) * 86400
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith(".jsonl") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def run_config(trace_id=None, **attributes):
+    """Graph config that traces the run, or an empty config when TRACING is off."""
+    if not tracing_enabled():
+        return {}
+    return {"callbacks": [RunTracer(trace_id, attributes)]}
+
+
+def load_trace(trace_id):
+    """The spans of a finished run, oldest first, or [] if it was not traced."""
+    path = os.path.join(_trace_directory(), f"{os.path.basename(trace_id)}.jsonl")
+    try:
+        with open(path) as trace_file:
+            return [json.loads(line) for line in trace_file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def summarize_traces():
+    """Latency, token and cost statistics per node over every stored trace."""
+    directory = _trace_directory()
+    rows = []
+    for name in os.listdir(directory):
+        if name.endswith(".jsonl"):
+            rows.extend(span for span in load_trace(name[:-len(".jsonl")]) if span["kind"] in (RUN, NODE))
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame({
+        "name": [span["name"] if span["kind"] == NODE else "(whole run)" for span in rows],
+        "duration_ms": [span["duration_ms"] for span in rows],
+        "prompt_tokens": [span["attributes"].get("prompt_tokens", 0) for span in rows],
+        "completion_tokens": [span["attributes"].get("completion_tokens", 0) for span in rows],
+        "cost_usd": [span["attributes"].get("cost_usd") or 0.0 for span in rows],
+        "retry": [span["attributes"].get("attempt", 1) > 1 for span in rows],
+    })
+    summary = df.groupby("name").agg(
+        calls=("duration_ms", "size"),
+        retries=("retry", "sum"),
+        p50_ms=("duration_ms", "median"),
+        p95_ms=("duration_ms", lambda values: values.quantile(0.95)),
+        total_ms=("duration_ms", "sum"),
+        prompt_tokens=("prompt_tokens", "mean"),
+        completion_tokens=("completion_tokens", "mean"),
+        cost_usd=("cost_usd", "sum"),
+    )
+    return summary.sort_values("total_ms", ascending=False).round(2)
+
+
+if __name__ == "__main__":
+    # python -m nodes.run_tracer
+    summary = summarize_traces()
+    print(summary.to_markdown() if not summary.empty else "No traces recorded yet.")
@@ -1,31 +1,20 @@
-import base64
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import END
 from langchain_core.messages import HumanMessage
 from langgraph.types import Command
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
+from nodes.erd_image_cache import get_erd_data_url
 from nodes.agent_state import AgentState
 from nodes.nodes_name import QUERY_GENERATION
+from nodes.graph_options import use_speculative_front_end
 
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode("utf-8")
-    
-
-
-def select_table_list(state: AgentState) -> AgentState:
-    print("--- SELECT TABLE LIST ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _select_table_list_chain(state: AgentState):
     query = state["query"]
     erd_file = state['db_info']["erd_path"]
-    image_data = encode_image(erd_file)
+    image_url = get_erd_data_url(erd_file)
 
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     user_prompt = f"""
         The user has provided the following query: {query}. 
         Query is relevant to the ERD diagram. 
@@ -36,17 +25,31 @@ def select_table_list(state: AgentState) -> AgentState:
             {"type": "text", "text": user_prompt},
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"},
+                "image_url": {"url": image_url},
             },
         ],
     )
 
-    llm = llm | StrOutputParser()
-    selected_tables = llm.invoke([message])
+    return llm | StrOutputParser(), [message]
+
 
+def _select_table_command(selected_tables):
     return Command(
         update={
             "selected_tables": selected_tables,
         },
-        goto=QUERY_GENERATION
+        # A speculative front end joins at front_end_gate instead
+        goto=() if use_speculative_front_end() else QUERY_GENERATION
     ) 
+
+
+def select_table_list(state: AgentState) -> AgentState:
+    print("--- SELECT TABLE LIST ---")
+    chain, messages = _select_table_list_chain(state)
+    return _select_table_command(chain.invoke(messages))
+
+
+async def aselect_table_list(state: AgentState) -> AgentState:
+    print("--- SELECT TABLE LIST ---")
+    chain, messages = _select_table_list_chain(state)
+    return _select_table_command(await chain.ainvoke(messages))
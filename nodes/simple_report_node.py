@@ -0,0 +1,101 @@
+import re
+import asyncio
+from decouple import config
+from langchain.prompts.chat import (
+    ChatPromptTemplate,
+    HumanMessagePromptTemplate,
+    SystemMessagePromptTemplate,
+)
+from langchain.schema import StrOutputParser
+from nodes.llm_clients import get_chat_model
+from nodes.agent_state import AgentState
+from nodes.dataset_schema import render_schema
+from nodes.dataset_settings import get_dataset_setting
+from nodes.chart_renderer import CHART_LAYOUTS, EMPTY, classify_result, render_chart, render_table
+
+
+# Visuals only a generated script can draw; queries asking for them take the full path
+COMPLEX_VISUALS = re.compile(r"\b(pie|scatter|heat ?map|histogram|box ?plot|bubble|map|dashboard|forecast|regression|correlation)\b", re.IGNORECASE)
+
+
+sys_msg = """
+You are a report generator expert. Write short, factual commentary on query results in markdown format only.
+"""
+
+user_msg = """
+    User asked a question: {query}
+    The answer is the following result, which is shown to the user below your text:
+    {result}
+    DO NOT USE ENUM OR NUMERIC REPRESENTATION OF A COLUMN IN REPORTS, ALWAYS USE COLUMN DESCRIPTION. Column Descriptions: {column_descriptions}
+    Start with a markdown heading, then answer the question in professional tone using plain and simple English, in at most one short paragraph.
+    Point out the notable values. Do not repeat the table, do not draw charts and do not include any other text or your assumptions.
+    DO NOT INCLUDE ```markdown TAGS IN YOUR RESPONSE.
+    """
+
+
+def simple_report_layout(state: AgentState):
+    """
+    Layout of the SQL result when it is small enough to be reported without a generated
+    Python script (see nodes.chart_renderer.classify_result), else None.
+    """
+    db_name = state["db_name"]
+    if not get_dataset_setting(db_name, "simple_report", config("SIMPLE_REPORT", default=True, cast=bool)):
+        return None
+    if state.get("data_truncated") or COMPLEX_VISUALS.search(state.get("rephrased_query") or state["query"]):
+        return None
+    return classify_result(
+        state.get("data_frame"),
+        max_rows=get_dataset_setting(db_name, "simple_report_max_rows", config("SIMPLE_REPORT_MAX_ROWS", default=25, cast=int)),
+        max_columns=get_dataset_setting(db_name, "simple_report_max_columns", config("SIMPLE_REPORT_MAX_COLUMNS", default=6, cast=int)),
+    )
+
+
+def _render_result(state: AgentState):
+    df = state["data_frame"]
+    layout = simple_report_layout(state)
+    result = render_table(df, layout)
+    images = []
+    if layout in CHART_LAYOUTS:
+        images.append(render_chart(df, layout, state["rephrased_query"]))
+    return layout, result, images
+
+
+def _simple_report_chain(state: AgentState, result):
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            SystemMessagePromptTemplate.from_template(sys_msg),
+            HumanMessagePromptTemplate.from_template(user_msg),
+        ]
+    )
+    llm = get_chat_model()
+    chain = prompt | llm | StrOutputParser()
+    return chain, {"query": state["rephrased_query"],
+                   "result": result,
+                   "column_descriptions": render_schema(state["db_info"], state["selected_tables"], include_samples=False)}
+
+
+def _simple_report_update(layout, result, images, narrative):
+    sections = [narrative.strip()]
+    if layout != EMPTY:
+        sections.append(result)
+    sections.extend(f"![Chart]({path})" for path in images)
+    return {
+        "execution_results": result,
+        "execution_images": images,
+        "reports": "\n\n".join(sections),
+    }
+
+
+def generate_simple_report(state: AgentState) -> AgentState:
+    print("--- SIMPLE REPORT ---")
+    layout, result, images = _render_result(state)
+    chain, inputs = _simple_report_chain(state, result)
+    return _simple_report_update(layout, result, images, chain.invoke(inputs))
+
+
+async def agenerate_simple_report(state: AgentState) -> AgentState:
+    print("--- SIMPLE REPORT ---")
+    # Drawing the chart is CPU bound, so it runs off the event loop
+    layout, result, images = await asyncio.to_thread(_render_result, state)
+    chain, inputs = _simple_report_chain(state, result)
+    return _simple_report_update(layout, result, images, await chain.ainvoke(inputs))
@@ -2,13 +2,19 @@ from langgraph.graph import END
 from typing_extensions import TypedDict, Literal
 from langgraph.types import Command, Interrupt, StreamProtocol
 from nodes.agent_state import AgentState
+from nodes.answer_cache import result_fingerprint, report_is_reusable
+from nodes.graph_options import report_stage_entry
+from nodes.simple_report_node import simple_report_layout
 from nodes.nodes_name import (
     RE_GENERATE_SQL_QUERY,
     REPORT_TYPE,
-    SQL_QUERY_EXECUTION_ERROR_REPORT
+    PYTHON_CODE_GENERATOR,
+    SIMPLE_REPORT,
+    SQL_QUERY_EXECUTION_ERROR_REPORT,
+    ANSWER_CACHE_STORE
 )
 
-def make_sql_decision(state:AgentState) ->  Command[Literal[ SQL_QUERY_EXECUTION_ERROR_REPORT, RE_GENERATE_SQL_QUERY, REPORT_TYPE ]]:
+def make_sql_decision(state:AgentState) ->  Command[Literal[ SQL_QUERY_EXECUTION_ERROR_REPORT, RE_GENERATE_SQL_QUERY, REPORT_TYPE, PYTHON_CODE_GENERATOR, SIMPLE_REPORT, ANSWER_CACHE_STORE, END ]]:
     print("--- MAKING DECISION AFTER SQL EXECUTION ---")
     sql_generation_try = state['sql_generation_try']
     max_sql_generation_try = state['max_sql_generation_try']
@@ -34,7 +40,26 @@ def make_sql_decision(state:AgentState) ->  Command[Literal[ SQL_QUERY_EXECUTION
                 goto=RE_GENERATE_SQL_QUERY
             )
     else:
-        print(f"Get Report Type: {REPORT_TYPE}")
+        cached_answer = state.get("cached_answer")
+        if cached_answer and cached_answer["result_fingerprint"] == result_fingerprint(state["data_frame"]) and report_is_reusable(cached_answer):
+            # The cached SQL returned the same rows as last time, so its report still holds
+            print("------ Result unchanged, reusing cached report ------")
+            return Command(
+                update={
+                    "reports": cached_answer["report"]
+                },
+                # The store step refreshes the entry, since its report was checked against current data
+                goto=ANSWER_CACHE_STORE
+            )
+        layout = simple_report_layout(state)
+        if layout:
+            # Small results are tabulated and charted directly, skipping the Python script loop
+            print(f"------ Simple {layout} result, go to {SIMPLE_REPORT} ------")
+            return Command(
+                goto=SIMPLE_REPORT
+            )
+        goto = report_stage_entry()
+        print(f"Report stage: {goto}")
         return Command(
-            goto = REPORT_TYPE
+            goto = goto
         )    
\ No newline at end of file
@@ -1,8 +1,7 @@
 from nodes.agent_state import AgentState
 from langchain.prompts import PromptTemplate
 from langchain.schema import StrOutputParser
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
 
 sys_msg = """
     The system encountered an error while executing the SQL query. The error message is as follows:
@@ -11,15 +10,10 @@ sys_msg = """
     Suggest possible solutions, such as checking the table name or verifying if the table exists in the database.
 """
 
-def sql_query_error_report(state: AgentState) -> AgentState:
-    print("--- SQL QUERY EXECUTION ERROR REPORT ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _error_report_chain(state: AgentState):
     SQL_error = state['SQL_error']
 
-    model = ChatOpenAI(openai_api_key=OPENAI_API_KEY, temperature=0, model=GPT_MODEL, streaming=False, cache=False)
+    model = get_chat_model()
 
     prompt = PromptTemplate(
         template=sys_msg,
@@ -27,8 +21,24 @@ def sql_query_error_report(state: AgentState) -> AgentState:
     )
 
     chain = prompt | model | StrOutputParser()
-    SQL_error_report = chain.invoke({"SQL_error": SQL_error})
+    return chain, {"SQL_error": SQL_error}
+
+
+def sql_query_error_report(state: AgentState) -> AgentState:
+    print("--- SQL QUERY EXECUTION ERROR REPORT ---")
+    chain, inputs = _error_report_chain(state)
+    SQL_error_report = chain.invoke(inputs)
     
     return {
         "reports": SQL_error_report
-    }
\ No newline at end of file
+    }
+
+
+async def asql_query_error_report(state: AgentState) -> AgentState:
+    print("--- SQL QUERY EXECUTION ERROR REPORT ---")
+    chain, inputs = _error_report_chain(state)
+    SQL_error_report = await chain.ainvoke(inputs)
+
+    return {
+        "reports": SQL_error_report
+    }
@@ -1,42 +1,147 @@
-from sqlalchemy import create_engine
+import asyncio
 import pandas as pd
+import sqlglot
+from sqlglot.errors import SqlglotError
 from langchain_core.messages import FunctionMessage
 from langgraph.types import Command
+from decouple import config
 from nodes.nodes_name import CHECK_SQL_DECISION
 from nodes.agent_state import AgentState
+from nodes.engine_manager import read_only_connection, async_read_only_connection, supports_async
+from nodes.dataset_settings import get_dataset_setting
+from nodes.result_summarizer import summarize_data_frame
+from nodes.sql_result_cache import SqlResultCache
+
+
+# sqlglot dialect names for the SQLAlchemy backends we connect to
+SQLGLOT_DIALECTS = {"postgresql": "postgres", "sqlite": "sqlite", "mysql": "mysql", "mssql": "tsql", "duckdb": "duckdb"}
+
+
+def cap_sql_query(sql_query, max_rows, dialect="postgres"):
+    # One extra row tells us whether the result was cut off. The query is re-rendered without
+    # comments, so a trailing `-- comment` or `;` cannot swallow the closing parenthesis.
+    try:
+        tree = sqlglot.parse_one(sql_query, read=dialect)
+        return sqlglot.select("*").from_(tree.subquery("capped_result")).limit(max_rows + 1).sql(dialect=dialect, comments=False)
+    except SqlglotError:
+        sql_query = sql_query.strip().rstrip(";").strip()
+        return f"SELECT * FROM (\n{sql_query}\n) AS capped_result LIMIT {max_rows + 1}"
+
+
+def fetch_capped_result(connection, sql_query, max_rows, max_bytes, chunk_size, dialect="postgres"):
+    """Stream a query result in chunks through a server-side cursor, stopping at the row or byte cap."""
+    connection.execution_options(stream_results=True, max_row_buffer=chunk_size)
+    chunks = pd.read_sql_query(cap_sql_query(sql_query, max_rows, dialect), connection, chunksize=chunk_size)
+
+    frames = []
+    total_rows = 0
+    total_bytes = 0
+    truncated = False
+    try:
+        for chunk in chunks:
+            frames.append(chunk)
+            total_rows += len(chunk)
+            total_bytes += int(chunk.memory_usage(deep=True).sum())
+            if total_rows > max_rows or total_bytes > max_bytes:
+                truncated = True
+                break
+    finally:
+        chunks.close()
+
+    if not frames:
+        return pd.DataFrame(), False
+
+    df = pd.concat(frames, ignore_index=True)
+    if len(df) > max_rows:
+        df = df.head(max_rows)
+    return df, truncated
+
+
+def _execution_limits(db_name):
+    return {
+        "max_rows": get_dataset_setting(db_name, "max_rows", config("SQL_MAX_ROWS", default=10000, cast=int)),
+        "max_bytes": get_dataset_setting(db_name, "max_result_bytes", config("SQL_MAX_RESULT_BYTES", default=256 * 1024 * 1024, cast=int)),
+        "statement_timeout_ms": get_dataset_setting(db_name, "statement_timeout_ms", config("SQL_STATEMENT_TIMEOUT_MS", default=60000, cast=int)),
+        "chunk_size": config("SQL_FETCH_CHUNK_ROWS", default=2000, cast=int),
+    }
+
+
+def _fetch_result(connection, connection_string, db_name, sql_query, limits):
+    dialect = SQLGLOT_DIALECTS.get(connection.dialect.name, "postgres")
+    cache = SqlResultCache(connection_string, db_name, sql_query, limits["max_rows"], limits["max_bytes"], dialect)
+    cached = cache.load(connection)
+    if cached is not None:
+        print("Using cached SQL result")
+        return cached
+
+    df, truncated = fetch_capped_result(connection, sql_query, limits["max_rows"], limits["max_bytes"], limits["chunk_size"], dialect)
+    cache.store(connection, df, truncated)
+    return df, truncated
+
+
+def _result_command(df, truncated):
+    if truncated:
+        print(f"SQL result truncated to {len(df)} rows")
+    return Command(
+        update = {
+            "data_frame": df,
+            "data_frame_summary": summarize_data_frame(df, truncated=truncated),
+            "data_truncated": truncated,
+            "SQL_error": None,
+        },
+        goto = CHECK_SQL_DECISION
+    )
+
+
+def _error_command(error):
+    print(f"SQL Execution Error: {error}")
+    return Command(
+        update = {
+            "data_frame": None,
+            "data_frame_summary": None,
+            "data_truncated": False,
+            "SQL_error": str(error),
+            # "sanitize_check": 0
+        },
+        goto = CHECK_SQL_DECISION
+    )
 
 
 def execute_sql_query(state: AgentState):
     print("--- EXECUTE SQL QUERY ---")
     
     sql_query = state["SQL_query"]
-        
-    engine = create_engine(state["db_info"]["connection_string"])
+    db_info = state["db_info"]
+    db_name = db_info["db_name"]
+    limits = _execution_limits(db_name)
         
     try:
-        df = pd.read_sql_query(sql_query, engine)
-        return Command(
-            update = {
-                "data_frame": df,
-                "SQL_error": None,
-            },
-            goto = CHECK_SQL_DECISION
-        )   
-    
+        with read_only_connection(db_info["connection_string"], db_name, limits["statement_timeout_ms"]) as connection:
+            df, truncated = _fetch_result(connection, db_info["connection_string"], db_name, sql_query, limits)
+        return _result_command(df, truncated)
     except Exception as e:
-        print(f"SQL Execution Error: {e}")
-        return Command(
-            update = {
-                "data_frame": None,
-                "SQL_error": str(e),
-                # "sanitize_check": 0
-            },
-            goto = CHECK_SQL_DECISION
-        )   
-    finally:
-        engine.dispose() 
-    
-    
+        return _error_command(e)
+
+
+async def aexecute_sql_query(state: AgentState):
+    db_info = state["db_info"]
+    if not supports_async(db_info["connection_string"]):
+        # No async driver for this backend; keep the event loop free with a worker thread
+        return await asyncio.to_thread(execute_sql_query, state)
+
+    print("--- EXECUTE SQL QUERY ---")
+
+    sql_query = state["SQL_query"]
+    db_name = db_info["db_name"]
+    limits = _execution_limits(db_name)
+
+    try:
+        async with async_read_only_connection(db_info["connection_string"], db_name, limits["statement_timeout_ms"]) as connection:
+            # The chunked fetch runs on the sync facade; every database round trip is still awaited
+            df, truncated = await connection.run_sync(_fetch_result, db_info["connection_string"], db_name, sql_query, limits)
+        return _result_command(df, truncated)
+    except Exception as e:
+        return _error_command(e)
 
 
 # results = execute_sql_query({"SQL_query": "SELECT * FROM public.actor LIMIT 10"})
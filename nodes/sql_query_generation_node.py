@@ -1,18 +1,12 @@
 from langchain.prompts.chat import ChatPromptTemplate
 from nodes.agent_state import AgentState
-from langchain_openai import ChatOpenAI
+from nodes.dataset_schema import render_schema
+from nodes.llm_clients import get_chat_model
 from langgraph.types import Command
 from langchain.schema import StrOutputParser
-from decouple import config
 from nodes.nodes_name import SANITIZE_SQL_QUERY, EXECUTE_SQL_QUERY
 
 
-def get_schema(db_info, selected_tables):
-    tables = db_info["details"]
-    selected_info = [table for table in tables if table["table_name"] in selected_tables]
-    return selected_info
-
-
 sys_msg = """
     You are an expert SQL query generator with deep knowledge of PostgreSQL syntax and best practices. 
     You are given a PostgreSQL database schema which contains relevant tables, columns, and sample data, referred to as `relevant_tables_columns_sample_data`. 
@@ -28,13 +22,8 @@ sys_msg = """
     Your response should consist solely of the generated SQL query in correct syntax, without any additional explanation.
 """
 
-def generate_sql_query(state:AgentState)->AgentState:
-    print("--- GENERATE SQL QUERY ---")
-    
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+def _sql_generation_chain(state: AgentState):
+    llm = get_chat_model()
 
     prompt = ChatPromptTemplate(
         [
@@ -46,17 +35,32 @@ def generate_sql_query(state:AgentState)->AgentState:
         ]
     )
 
-    relevant_tables_and_columns = get_schema(state["db_info"], state["selected_tables"])
+    relevant_tables_and_columns = render_schema(state["db_info"], state["selected_tables"])
 
     chain = prompt | llm | StrOutputParser()
-    response = chain.invoke({
+    return chain, {
         "relevant_tables_and_columns": relevant_tables_and_columns, 
         "query": state["rephrased_query"]
-    })
+    }
+
+
+def _sql_generation_command(response):
     print(f"Generated SQL query: {response}")
     return Command(
         update={
             "SQL_query": response
         },
         goto=SANITIZE_SQL_QUERY
-    ) 
\ No newline at end of file
+    ) 
+
+
+def generate_sql_query(state:AgentState)->AgentState:
+    print("--- GENERATE SQL QUERY ---")
+    chain, inputs = _sql_generation_chain(state)
+    return _sql_generation_command(chain.invoke(inputs))
+
+
+async def agenerate_sql_query(state:AgentState)->AgentState:
+    print("--- GENERATE SQL QUERY ---")
+    chain, inputs = _sql_generation_chain(state)
+    return _sql_generation_command(await chain.ainvoke(inputs))
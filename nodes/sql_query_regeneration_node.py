@@ -1,16 +1,10 @@
 from langchain_core.output_parsers import StrOutputParser
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
+from nodes.llm_clients import get_chat_model
 from langgraph.types import Command
-from decouple import config
 from nodes.nodes_name import SANITIZE_SQL_QUERY
 from .agent_state import AgentState
-
-
-def get_schema(db_info, selected_tables):
-    tables = db_info["details"]
-    selected_info = [table for table in tables if table["table_name"] in selected_tables]
-    return selected_info
+from nodes.dataset_schema import render_schema
 
 
 SQL_QUERY_CHECKER = """
@@ -35,17 +29,12 @@ SQL_QUERY_CHECKER = """
     Your response should consist solely of the generated SQL query in correct syntax, without any additional explanation.
     """
 
-def regenerate_sql_query(state: AgentState) -> AgentState:
-    print("--- RE-GENERATE SQL QUERY ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+def _sql_regeneration_chain(state: AgentState):
+    llm = get_chat_model()
 
     sql_query = state['SQL_query']
     sql_error = state['SQL_error']
-    relevant_tables_and_columns = get_schema(state["db_info"], state["selected_tables"])
+    relevant_tables_and_columns = render_schema(state["db_info"], state["selected_tables"])
 
     sql_generation_prompt = PromptTemplate(
         template=SQL_QUERY_CHECKER,
@@ -58,15 +47,15 @@ def regenerate_sql_query(state: AgentState) -> AgentState:
     )
 
     chain = sql_generation_prompt | llm | StrOutputParser()
-    sql_query = chain.invoke(
-        {
-            "sql_query": sql_query,
-            "sql_error": sql_error,
-            "db_schema": relevant_tables_and_columns,
-            "domain_specific_terms": ""
-        }
-    )
-   
+    return chain, {
+        "sql_query": sql_query,
+        "sql_error": sql_error,
+        "db_schema": relevant_tables_and_columns,
+        "domain_specific_terms": ""
+    }
+
+
+def _sql_regeneration_command(state: AgentState, sql_query):
     return Command(
         update={
             "SQL_query": sql_query,
@@ -74,4 +63,16 @@ def regenerate_sql_query(state: AgentState) -> AgentState:
             "sql_generation_try": state['sql_generation_try'] + 1
         },
         goto=SANITIZE_SQL_QUERY
-    ) 
\ No newline at end of file
+    )
+
+
+def regenerate_sql_query(state: AgentState) -> AgentState:
+    print("--- RE-GENERATE SQL QUERY ---")
+    chain, inputs = _sql_regeneration_chain(state)
+    return _sql_regeneration_command(state, chain.invoke(inputs))
+
+
+async def aregenerate_sql_query(state: AgentState) -> AgentState:
+    print("--- RE-GENERATE SQL QUERY ---")
+    chain, inputs = _sql_regeneration_chain(state)
+    return _sql_regeneration_command(state, await chain.ainvoke(inputs))
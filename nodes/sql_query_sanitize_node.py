@@ -10,8 +10,10 @@ from langchain.prompts.chat import (
 from langgraph.types import Command
 from nodes.agent_state import AgentState
 from nodes.nodes_name import EXECUTE_SQL_QUERY, QUERY_GENERATION, RE_GENERATE_SQL_QUERY, SQL_QUERY_SANITIZE_REPORT
-from langchain_openai import ChatOpenAI
+from nodes.llm_clients import get_chat_model
 from decouple import config
+from sqlglot.errors import SqlglotError
+from nodes.sql_safety import validate_sql_query
 
 sys_msg = """
     You are an expert in SQL security. Your task is to analyze a given SQL query and determine whether it is a safe read-only query. 
@@ -29,27 +31,9 @@ class sanitizing_queries(BaseModel):
     is_safe: bool
     reason: str = Field(description="Reason for the safety status of the query")
 
-def sanitize_sql_query(state:AgentState) -> Command[Literal[ EXECUTE_SQL_QUERY]]:
-    """
-    This function uses OpenAI's LLM to sanitize a given SQL query, allowing only 'SELECT' operations.
-    Any query that contains 'UPDATE', 'INSERT', 'DELETE', or other modifying operations will be flagged as unsafe.
 
-    Parameters:
-    query (str): The SQL query to be sanitized.
-
-    Returns:
-    bool: True if the query is valid (SELECT-only), False otherwise.
-    """
-    print("--- SANITIZE SQL QUERY ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
-    
-    sql_query = state["SQL_query"]
-    # sanitize_check = state["sanitize_check"]
-    # max_sanitize_check = state["max_sanitize_check"]
+def _llm_sanitize_chain(sql_query):
+    llm = get_chat_model()
     
     # Define the system prompt to instruct the model to analyze the SQL query for safety
     prompt = ChatPromptTemplate.from_messages(
@@ -59,17 +43,75 @@ def sanitize_sql_query(state:AgentState) -> Command[Literal[ EXECUTE_SQL_QUERY]]
         ]
     )
     
-    sanitize_chain = prompt | llm.with_structured_output(sanitizing_queries)
-    
-    response = sanitize_chain.invoke({"input":""})
-    
-    if response.is_safe == True:
+    return prompt | llm.with_structured_output(sanitizing_queries)
+
+
+def llm_sanitize_sql_query(sql_query) -> sanitizing_queries:
+    return _llm_sanitize_chain(sql_query).invoke({"input":""})
+
+
+async def allm_sanitize_sql_query(sql_query) -> sanitizing_queries:
+    return await _llm_sanitize_chain(sql_query).ainvoke({"input":""})
+
+
+def _static_sql_check(sql_query):
+    """Return (is_safe, reason, use_llm_check) from the static validator."""
+    try:
+        is_safe, reason = validate_sql_query(sql_query)
+        return is_safe, reason, is_safe and config("SQL_LLM_SAFETY_CHECK", default=False, cast=bool)
+    except SqlglotError as e:
+        # No static verdict; the model decides and execution still runs in a read-only transaction
+        print(f"SQL query could not be parsed statically: {e}")
+        return False, None, True
+
+
+def _sanitize_command(is_safe, reason):
+    if is_safe == True:
         return Command(
             goto = EXECUTE_SQL_QUERY
         ) 
     else:
         return Command(
             update={
-                "reports": response.reason
+                "reports": reason
             },
-        ) 
\ No newline at end of file
+        ) 
+
+
+def sanitize_sql_query(state:AgentState) -> Command[Literal[ EXECUTE_SQL_QUERY]]:
+    """
+    This function statically validates a given SQL query, allowing only single read-only 'SELECT' statements.
+    Any query that contains 'UPDATE', 'INSERT', 'DELETE', or other modifying operations will be flagged as unsafe.
+    OpenAI's LLM is only consulted when the query cannot be parsed, or as a secondary check when
+    SQL_LLM_SAFETY_CHECK is enabled.
+
+    Parameters:
+    query (str): The SQL query to be sanitized.
+
+    Returns:
+    bool: True if the query is valid (SELECT-only), False otherwise.
+    """
+    print("--- SANITIZE SQL QUERY ---")
+
+    sql_query = state["SQL_query"]
+    # sanitize_check = state["sanitize_check"]
+    # max_sanitize_check = state["max_sanitize_check"]
+
+    is_safe, reason, use_llm_check = _static_sql_check(sql_query)
+    if use_llm_check:
+        response = llm_sanitize_sql_query(sql_query)
+        is_safe, reason = response.is_safe, response.reason
+    
+    return _sanitize_command(is_safe, reason)
+
+
+async def asanitize_sql_query(state:AgentState) -> Command[Literal[ EXECUTE_SQL_QUERY]]:
+    print("--- SANITIZE SQL QUERY ---")
+
+    sql_query = state["SQL_query"]
+    is_safe, reason, use_llm_check = _static_sql_check(sql_query)
+    if use_llm_check:
+        response = await allm_sanitize_sql_query(sql_query)
+        is_safe, reason = response.is_safe, response.reason
+
+    return _sanitize_command(is_safe, reason)
@@ -6,8 +6,7 @@ from langchain.prompts.chat import (
     SystemMessagePromptTemplate,
 )
 from langchain.schema import StrOutputParser
-from langchain_openai import ChatOpenAI
-from decouple import config
+from nodes.llm_clients import get_chat_model
 
 
 sys_msg = """
@@ -19,15 +18,10 @@ sys_msg = """
 """
 
 
-def sql_query_sanitize_report(state: AgentState) -> AgentState:
-    print("--- SQL QUERY SANITIZE REPORT ---")
-
-    OPENAI_API_KEY = config("OPENAI_API_KEY")
-    GPT_MODEL = config("GPT_MODEL")
-
+def _sanitize_report_chain(state: AgentState):
     sql_query = state["SQL_query"]
 
-    llm = ChatOpenAI(model_name=GPT_MODEL, temperature=0, openai_api_key=OPENAI_API_KEY)
+    llm = get_chat_model()
     
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -37,6 +31,20 @@ def sql_query_sanitize_report(state: AgentState) -> AgentState:
     )
 
     chain = prompt | llm | StrOutputParser()
-    SQL_sanitizer_report = chain.invoke({"sql_query": sql_query})
+    return chain, {"sql_query": sql_query}
+
+
+def sql_query_sanitize_report(state: AgentState) -> AgentState:
+    print("--- SQL QUERY SANITIZE REPORT ---")
+    chain, inputs = _sanitize_report_chain(state)
+    SQL_sanitizer_report = chain.invoke(inputs)
+
+    return {"reports": SQL_sanitizer_report}
+
+
+async def asql_query_sanitize_report(state: AgentState) -> AgentState:
+    print("--- SQL QUERY SANITIZE REPORT ---")
+    chain, inputs = _sanitize_report_chain(state)
+    SQL_sanitizer_report = await chain.ainvoke(inputs)
 
-    return {"reports": SQL_sanitizer_report}
\ No newline at end of file
+    return {"reports": SQL_sanitizer_report}
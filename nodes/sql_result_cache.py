@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from decouple import config
+from nodes.dataset_settings import get_dataset_setting
+
+# pandas uses pyarrow for Parquet; it is pinned in requirements.txt
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+project_root = os.path.abspath(os.path.dirname(__file__) + "/..")
+
+_cache_lock = threading.Lock()
+
+
+def _cache_directory():
+    directory = config("SQL_RESULT_CACHE_DIR", default=os.path.join(project_root, "data", "sql_result_cache"))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def canonicalize_sql(sql_query, dialect="postgres"):
+    """Render a query in one canonical form so formatting and keyword case do not matter."""
+    sql_query = sql_query.strip().rstrip(";").strip()
+    try:
+        return sqlglot.transpile(sql_query, read=dialect, write=dialect, normalize=True, pretty=False)[0]
+    except SqlglotError:
+        return " ".join(sql_query.split())
+
+
+def referenced_tables(sql_query, dialect="postgres"):
+    try:
+        tree = sqlglot.parse_one(sql_query, read=dialect)
+    except SqlglotError:
+        return set()
+    return {table.name.lower() for table in tree.find_all(exp.Table) if table.name}
+
+
+def _cache_key(connection_string, canonical_sql, max_rows, max_bytes):
+    connection_hash = hashlib.sha256(connection_string.encode("utf-8")).hexdigest()[:16]
+    # The row and byte caps change the result, so they are part of the key
+    query_hash = hashlib.sha256(f"{max_rows}:{max_bytes}:{canonical_sql}".encode("utf-8")).hexdigest()
+    return f"{connection_hash}_{query_hash}"
+
+
+def _paths(key):
+    directory = _cache_directory()
+    return os.path.join(directory, f"{key}.parquet"), os.path.join(directory, f"{key}.json")
+
+
+def _remove(key):
+    for path in _paths(key):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _freshness_token(connection, db_name, sql_query, dialect):
+    """
+    Run the dataset's freshness probes for the tables a query reads.
+
+    `freshness_probes` in DATASET_SETTINGS maps table names (or "*" for every query) to a
+    query returning a single value, such as the table's last modification time.
+    """
+    probes = {str(table).lower(): probe for table, probe in (get_dataset_setting(db_name, "freshness_probes", {}) or {}).items()}
+    if not probes:
+        return None
+
+    tables = sorted(({"*"} | referenced_tables(sql_query, dialect)) & probes.keys())
+    token = {}
+    for table in tables:
+        value = connection.exec_driver_sql(probes[table]).scalar()
+        token[table] = str(value)
+    return json.dumps(token, sort_keys=True) if token else None
+
+
+class SqlResultCache:
+    """
+    Parquet files of recent query results on local disk, keyed by the target database and
+    the canonical SQL text.
+
+    Entries expire after a per-dataset TTL, are dropped when a freshness probe reports a
+    change, and are evicted least recently used once the cache exceeds its byte budget.
+    """
+
+    def __init__(self, connection_string, db_name, sql_query, max_rows, max_bytes, dialect="postgres"):
+        self.db_name = db_name
+        self.sql_query = sql_query
+        self.dialect = dialect
+        self.key = _cache_key(connection_string, canonicalize_sql(sql_query, dialect), max_rows, max_bytes)
+        self.ttl_seconds = get_dataset_setting(db_name, "sql_result_cache_ttl_seconds", config("SQL_RESULT_CACHE_TTL_SECONDS", default=300, cast=int))
+        self.freshness = None
+
+    @property
+    def enabled(self):
+        return bool(self.ttl_seconds) and config("SQL_RESULT_CACHE", default=True, cast=bool)
+
+    def load(self, connection):
+        """Return (df, truncated) for a fresh cached result, or None."""
+        if not self.enabled:
+            return None
+
+        data_path, meta_path = _paths(self.key)
+        try:
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+        self.freshness = _freshness_token(connection, self.db_name, self.sql_query, self.dialect)
+        if time.time() - meta["created_at"] > self.ttl_seconds or meta.get("freshness") != self.freshness:
+            _remove(self.key)
+            return None
+
+        try:
+            df = pq.read_table(data_path).to_pandas()
+        except (OSError, pa.ArrowException):
+            _remove(self.key)
+            return None
+
+        # The file's mtime is its LRU position
+        os.utime(data_path)
+        return df, meta["truncated"]
+
+    def store(self, connection, df, truncated):
+        if not self.enabled:
+            return
+        if self.freshness is None:
+            self.freshness = _freshness_token(connection, self.db_name, self.sql_query, self.dialect)
+
+        data_path, meta_path = _paths(self.key)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, ValueError, TypeError) as e:
+            # e.g. columns of mixed Python objects that Arrow cannot type
+            print(f"SQL result not cached: {e}")
+            return
+
+        with _cache_lock:
+            # Both files are written under temporary names and renamed, so another process
+            # never reads a partial file
+            suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+            pq.write_table(table, data_path + suffix)
+            os.replace(data_path + suffix, data_path)
+            with open(meta_path + suffix, "w") as meta_file:
+                json.dump({
+                    "db_name": self.db_name,
+                    "sql_query": self.sql_query,
+                    "created_at": time.time(),
+                    "truncated": truncated,
+                    "freshness": self.freshness,
+                }, meta_file)
+            os.replace(meta_path + suffix, meta_path)
+            _evict(config("SQL_RESULT_CACHE_MAX_BYTES", default=512 * 1024 * 1024, cast=int))
+
+
+def _evict(max_bytes):
+    directory = _cache_directory()
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(".parquet"):
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name[:-len(".parquet")]))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, key in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        _remove(key)
+        total_bytes -= size
+
+
+def invalidate_sql_results(connection_string=None):
+    """Drop cached results for one target database, or for every database."""
+    directory = _cache_directory()
+    prefix = hashlib.sha256(connection_string.encode("utf-8")).hexdigest()[:16] + "_" if connection_string else ""
+    with _cache_lock:
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith((".parquet", ".json")):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
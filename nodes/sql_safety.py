@@ -0,0 +1,72 @@
+import sqlglot
+from sqlglot import exp
+
+
+# Statements allowed at the root of a generated query
+READ_ONLY_ROOTS = (exp.Select, exp.Union, exp.Intersect, exp.Except, exp.Subquery)
+
+# Expression types that write data, change the session or lock rows, wherever they appear
+# (including data-modifying CTEs and SELECT ... INTO). Looked up by name so the list
+# works across sqlglot versions.
+DENIED_EXPRESSIONS = tuple(
+    expression_type
+    for expression_type in (
+        getattr(exp, name, None)
+        for name in (
+            "Insert", "Update", "Delete", "Merge", "Create", "Drop", "Alter", "AlterTable",
+            "TruncateTable", "Copy", "Command", "Set", "Grant", "Into", "Lock", "Transaction",
+            "Commit", "Rollback", "Use", "Pragma", "LoadData", "Cache", "Uncache", "Refresh",
+        )
+    )
+    if expression_type is not None
+)
+
+# Functions that sleep, reach outside the database, touch files or change server state
+DENIED_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until",
+    "dblink", "dblink_exec", "dblink_connect", "dblink_send_query",
+    "pg_read_file", "pg_read_binary_file", "pg_ls_dir", "pg_stat_file",
+    "lo_import", "lo_export", "lo_get", "lo_put", "lo_unlink",
+    "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf", "pg_rotate_logfile",
+    "pg_advisory_lock", "pg_advisory_xact_lock", "pg_try_advisory_lock",
+    "set_config", "nextval", "setval",
+    "query_to_xml", "query_to_xml_and_xmlschema", "cursor_to_xml",
+}
+
+
+def _function_name(function):
+    if isinstance(function, exp.Anonymous):
+        return str(function.name).lower()
+    return function.key.lower()
+
+
+def validate_sql_query(sql_query, dialect="postgres"):
+    """
+    Statically check that a SQL query is a single read-only statement.
+
+    Parameters:
+    sql_query (str): The SQL query to validate.
+    dialect (str): The sqlglot dialect used to parse the query.
+
+    Returns:
+    tuple: (is_safe, reason)
+
+    Raises:
+    SqlglotError: If the query cannot be parsed, so no static verdict is possible.
+    """
+    statements = [statement for statement in sqlglot.parse(sql_query, read=dialect) if statement is not None]
+
+    if len(statements) != 1:
+        return False, f"Only a single SQL statement is allowed, but the query contains {len(statements)}."
+
+    statement = statements[0]
+    if not isinstance(statement, READ_ONLY_ROOTS):
+        return False, f"Only SELECT queries are allowed, but this query is a {statement.key.upper()} statement."
+
+    for node in statement.walk():
+        if isinstance(node, DENIED_EXPRESSIONS):
+            return False, f"The query uses {node.key.upper()}, which can modify the database or its session. Only data retrieval is allowed."
+        if isinstance(node, exp.Func) and _function_name(node) in DENIED_FUNCTIONS:
+            return False, f"The query calls {_function_name(node)}(), which is not allowed in reporting queries."
+
+    return True, "The query is a single read-only SELECT statement."
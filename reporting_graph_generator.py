@@ -1,26 +1,34 @@
-
+import sys
+import threading
 from langgraph.graph import START, StateGraph, END
 from langgraph.graph.graph import CompiledGraph
-from nodes.query_relevancy_check_node import check_query_relevancy
+from nodes.query_relevancy_check_node import check_query_relevancy, acheck_query_relevancy
 from nodes.query_relevancy_report_node import query_relevancy_report
-from nodes.query_re_write_node import re_write_query
-from nodes.get_dataset_detail_node import get_dataset_detail
-from nodes.select_table_list_selection_node import select_table_list
-from nodes.sql_query_generation_node import generate_sql_query
-from nodes.sql_query_sanitize_node import sanitize_sql_query
+from nodes.query_re_write_node import re_write_query, are_write_query
+from nodes.query_front_end_node import query_front_end, aquery_front_end
+from nodes.get_dataset_detail_node import get_dataset_detail, aget_dataset_detail
+from nodes.select_table_list_selection_node import select_table_list, aselect_table_list
+from nodes.sql_query_generation_node import generate_sql_query, agenerate_sql_query
+from nodes.sql_query_sanitize_node import sanitize_sql_query, asanitize_sql_query
 from nodes.sql_query_sanitize_report_node import sql_query_sanitize_report
-from nodes.sql_query_executer_node import execute_sql_query
-from nodes.sql_query_error_report_node import sql_query_error_report
-from nodes.sql_query_regeneration_node import regenerate_sql_query
+from nodes.sql_query_executer_node import execute_sql_query, aexecute_sql_query
+from nodes.sql_query_error_report_node import sql_query_error_report, asql_query_error_report
+from nodes.sql_query_regeneration_node import regenerate_sql_query, aregenerate_sql_query
 from nodes.sql_make_decision_node import make_sql_decision
-from nodes.Python_code_generator_node import generate_Python_code
-from nodes.Python_code_sanitize_node import sanitize_python_script
-from nodes.Python_code_executer_node import run_python_code
-from nodes.re_generate_Python_script import re_generate_Python_code
-from nodes.report_generator_node import generate_report
+from nodes.Python_code_generator_node import generate_Python_code, agenerate_Python_code
+from nodes.Python_code_sanitize_node import sanitize_python_script, asanitize_python_script
+from nodes.Python_code_executer_node import run_python_code, arun_python_code
+from nodes.re_generate_Python_script import re_generate_Python_code, are_generate_Python_code
+from nodes.report_generator_node import generate_report, agenerate_report
+from nodes.simple_report_node import generate_simple_report, agenerate_simple_report
+from nodes.render_report_node import render_report, arender_report
 from nodes.make_decision_node import make_decision
-from nodes.generate_report_type_node import get_report_type
+from nodes.generate_report_type_node import get_report_type, aget_report_type
+from nodes.answer_cache_node import lookup_cached_answer, store_cached_answer, alookup_cached_answer, astore_cached_answer
 from nodes.agent_state import AgentState 
+from nodes.run_tracer import run_config
+from nodes.front_end_gate_node import front_end_gate
+from nodes.graph_options import use_fused_front_end, use_speculative_front_end
 from nodes.nodes_name import (
     RE_WRITE_QUERY,
     DATASET_DETAILS,
@@ -38,64 +46,215 @@ from nodes.nodes_name import (
     SANITIZE_PYTHON_SCRIPT,
     REPORT_GENERATION_DECISION,
     CHECK_QUERY_RELEVANCY,
-    SANITIZE_SQL_QUERY
+    SANITIZE_SQL_QUERY,
+    QUERY_FRONT_END,
+    FRONT_END_GATE,
+    SIMPLE_REPORT,
+    RENDER_REPORT,
+    ANSWER_CACHE_LOOKUP,
+    ANSWER_CACHE_STORE
 )
 
-def generate_graph()-> CompiledGraph:
+def generate_graph(use_async=False)-> CompiledGraph:
     workflow = StateGraph(AgentState)
 
-    workflow.add_node(DATASET_DETAILS, get_dataset_detail)
-    workflow.add_node(CHECK_QUERY_RELEVANCY, check_query_relevancy)
-    workflow.add_node(RE_WRITE_QUERY, re_write_query)
+    def node(sync_node, async_node):
+        # Decision nodes do no I/O and are shared by both graphs
+        return async_node if use_async else sync_node
+
+    workflow.add_node(DATASET_DETAILS, node(get_dataset_detail, aget_dataset_detail))
+    workflow.add_node(ANSWER_CACHE_LOOKUP, node(lookup_cached_answer, alookup_cached_answer))
+
+    if use_fused_front_end():
+        # Relevancy check, query rewrite and table selection in one model call
+        workflow.add_node(QUERY_FRONT_END, node(query_front_end, aquery_front_end))
+    else:
+        workflow.add_node(CHECK_QUERY_RELEVANCY, node(check_query_relevancy, acheck_query_relevancy))
+        workflow.add_node(RE_WRITE_QUERY, node(re_write_query, are_write_query))
 
-    workflow.add_node(TABLE_SELECTION, select_table_list)
+        workflow.add_node(TABLE_SELECTION, node(select_table_list, aselect_table_list))
 
-    workflow.add_node(QUERY_GENERATION, generate_sql_query)
-    workflow.add_node(SANITIZE_SQL_QUERY, sanitize_sql_query)
-    workflow.add_node(EXECUTE_SQL_QUERY, execute_sql_query)
+        if use_speculative_front_end():
+            # All three run in the same step; the gate waits for them and drops the
+            # rewrite and table selection if the query is rejected
+            workflow.add_node(FRONT_END_GATE, front_end_gate)
+            workflow.add_edge([CHECK_QUERY_RELEVANCY, RE_WRITE_QUERY, TABLE_SELECTION], FRONT_END_GATE)
+
+    workflow.add_node(QUERY_GENERATION, node(generate_sql_query, agenerate_sql_query))
+    workflow.add_node(SANITIZE_SQL_QUERY, node(sanitize_sql_query, asanitize_sql_query))
+    workflow.add_node(EXECUTE_SQL_QUERY, node(execute_sql_query, aexecute_sql_query))
     workflow.add_node(CHECK_SQL_DECISION, make_sql_decision)
-    workflow.add_node(SQL_QUERY_EXECUTION_ERROR_REPORT, sql_query_error_report)
-    workflow.add_node(RE_GENERATE_SQL_QUERY, regenerate_sql_query)
+    workflow.add_node(SQL_QUERY_EXECUTION_ERROR_REPORT, node(sql_query_error_report, asql_query_error_report))
+    workflow.add_node(RE_GENERATE_SQL_QUERY, node(regenerate_sql_query, aregenerate_sql_query))
 
-    workflow.add_node(REPORT_TYPE, get_report_type)
+    workflow.add_node(REPORT_TYPE, node(get_report_type, aget_report_type))
+    workflow.add_node(RENDER_REPORT, node(render_report, arender_report))
 
-    workflow.add_node(PYTHON_CODE_GENERATOR, generate_Python_code)
-    workflow.add_node(SANITIZE_PYTHON_SCRIPT, sanitize_python_script)
-    workflow.add_node(PYTHON_CODE_EXECUTER, run_python_code)
-    workflow.add_node(PYTHON_CODE_RE_GENERATION, re_generate_Python_code)
+    workflow.add_node(PYTHON_CODE_GENERATOR, node(generate_Python_code, agenerate_Python_code))
+    workflow.add_node(SANITIZE_PYTHON_SCRIPT, node(sanitize_python_script, asanitize_python_script))
+    workflow.add_node(PYTHON_CODE_EXECUTER, node(run_python_code, arun_python_code))
+    workflow.add_node(PYTHON_CODE_RE_GENERATION, node(re_generate_Python_code, are_generate_Python_code))
 
     workflow.add_node(REPORT_GENERATION_DECISION, make_decision)
-    workflow.add_node(REPORT_GENERATOR, generate_report)
+    workflow.add_node(REPORT_GENERATOR, node(generate_report, agenerate_report))
+    workflow.add_node(SIMPLE_REPORT, node(generate_simple_report, agenerate_simple_report))
+    workflow.add_node(ANSWER_CACHE_STORE, node(store_cached_answer, astore_cached_answer))
 
 
     workflow.add_edge(START, DATASET_DETAILS)
     workflow.add_edge(SQL_QUERY_EXECUTION_ERROR_REPORT, END)
-    workflow.add_edge(REPORT_GENERATOR, END)
+    workflow.add_edge(REPORT_GENERATOR, ANSWER_CACHE_STORE)
+    workflow.add_edge(SIMPLE_REPORT, ANSWER_CACHE_STORE)
+    workflow.add_edge(ANSWER_CACHE_STORE, END)
 
     graph = workflow.compile()
-    
-    graph.get_graph(xray=1).draw_mermaid_png(output_file_path="AI_Reporting_graph.png")
 
     return graph
 
 
-def get_reports(dataset_name, query):
-    app = generate_graph()
+# Process-wide registry of compiled graphs, built lazily on first use
+_compiled_graphs = {}
+_compiled_graphs_lock = threading.Lock()
+
+
+def get_compiled_graph(name="reporting", use_async=False) -> CompiledGraph:
+    key = (name, use_async)
+    graph = _compiled_graphs.get(key)
+    if graph is None:
+        with _compiled_graphs_lock:
+            graph = _compiled_graphs.get(key)
+            if graph is None:
+                graph = generate_graph(use_async=use_async)
+                _compiled_graphs[key] = graph
+    return graph
+
+
+def export_graph_diagram(output_file_path="AI_Reporting_graph.png"):
+    # Rendering goes through mermaid.ink, so it is only done on request
+    graph = get_compiled_graph()
+    graph.get_graph(xray=1).draw_mermaid_png(output_file_path=output_file_path)
+    return output_file_path
+
+
+def _initial_state(dataset_name, query):
+    return {
+        "db_name": dataset_name, 
+        "query": query, 
+        "sql_generation_try": 0,
+        "max_sql_generation_try": 5,
+        'Python_script_check': 0,
+        'max_Python_script_check': 5,
+    }
+
+
+def get_reports(dataset_name, query, trace_id=None):
+    app = get_compiled_graph()
+
+    results = app.invoke(_initial_state(dataset_name, query), run_config(trace_id, dataset=dataset_name, query=query))
+
+    return results.get("reports", "No reports found")
+
+
+async def aget_reports(dataset_name, query, trace_id=None):
+    """Async counterpart of get_reports; model and PostgreSQL calls are awaited on the running event loop."""
+    app = get_compiled_graph(use_async=True)
 
-    results = app.invoke(
-        {
-            "db_name": dataset_name, 
-            "query": query, 
-            "sql_generation_try": 0,
-            "max_sql_generation_try": 5,
-            'Python_script_check': 0,
-            'max_Python_script_check': 5,
-        }
-    )
+    results = await app.ainvoke(_initial_state(dataset_name, query), run_config(trace_id, dataset=dataset_name, query=query))
 
     return results.get("reports", "No reports found")
 
+# Nodes whose model output is the report text shown to the user, streamed token by token
+STREAMED_REPORT_NODES = {REPORT_GENERATOR, SIMPLE_REPORT, SQL_QUERY_EXECUTION_ERROR_REPORT}
+STREAM_MODES = ["debug", "updates", "messages"]
+PREVIEW_ROWS = 20
+
+
+def _stream_events(mode, chunk):
+    if mode == "debug":
+        payload = chunk["payload"]
+        if chunk["type"] == "task":
+            yield {"type": "node_start", "node": payload["name"]}
+        elif chunk["type"] == "task_result":
+            yield {"type": "node_end", "node": payload["name"], "error": payload.get("error")}
+
+    elif mode == "updates":
+        for node, update in chunk.items():
+            if not isinstance(update, dict):
+                continue
+            if update.get("SQL_query"):
+                yield {"type": "sql", "node": node, "sql": update["SQL_query"]}
+            if update.get("data_frame") is not None:
+                df = update["data_frame"]
+                yield {
+                    "type": "result_preview",
+                    "node": node,
+                    "data_frame": df.head(PREVIEW_ROWS),
+                    "rows": len(df),
+                    "truncated": update.get("data_truncated", False),
+                }
+            if update.get("reports"):
+                yield {"type": "report", "node": node, "report": update["reports"]}
+
+    elif mode == "messages":
+        message, metadata = chunk
+        node = metadata.get("langgraph_node")
+        if node in STREAMED_REPORT_NODES and isinstance(message.content, str) and message.content:
+            yield {"type": "report_token", "node": node, "text": message.content}
+
+
+def stream_reports(dataset_name, query, trace_id=None):
+    """
+    Generate a report like get_reports, yielding progress events as the graph runs.
+    With tracing on, the run's spans are stored under `trace_id` (see nodes.run_tracer).
+
+    Events are dicts with a "type" of:
+    node_start / node_end: a graph node started or finished ("node", and "error" on node_end).
+    sql: a generated or cached SQL query ("sql").
+    result_preview: the first rows of the SQL result ("data_frame", "rows", "truncated").
+    report_token: a piece of the report text as the model writes it ("text").
+    report: the final report ("report"); always the last event.
+    """
+    app = get_compiled_graph()
+    reports = None
+
+    config = run_config(trace_id, dataset=dataset_name, query=query)
+    for mode, chunk in app.stream(_initial_state(dataset_name, query), config, stream_mode=STREAM_MODES):
+        for event in _stream_events(mode, chunk):
+            if event["type"] == "report":
+                # Held back until the run ends; the last node to write a report wins
+                reports = event["report"]
+                continue
+            yield event
+
+    yield {"type": "report", "report": reports or "No reports found"}
+
+
+async def astream_reports(dataset_name, query, trace_id=None):
+    """Async counterpart of stream_reports, running the async graph."""
+    app = get_compiled_graph(use_async=True)
+    reports = None
+
+    config = run_config(trace_id, dataset=dataset_name, query=query)
+    async for mode, chunk in app.astream(_initial_state(dataset_name, query), config, stream_mode=STREAM_MODES):
+        for event in _stream_events(mode, chunk):
+            if event["type"] == "report":
+                reports = event["report"]
+                continue
+            yield event
+
+    yield {"type": "report", "report": reports or "No reports found"}
+
+
 # reports = get_reports("Chinook","Top 3 Music Genres by Total Tracks Sold")
 # reports = get_reports("Chinook","Insert three new records into the Artist table")
 # reports = get_reports("Chinook","What is black hole")
-# print(f"Final Reports: {reports}")
\ No newline at end of file
+# print(f"Final Reports: {reports}")
+
+
+if __name__ == "__main__":
+    # python reporting_graph_generator.py export-diagram [output_file_path]
+    if len(sys.argv) >= 2 and sys.argv[1] == "export-diagram":
+        output_file = export_graph_diagram(*sys.argv[2:3])
+        print(f"Graph diagram written to {output_file}")
+    else:
+        print("Usage: python reporting_graph_generator.py export-diagram [output_file_path]")
\ No newline at end of file
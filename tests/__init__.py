@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Tests keep their metadata database, job queue and caches out of the project's data/ folder
+_test_data_directory = tempfile.mkdtemp(prefix="ai_reporting_tests_")
+os.environ.setdefault("METADATA_DB_PATH", os.path.join(_test_data_directory, "db_info.db"))
+os.environ.setdefault("SQL_RESULT_CACHE_DIR", os.path.join(_test_data_directory, "sql_result_cache"))
+os.environ.setdefault("REPORT_JOBS_DB_PATH", os.path.join(_test_data_directory, "report_jobs.db"))
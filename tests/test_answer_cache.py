@@ -0,0 +1,62 @@
+import time
+import unittest
+from nodes.file_manager_db import Session
+from nodes.answer_cache import AnswerCacheEntry, clear_answer_cache, lookup_answer, normalize_query, store_answer
+
+
+DB_INFO = {"db_name": "Chinook", "db_description": "Music store", "tables": ["genre", "track"]}
+
+
+class NormalizeQueryTest(unittest.TestCase):
+    def test_case_punctuation_and_spacing_do_not_matter(self):
+        expected = normalize_query("How many tracks per genre")
+        for query in (
+            "how many tracks per genre?",
+            "  HOW many   tracks per genre!! ",
+            "How many tracks, per genre",
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(expected, normalize_query(query))
+
+    def test_different_questions_differ(self):
+        self.assertNotEqual(normalize_query("How many tracks per genre"), normalize_query("How many albums per genre"))
+
+
+class AnswerCacheTest(unittest.TestCase):
+    def setUp(self):
+        clear_answer_cache()
+
+    def tearDown(self):
+        clear_answer_cache()
+
+    def store(self, db_info=DB_INFO):
+        store_answer(db_info, "How many tracks per genre?", "Count tracks per genre", "genre, track", "SELECT 1", "# Report")
+
+    def test_hit_for_normalized_question(self):
+        self.store()
+
+        answer = lookup_answer(DB_INFO, "how many tracks per genre")
+        self.assertIsNotNone(answer)
+        self.assertEqual("SELECT 1", answer["sql_query"])
+        self.assertEqual("# Report", answer["report"])
+        self.assertIsNone(lookup_answer(DB_INFO, "How many albums per genre?"))
+
+    def test_changed_dataset_description_misses(self):
+        self.store()
+
+        self.assertIsNone(lookup_answer(dict(DB_INFO, tables=["genre", "track", "album"]), "How many tracks per genre?"))
+
+    def test_expired_answer_misses(self):
+        self.store()
+        session = Session()
+        try:
+            session.query(AnswerCacheEntry).update({"created_at": time.time() - 2 * 86400})
+            session.commit()
+        finally:
+            session.close()
+
+        self.assertIsNone(lookup_answer(DB_INFO, "How many tracks per genre?"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import unittest
+from unittest import mock
+from nodes.dataset_schema import DatasetSchema
+
+
+def _detail(table_name):
+    return {
+        "table_name": table_name,
+        "table_description": f"{table_name} rows",
+        "column_descriptions": json.dumps([{"name": "id", "description": "Identifier", "primary_key": "yes"}]),
+    }
+
+
+SCHEMA = DatasetSchema.from_db_info({
+    "db_name": "Chinook",
+    "db_description": "Music store",
+    "details": [_detail(name) for name in ("genre", "track", "invoice", "invoice_line")],
+})
+
+
+class SelectTablesTest(unittest.TestCase):
+    def assertSelected(self, expected, selected_tables):
+        self.assertEqual(expected, [table.name for table in SCHEMA.select(selected_tables)])
+
+    def test_comma_separated_and_list(self):
+        self.assertSelected(["genre", "track"], "genre, track")
+        self.assertSelected(["invoice", "invoice_line"], ["invoice", "invoice_line"])
+
+    def test_names_in_prose_and_lists(self):
+        self.assertSelected(["genre", "track"], "The relevant tables are genre and track.")
+        self.assertSelected(["genre", "track"], "1. genre\n2. track")
+        self.assertSelected(["track", "invoice_line"], "- track\n- invoice_line")
+
+    def test_schema_prefix_case_and_underscores(self):
+        self.assertSelected(["genre", "track"], "public.genre, public.track")
+        self.assertSelected(["genre", "track", "invoice_line"], "Genre, Track, InvoiceLine")
+        self.assertSelected(["invoice_line"], "Invoice Line")
+
+    def test_exact_names_do_not_pull_in_longer_ones(self):
+        self.assertSelected(["invoice"], "invoice")
+
+    def test_falls_back_to_all_tables(self):
+        self.assertSelected(["genre", "track", "invoice", "invoice_line"], "no matching table here")
+        self.assertSelected(["genre", "track", "invoice", "invoice_line"], "")
+
+
+class RenderPromptTest(unittest.TestCase):
+    def test_samples_are_loaded_only_for_rendered_tables(self):
+        samples = {"genre": json.dumps([{"id": 1, "name": "Rock"}])}
+        with mock.patch("nodes.dataset_schema.get_table_samples", return_value=samples) as get_table_samples:
+            prompt = SCHEMA.render_prompt("genre")
+        get_table_samples.assert_called_once_with("Chinook", ["genre"])
+        self.assertIn("sample rows: id | name", prompt)
+        self.assertIn("Rock", prompt)
+
+    def test_no_samples_requested(self):
+        with mock.patch("nodes.dataset_schema.get_table_samples") as get_table_samples:
+            prompt = SCHEMA.render_prompt("genre", include_samples=False)
+        get_table_samples.assert_not_called()
+        self.assertNotIn("sample rows", prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from nodes.file_manager_db import Session
+from nodes.answer_cache import clear_answer_cache, store_answer
+from nodes.image_store import ImageAsset, collect_garbage, parse_image_path, store_image_bytes, store_report_images
+
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+class ImageStoreTest(unittest.TestCase):
+    def setUp(self):
+        # images/ and the store are relative to the working directory
+        self.working_directory = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+        os.makedirs("images")
+        self.clear_assets()
+        clear_answer_cache()
+
+    def tearDown(self):
+        self.clear_assets()
+        clear_answer_cache()
+        os.chdir(self.working_directory)
+        shutil.rmtree(self.directory)
+
+    def clear_assets(self):
+        session = Session()
+        try:
+            session.query(ImageAsset).delete()
+            session.commit()
+        finally:
+            session.close()
+
+    def asset_count(self):
+        session = Session()
+        try:
+            return session.query(ImageAsset).count()
+        finally:
+            session.close()
+
+    def write(self, path, data):
+        with open(path, "wb") as image_file:
+            image_file.write(data)
+
+    def test_identical_images_share_one_file(self):
+        path = store_image_bytes(PNG + b"chart", "png")
+
+        self.assertEqual(path, store_image_bytes(PNG + b"chart", ".PNG"))
+        self.assertNotEqual(path, store_image_bytes(PNG + b"other chart", "png"))
+        self.assertEqual(2, self.asset_count())
+        with open(path, "rb") as image_file:
+            self.assertEqual(PNG + b"chart", image_file.read())
+
+    def test_unsupported_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            store_image_bytes(b"text", "txt")
+
+    def test_report_images_move_into_the_store(self):
+        started_at = time.time()
+        self.write("images/first.png", PNG + b"chart")
+        self.write("images/second.png", PNG + b"chart")
+
+        markdown, images = store_report_images("![a](images/first.png)\n![b](images/second.png)", since=started_at)
+
+        self.assertEqual(1, len(images))
+        stored_path = images[0]
+        self.assertIsNotNone(parse_image_path(stored_path))
+        self.assertEqual(f"![a]({stored_path})\n![b]({stored_path})", markdown)
+        self.assertFalse(os.path.exists("images/first.png"))
+        self.assertFalse(os.path.exists("images/second.png"))
+        self.assertEqual((markdown, images), store_report_images(markdown, since=started_at))
+
+    def test_other_images_stay_linked_as_they_are(self):
+        os.makedirs("data")
+        self.write("data/erd.png", PNG + b"dataset erd")
+        self.write("images/uploaded_erd.png", PNG + b"uploaded erd")
+        an_hour_ago = time.time() - 3600
+        os.utime("images/uploaded_erd.png", (an_hour_ago, an_hour_ago))
+        markdown = "![erd](data/erd.png) ![upload](images/uploaded_erd.png) ![missing](images/missing.png)"
+
+        self.assertEqual((markdown, []), store_report_images(markdown, since=time.time()))
+        self.assertTrue(os.path.exists("data/erd.png"))
+        self.assertTrue(os.path.exists("images/uploaded_erd.png"))
+
+    def test_garbage_collection_keeps_linked_images(self):
+        linked_path = store_image_bytes(PNG + b"linked", "png")
+        unlinked_path = store_image_bytes(PNG + b"unlinked", "png")
+        store_answer({"db_name": "chinook"}, "Top customers", "Top customers", "customer", "SELECT 1", f"![chart]({linked_path})")
+
+        with mock.patch.dict(os.environ, {"IMAGE_STORE_GRACE_SECONDS": "0"}):
+            time.sleep(0.01)
+            result = collect_garbage(max_bytes=0)
+
+        self.assertEqual(1, result["removed"])
+        self.assertTrue(os.path.exists(linked_path))
+        self.assertFalse(os.path.exists(unlinked_path))
+        self.assertEqual(1, self.asset_count())
+
+    def test_garbage_collection_keeps_recent_images(self):
+        path = store_image_bytes(PNG + b"recent", "png")
+
+        self.assertEqual(0, collect_garbage(max_bytes=0)["removed"])
+        self.assertTrue(os.path.exists(path))
+
+    def test_garbage_collection_removes_files_without_a_row(self):
+        path = store_image_bytes(PNG + b"orphan", "png")
+        self.clear_assets()
+
+        with mock.patch.dict(os.environ, {"IMAGE_STORE_GRACE_SECONDS": "0"}):
+            time.sleep(0.01)
+            result = collect_garbage(max_bytes=0)
+
+        self.assertEqual(1, result["removed_files"])
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
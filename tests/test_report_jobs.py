@@ -0,0 +1,95 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from nodes.report_jobs import (
+    CANCELLED, QUEUED, RUNNING, SUCCEEDED, ReportJob,
+    _claim_next_job, _requeue_stale_jobs, _session, _update_job, cancel_job, enqueue_report, get_job,
+)
+
+
+class ReportJobsTest(unittest.TestCase):
+    def setUp(self):
+        session = _session()
+        try:
+            session.query(ReportJob).delete()
+            session.commit()
+        finally:
+            session.close()
+
+    def test_identical_requests_share_a_job(self):
+        job_id = enqueue_report("Chinook", "How many tracks per genre?")
+
+        self.assertEqual(job_id, enqueue_report("chinook", "how many tracks per genre"))
+        self.assertNotEqual(job_id, enqueue_report("Chinook", "How many albums per genre?"))
+        self.assertNotEqual(job_id, enqueue_report("Northwind", "How many tracks per genre?"))
+
+    def test_concurrent_requests_share_a_job(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            job_ids = set(executor.map(lambda _: enqueue_report("Chinook", "Top customers"), range(16)))
+
+        self.assertEqual(1, len(job_ids))
+
+    def test_finished_or_cancelled_job_is_not_reused(self):
+        job_id = enqueue_report("Chinook", "Top customers")
+        cancel_job(job_id)
+        second_job_id = enqueue_report("Chinook", "Top customers")
+        self.assertNotEqual(job_id, second_job_id)
+
+        _update_job(second_job_id, status=SUCCEEDED, finished_at=time.time())
+        self.assertNotIn(enqueue_report("Chinook", "Top customers"), (job_id, second_job_id))
+
+    def test_claim_oldest_job_once(self):
+        first_job_id = enqueue_report("Chinook", "Top customers")
+        second_job_id = enqueue_report("Chinook", "Top artists")
+
+        job = _claim_next_job("worker-1")
+        self.assertEqual(first_job_id, job["job_id"])
+        self.assertEqual(RUNNING, get_job(first_job_id)["status"])
+        self.assertEqual(second_job_id, _claim_next_job("worker-2")["job_id"])
+        self.assertIsNone(_claim_next_job("worker-3"))
+
+    def test_concurrent_claims_take_each_job_once(self):
+        job_ids = {enqueue_report("Chinook", f"Report {index}") for index in range(5)}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            claims = list(executor.map(lambda index: _claim_next_job(f"worker-{index}"), range(8)))
+
+        claimed = [claim["job_id"] for claim in claims if claim is not None]
+        self.assertEqual(sorted(job_ids), sorted(claimed))
+
+    def test_cancel_queued_job(self):
+        job_id = enqueue_report("Chinook", "Top customers")
+
+        self.assertTrue(cancel_job(job_id))
+        self.assertEqual(CANCELLED, get_job(job_id)["status"])
+        self.assertIsNone(_claim_next_job("worker-1"))
+
+    def test_cancel_running_job_waits_for_its_worker(self):
+        job_id = enqueue_report("Chinook", "Top customers")
+        _claim_next_job("worker-1")
+
+        self.assertTrue(cancel_job(job_id))
+        self.assertEqual(RUNNING, get_job(job_id)["status"])
+        # The worker's final update only succeeds while no cancel was requested
+        self.assertFalse(_update_job(job_id, ReportJob.cancel_requested.is_(False), status=SUCCEEDED))
+
+    def test_cancel_finished_job(self):
+        job_id = enqueue_report("Chinook", "Top customers")
+        _update_job(job_id, status=SUCCEEDED, finished_at=time.time())
+
+        self.assertFalse(cancel_job(job_id))
+        self.assertFalse(cancel_job("missing"))
+        self.assertEqual(SUCCEEDED, get_job(job_id)["status"])
+
+    def test_stale_running_job_is_requeued(self):
+        job_id = enqueue_report("Chinook", "Top customers")
+        _claim_next_job("worker-1")
+        _update_job(job_id, heartbeat_at=time.time() - 3600)
+
+        _requeue_stale_jobs()
+        self.assertEqual(QUEUED, get_job(job_id)["status"])
+        self.assertEqual(job_id, _claim_next_job("worker-2")["job_id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import sqlite3
+import unittest
+from nodes.sql_query_executer_node import cap_sql_query
+
+
+class CapSqlQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.execute("CREATE TABLE genre (name TEXT)")
+        self.connection.executemany("INSERT INTO genre VALUES (?)", [("Rock",), ("Jazz",), ("Blues",)])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def fetch(self, sql_query, max_rows):
+        return self.connection.execute(cap_sql_query(sql_query, max_rows, "sqlite")).fetchall()
+
+    def test_caps_to_one_extra_row(self):
+        self.assertEqual(2, len(self.fetch("SELECT name FROM genre", 1)))
+        self.assertEqual(3, len(self.fetch("SELECT name FROM genre", 10)))
+
+    def test_trailing_comments(self):
+        for sql_query in (
+            "SELECT name FROM genre -- list genres",
+            "SELECT name FROM genre; -- done",
+            "SELECT name FROM genre;\n-- done\n",
+            "-- genres\nSELECT name /* only the name */ FROM genre",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertEqual(3, len(self.fetch(sql_query, 10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
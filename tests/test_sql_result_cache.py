@@ -0,0 +1,68 @@
+import os
+import json
+import unittest
+import pandas as pd
+from nodes.sql_result_cache import SqlResultCache, _paths, canonicalize_sql, invalidate_sql_results
+
+
+CONNECTION_STRING = "postgresql://reader@localhost/chinook"
+
+
+class CanonicalizeSqlTest(unittest.TestCase):
+    def test_formatting_does_not_matter(self):
+        expected = canonicalize_sql("SELECT name FROM genre WHERE genre_id = 1")
+        for sql_query in (
+            "select name from genre where genre_id = 1",
+            "SELECT  name\nFROM genre\n  WHERE genre_id = 1;",
+            "  select NAME from GENRE where GENRE_ID = 1 ;  ",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertEqual(expected, canonicalize_sql(sql_query))
+
+    def test_different_queries_differ(self):
+        self.assertNotEqual(canonicalize_sql("SELECT name FROM genre"), canonicalize_sql("SELECT name FROM artist"))
+        self.assertNotEqual(canonicalize_sql("SELECT 'Rock'"), canonicalize_sql("SELECT 'rock'"))
+
+
+class SqlResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        invalidate_sql_results()
+        self.df = pd.DataFrame({"name": ["Rock", "Jazz"], "tracks": [1297, 130]})
+
+    def tearDown(self):
+        invalidate_sql_results()
+
+    def cache(self, sql_query, connection_string=CONNECTION_STRING, max_rows=100):
+        return SqlResultCache(connection_string, "chinook", sql_query, max_rows, 1024 * 1024)
+
+    def test_hit_for_equivalent_sql(self):
+        self.cache("SELECT name, tracks FROM genre").store(None, self.df, False)
+
+        df, truncated = self.cache("select name, tracks\nfrom genre;").load(None)
+        pd.testing.assert_frame_equal(self.df, df)
+        self.assertFalse(truncated)
+
+    def test_key_includes_database_and_caps(self):
+        self.cache("SELECT name, tracks FROM genre").store(None, self.df, False)
+
+        self.assertIsNone(self.cache("SELECT name, tracks FROM genre", connection_string="postgresql://reader@localhost/other").load(None))
+        self.assertIsNone(self.cache("SELECT name, tracks FROM genre", max_rows=10).load(None))
+        self.assertIsNone(self.cache("SELECT name FROM genre").load(None))
+
+    def test_expired_entry_is_removed(self):
+        cache = self.cache("SELECT name, tracks FROM genre")
+        cache.store(None, self.df, False)
+        data_path, meta_path = _paths(cache.key)
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+        meta["created_at"] -= cache.ttl_seconds + 1
+        with open(meta_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+
+        self.assertIsNone(self.cache("SELECT name, tracks FROM genre").load(None))
+        self.assertFalse(os.path.exists(data_path))
+        self.assertFalse(os.path.exists(meta_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from sqlglot.errors import SqlglotError
+from nodes.sql_safety import validate_sql_query
+
+
+class ValidateSqlQueryTest(unittest.TestCase):
+    def assertVerdict(self, expected, sql_query, dialect="postgres"):
+        is_safe, reason = validate_sql_query(sql_query, dialect)
+        self.assertEqual(expected, is_safe, reason)
+
+    def test_read_only_queries(self):
+        for sql_query in (
+            "SELECT name FROM genre",
+            "SELECT name FROM genre;",
+            "SELECT g.name, COUNT(*) FROM genre g JOIN track t ON t.genre_id = g.genre_id GROUP BY g.name",
+            "WITH totals AS (SELECT customer_id, SUM(total) AS total FROM invoice GROUP BY customer_id) SELECT * FROM totals",
+            "SELECT name FROM genre UNION SELECT name FROM media_type",
+            "SELECT name FROM artist WHERE artist_id IN (SELECT artist_id FROM album)",
+            "SELECT DATE_TRUNC('month', invoice_date), SUM(total) FROM invoice GROUP BY 1",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertVerdict(True, sql_query)
+
+    def test_data_modifying_ctes(self):
+        for sql_query in (
+            "WITH gone AS (DELETE FROM invoice RETURNING *) SELECT * FROM gone",
+            "WITH changed AS (UPDATE customer SET email = 'x' RETURNING *) SELECT COUNT(*) FROM changed",
+            "WITH added AS (INSERT INTO genre (name) VALUES ('x') RETURNING *) SELECT * FROM added",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertVerdict(False, sql_query)
+
+    def test_multiple_statements(self):
+        for sql_query in (
+            "SELECT 1; DROP TABLE invoice",
+            "SELECT name FROM genre; SELECT name FROM artist",
+            "SELECT 1; DELETE FROM invoice",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertVerdict(False, sql_query)
+
+    def test_select_into(self):
+        self.assertVerdict(False, "SELECT * INTO copied_invoice FROM invoice")
+
+    def test_denied_functions(self):
+        for sql_query in (
+            "SELECT pg_sleep(10)",
+            "SELECT name FROM genre WHERE pg_sleep(5) IS NOT NULL",
+            "SELECT pg_read_file('/etc/passwd')",
+            "SELECT set_config('statement_timeout', '0', false)",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertVerdict(False, sql_query)
+
+    def test_non_select_statements(self):
+        for sql_query in (
+            "DELETE FROM invoice",
+            "UPDATE customer SET email = 'x'",
+            "DROP TABLE invoice",
+            "CREATE TABLE x (id INT)",
+            "SET statement_timeout = 0",
+        ):
+            with self.subTest(sql_query=sql_query):
+                self.assertVerdict(False, sql_query)
+
+    def test_unparseable_query_raises(self):
+        with self.assertRaises(SqlglotError):
+            validate_sql_query("SELECT FROM WHERE (")
+
+
+if __name__ == "__main__":
+    unittest.main()